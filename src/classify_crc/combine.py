@@ -6,15 +6,38 @@ Purpose: Combine all predictions from a tool
 """
 
 import argparse
+import csv
+import functools
+import hashlib
 import os
+import shutil
+from multiprocessing.pool import ThreadPool
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, TextIO
 import pandas as pd
-from typing import List, NamedTuple, TextIO
+from predictions import (concat_predictions, read_prediction_chunks,
+                         read_predictions)
+from table_io import (FORMATS, TableWriter, detect_format, format_error,
+                      has_pyarrow, read_columns, with_format, write_table)
+
+# Rows read at a time from files that cannot be copied as they are
+CHUNK_SIZE = 200_000
 
 
 class Args(NamedTuple):
     """ Command-line arguments """
     files: List[TextIO]
     out_dir: str
+    format: str
+    threads: int
+    incremental: bool
+
+
+class Entry(NamedTuple):
+    """ Manifest entry of a combined file """
+    file: str
+    size: int
+    mtime: int
+    sha256: str
 
 
 # --------------------------------------------------
@@ -38,9 +61,46 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-f',
+                        '--format',
+                        metavar='FORMAT',
+                        help='Output table format: csv, parquet, or feather',
+                        choices=FORMATS,
+                        default='csv')
+
+    parser.add_argument('-t',
+                        '--threads',
+                        metavar='INT',
+                        help='Number of files to read at once',
+                        type=int,
+                        default=1)
+
+    parser.add_argument('-i',
+                        '--incremental',
+                        help='Keep each file in the output format beside'
+                        ' the output, and only read files that changed'
+                        ' since the last run (Parquet or Feather output)',
+                        action='store_true')
+
     args = parser.parse_args()
 
-    return Args(args.files, args.out_dir)
+    error = format_error(args.format)
+    if error:
+        parser.error(error)
+
+    if args.threads <= 0:
+        parser.error(f'threads "{args.threads}" must be greater than 0')
+
+    # CSV files are combined by copying their bytes, so copies of them
+    # would only be read again in full on every run
+    if args.incremental and args.format == 'csv':
+        parser.error('--incremental requires --format parquet or feather')
+
+    for file in args.files:
+        file.close()
+
+    return Args(args.files, args.out_dir, args.format, args.threads,
+                args.incremental)
 
 
 # --------------------------------------------------
@@ -49,39 +109,273 @@ def main() -> None:
 
     args = get_args()
     out_dir = args.out_dir
+    in_files = [file.name for file in args.files]
 
-    # Rows of combined dataframe
-    rows: List = []
+    # Dataframe write operattions
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
 
-    out_df = pd.DataFrame()
+    out_file = os.path.join(out_dir, with_format('combined.csv', args.format))
 
-    # Get rows of new dataframe
-    for file in args.files:
+    if args.incremental:
+        combine_incremental(in_files, out_file, args.format, args.threads)
+    else:
+        combine_files(in_files, out_file, args.format, args.threads)
 
-        new_df = pd.read_csv(file)
-        out_df = pd.concat([out_df, new_df])
+    print(f'Done. Wrote to {out_file}')
 
-        # file_header = file.readline()
 
-        # rows.extend(
-        #     map(lambda l: str.split(l.rstrip(), sep=','), file.readlines()))
+# --------------------------------------------------
+def append_csv(in_file: str, out_fh: BinaryIO, header: bool) -> None:
+    """ Copy the bytes of CSV file to output, leaving out its header line
+    unless header """
 
-    # Move to dataframe
-    # combined_df = pd.DataFrame(rows)
+    with open(in_file, 'rb') as in_fh:
+        first_line = in_fh.readline()
+        if header:
+            out_fh.write(first_line.rstrip(b'\r\n') + b'\n')
 
-    # # Add header
-    # combined_df.columns = file_header.rstrip().split(',')
+        shutil.copyfileobj(in_fh, out_fh)
 
-    # Dataframe write operattions
-    if not os.path.isdir(out_dir):
-        os.mkdir(out_dir)
+        # Next file must start on a new line
+        end = in_fh.tell()
+        if end > len(first_line):
+            in_fh.seek(end - 1)
+            if in_fh.read(1) != b'\n':
+                out_fh.write(b'\n')
 
-    out_file = os.path.join(out_dir, 'combined.csv')
 
-    with open(out_file, 'wt') as out:
-        out_df.to_csv(out, index=False)
+# --------------------------------------------------
+def test_append_csv(tmp_path) -> None:
+    """ Test append_csv() """
 
-    print(f'Done. Wrote to {out_file}')
+    first = tmp_path / 'first.csv'
+    first.write_bytes(b'tool,record\ndvf,frag_1\ndvf,frag_2')
+    second = tmp_path / 'second.csv'
+    second.write_bytes(b'tool,record\nseeker,frag_1\n')
+    empty = tmp_path / 'empty.csv'
+    empty.write_bytes(b'tool,record\n')
+
+    out_file = tmp_path / 'combined.csv'
+    with open(out_file, 'wb') as out_fh:
+        for i, in_file in enumerate([first, empty, second]):
+            append_csv(str(in_file), out_fh, header=i == 0)
+
+    assert out_file.read_bytes() == (b'tool,record\ndvf,frag_1\ndvf,frag_2\n'
+                                     b'seeker,frag_1\n')
+
+
+# --------------------------------------------------
+def read_files(in_files: List[str], threads: int) -> Iterator[pd.DataFrame]:
+    """ Read prediction files in order with schema types, a chunk of rows
+    at a time, or whole files by a pool of threads, threads files at a
+    time """
+
+    if threads == 1:
+        for in_file in in_files:
+            yield from read_prediction_chunks(in_file, CHUNK_SIZE)
+        return
+
+    with ThreadPool(threads) as pool:
+        for start in range(0, len(in_files), threads):
+            yield from pool.map(read_predictions,
+                                in_files[start:start + threads])
+
+
+# --------------------------------------------------
+def combine_files(in_files: List[str], out_file: str, fmt: str,
+                  threads: int) -> None:
+    """ Write files to one table, with every column of any file """
+
+    headers = [read_columns(in_file) for in_file in in_files]
+    same_columns = all(header == headers[0] for header in headers)
+
+    # CSV files are copied to CSV output without being parsed. Otherwise,
+    # files are read with schema types, and only a chunk, or one file per
+    # thread, is held in memory
+    if fmt == 'csv' and same_columns and all(
+            detect_format(in_file) == 'csv' for in_file in in_files):
+        with open(out_file, 'wb') as out_fh:
+            for i, in_file in enumerate(in_files):
+                append_csv(in_file, out_fh, header=i == 0)
+    elif same_columns:
+        with TableWriter(out_file, fmt, headers[0]) as writer:
+            for df in read_files(in_files, threads):
+                writer.write(df)
+
+    # Files with different columns, such as pivoted predictions of
+    # samples without some tool, are concatenated in memory
+    else:
+        write_table(concat_predictions(read_files(in_files, threads)),
+                    out_file, fmt)
+
+
+# --------------------------------------------------
+def test_combine_files(tmp_path) -> None:
+    """ Test combine_files() """
+
+    first = tmp_path / 'first.csv'
+    first.write_text('record,dvf,seeker\nk141_1,viral,viral\n')
+    second = tmp_path / 'second.csv'
+    second.write_text('record,dvf\nk141_2,non-viral\n')
+    out_file = str(tmp_path / 'combined.csv')
+
+    combine_files([str(first), str(first)], out_file, 'csv', 1)
+    with open(out_file) as fh:
+        assert fh.read() == ('record,dvf,seeker\nk141_1,viral,viral\n'
+                             'k141_1,viral,viral\n')
+
+    combine_files([str(second), str(first)], out_file, 'csv', 2)
+    with open(out_file) as fh:
+        assert fh.read() == ('record,dvf,seeker\nk141_2,non-viral,\n'
+                             'k141_1,viral,viral\n')
+
+
+# --------------------------------------------------
+def file_hash(filename: str) -> str:
+    """ SHA-256 of file contents """
+
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as fh:
+        for block in iter(functools.partial(fh.read, 1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+# --------------------------------------------------
+def get_entry(filename: str, cached: Optional[Entry]) -> Entry:
+    """ Manifest entry of file, only hashing the file if its size or
+    modification time differ from those of cached entry """
+
+    stat = os.stat(filename)
+    if cached and (cached.size, cached.mtime) == (stat.st_size,
+                                                  stat.st_mtime_ns):
+        return cached
+
+    return Entry(filename, stat.st_size, stat.st_mtime_ns,
+                 file_hash(filename))
+
+
+# --------------------------------------------------
+def read_manifest(filename: str) -> Dict[str, Entry]:
+    """ Manifest entries by file name, none if there is no manifest """
+
+    if not os.path.isfile(filename):
+        return {}
+
+    with open(filename, 'rt') as fh:
+        return {
+            row['file']: Entry(row['file'], int(row['size']),
+                               int(row['mtime']), row['sha256'])
+            for row in csv.DictReader(fh, delimiter='\t')
+        }
+
+
+# --------------------------------------------------
+def write_manifest(filename: str, entries: List[Entry]) -> None:
+    """ Write tab-separated manifest """
+
+    with open(filename, 'wt') as fh:
+        writer = csv.writer(fh, delimiter='\t', lineterminator='\n')
+        writer.writerow(Entry._fields)
+        writer.writerows(entries)
+
+
+# --------------------------------------------------
+def test_manifest(tmp_path) -> None:
+    """ Test get_entry(), write_manifest(), and read_manifest() """
+
+    in_file = tmp_path / 'preds.csv'
+    in_file.write_text('tool,record\ndvf,frag_1\n')
+    manifest = str(tmp_path / 'manifest.tsv')
+
+    assert not read_manifest(manifest)
+
+    entry = get_entry(str(in_file), None)
+    assert entry.size == 23
+    assert entry.sha256 == file_hash(str(in_file))
+
+    write_manifest(manifest, [entry])
+    cached = read_manifest(manifest)
+    assert cached == {str(in_file): entry}
+
+    # File with the same size and modification time is not hashed again
+    assert get_entry(str(in_file), cached[str(in_file)]._replace(
+        sha256='cached')).sha256 == 'cached'
+
+
+# --------------------------------------------------
+def combine_incremental(in_files: List[str], out_file: str, fmt: str,
+                        threads: int) -> int:
+    """ Combine files from a copy of each in the output format, named by
+    its hash, only writing copies of files that changed. Return the number
+    of files read """
+
+    part_dir = os.path.splitext(out_file)[0] + '_parts'
+    os.makedirs(part_dir, exist_ok=True)
+    manifest = os.path.join(part_dir, 'manifest.tsv')
+
+    cached = read_manifest(manifest)
+    entries = [get_entry(in_file, cached.get(in_file)) for in_file in in_files]
+    parts = [
+        os.path.join(part_dir, f'{entry.sha256}.{fmt}') for entry in entries
+    ]
+
+    # Copies are renamed once written, so a run that stops part way
+    # leaves none half written
+    missing = {
+        part: in_file
+        for in_file, part in zip(in_files, parts) if not os.path.isfile(part)
+    }
+
+    def write_part(part: str, in_file: str) -> None:
+        combine_files([in_file], part + '.tmp', fmt, 1)
+        os.replace(part + '.tmp', part)
+
+    with ThreadPool(max(1, min(threads, len(missing)))) as pool:
+        pool.starmap(write_part, missing.items())
+
+    combine_files(parts, out_file, fmt, threads)
+
+    write_manifest(manifest, entries)
+
+    # Copies of files no longer combined are removed
+    keep = set(parts) | {manifest}
+    for name in os.listdir(part_dir):
+        if os.path.join(part_dir, name) not in keep:
+            os.remove(os.path.join(part_dir, name))
+
+    return len(missing)
+
+
+# --------------------------------------------------
+def test_combine_incremental(tmp_path) -> None:
+    """ Test combine_incremental() """
+
+    # Copies are kept in a columnar format
+    if not has_pyarrow():
+        return
+
+    first = tmp_path / 'first.csv'
+    first.write_text('tool,record\ndvf,frag_1\n')
+    second = tmp_path / 'second.csv'
+    second.write_text('tool,record\nseeker,frag_1\n')
+    in_files = [str(first), str(second)]
+    out_file = str(tmp_path / 'out' / 'combined.parquet')
+    os.makedirs(tmp_path / 'out')
+
+    assert combine_incremental(in_files, out_file, 'parquet', 1) == 2
+    assert combine_incremental(in_files, out_file, 'parquet', 1) == 0
+
+    second.write_text('tool,record\nseeker,frag_2\n')
+    assert combine_incremental(in_files, out_file, 'parquet', 2) == 1
+    df = read_predictions(out_file)
+    assert df['tool'].astype(str).tolist() == ['dvf', 'seeker']
+    assert df['record'].tolist() == ['frag_1', 'frag_2']
+
+    # Only copies of the files combined, and the manifest, are kept
+    assert len(os.listdir(tmp_path / 'out' / 'combined_parts')) == 3
 
 
 # --------------------------------------------------
@@ -10,6 +10,7 @@ import os
 import pandas as pd
 import re
 import sys
+from multiprocessing.pool import ThreadPool
 from typing import List, NamedTuple, Optional, TextIO, Tuple
 
 
@@ -18,6 +19,7 @@ class Args(NamedTuple):
     files: List[TextIO]
     regex: str
     out_dir: str
+    threads: int
 
 
 class Nameparts(NamedTuple):
@@ -56,9 +58,19 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-t',
+                        '--threads',
+                        help='Number of files to read at once',
+                        metavar='INT',
+                        type=int,
+                        default=1)
+
     args = parser.parse_args()
 
-    return Args(args.files, args.regex, args.outdir)
+    if args.threads <= 0:
+        parser.error(f'threads "{args.threads}" must be greater than 0')
+
+    return Args(args.files, args.regex, args.outdir, args.threads)
 
 
 # --------------------------------------------------
@@ -71,7 +83,7 @@ def main() -> None:
     if not os.path.isdir(out_dir):
         os.makedirs(out_dir)
 
-    out_df, filename = concat_files(args.regex, args.files)
+    out_df, filename = concat_files(args.regex, args.files, args.threads)
 
     out_file = make_filename(out_dir, filename)
 
@@ -81,23 +93,32 @@ def main() -> None:
 
 
 # --------------------------------------------------
-def concat_files(regex: str, files: List[TextIO]) -> Tuple[pd.DataFrame, str]:
-    """ Concatenate files into single dataframe """
+def concat_files(regex: str, files: List[TextIO],
+                 threads: int) -> Tuple[pd.DataFrame, str]:
+    """ Concatenate files into single dataframe, reading them by a pool of
+    threads """
 
-    dfs = []
+    # All file names are matched before any file is read
+    parts = [match_regex(regex, file.name) for file in files]
 
-    for file in files:
-        parts = match_regex(regex, file.name)
+    with ThreadPool(min(threads, len(files))) as pool:
+        dfs = pool.starmap(read_file, zip([file.name for file in files],
+                                          parts))
 
-        df = pd.read_csv(file, sep='\t')
+    out_df = pd.concat(dfs, ignore_index=True)
 
-        df['sample'] = parts.sample
+    return out_df, parts[-1].filename
 
-        dfs.append(df)
 
-    out_df = pd.concat(dfs, ignore_index=True)
+# --------------------------------------------------
+def read_file(filename: str, parts: Nameparts) -> pd.DataFrame:
+    """ Read CheckV file, adding the sample from its name """
+
+    df = pd.read_csv(filename, sep='\t')
+
+    df['sample'] = parts.sample
 
-    return out_df, parts.filename
+    return df
 
 
 # --------------------------------------------------
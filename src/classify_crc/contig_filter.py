@@ -10,7 +10,8 @@ import os
 import pandas as pd
 import sys
 from typing import List, NamedTuple, TextIO
-from Bio import SeqIO
+from compressed_io import compressed_name, open_input, open_output
+from fasta_io import FastaWriter, read_records
 
 
 class Args(NamedTuple):
@@ -18,6 +19,7 @@ class Args(NamedTuple):
     files: List[TextIO]
     length: int
     out_dir: str
+    compress: bool
 
 
 # --------------------------------------------------
@@ -48,13 +50,18 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-z',
+                        '--compress',
+                        help='Write BGZF compressed output',
+                        action='store_true')
+
     args = parser.parse_args()
 
     if args.min_length < 1:
         parser.error(
             f'--min_length "{args.min_length}" must be greater than 1.')
 
-    return Args(args.files, args.min_length, args.out_dir)
+    return Args(args.files, args.min_length, args.out_dir, args.compress)
 
 
 # --------------------------------------------------
@@ -88,14 +95,16 @@ def main() -> None:
         os.mkdir(out_dir)
 
     for n_file, fh in enumerate(args.files, start=1):
-        out_file = make_filename(out_dir, fh.name)
-        seqs = []
-        with open(out_file, 'wt') as out_fh:
-            for n_seq, seq_record in enumerate(SeqIO.parse(fh, 'fasta'),
-                                               start=1):
+        out_file = compressed_name(make_filename(out_dir, fh.name),
+                                   args.compress)
+        fh.close()
+        with open_input(fh.name, 'rb') as in_fh, \
+                open_output(out_file, 'wb') as out_fh, \
+                FastaWriter(out_fh) as writer:
+            for n_seq, seq_record in enumerate(read_records(in_fh), start=1):
                 if len(seq_record.seq) >= args.length:
-                    seqs.append(seq_record)
-            n_written = SeqIO.write(seqs, out_fh, 'fasta')
+                    writer.write(seq_record.description, seq_record.seq)
+            n_written = writer.n_rec
 
             plu = 's' if n_written != 1 else ''
             print(
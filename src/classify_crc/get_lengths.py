@@ -8,13 +8,13 @@ Purpose: Get lengths of each contig in FASTA files
 import argparse
 import os
 import pandas as pd
-from typing import List, NamedTuple, TextIO
-from Bio import SeqIO
+from typing import BinaryIO, List, NamedTuple
+from fasta_io import read_lengths
 
 
 class Args(NamedTuple):
     """ Command-line arguments """
-    files: List[TextIO]
+    files: List[BinaryIO]
     out_dir: str
 
 
@@ -29,7 +29,7 @@ def get_args() -> Args:
     parser.add_argument('files',
                         metavar='FILE',
                         help='FASTA files',
-                        type=argparse.FileType('rt'),
+                        type=argparse.FileType('rb'),
                         nargs='+')
 
     parser.add_argument('-o',
@@ -55,8 +55,8 @@ def main() -> None:
     for file in args.files:
         sample, _ = os.path.splitext(os.path.basename(file.name))
 
-        for rec in SeqIO.parse(file, 'fasta'):
-            contigs.append(f'{sample},{rec.id},{len(rec)}')
+        for contig_id, length in read_lengths(file):
+            contigs.append(f'{sample},{contig_id},{length}')
 
     if not os.path.isdir(out_dir):
         os.makedirs(out_dir)
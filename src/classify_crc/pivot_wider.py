@@ -12,6 +12,7 @@ from typing import NamedTuple, TextIO
 import numpy as np
 import pandas as pd
 from pandas.testing import assert_frame_equal, assert_series_equal
+from table_io import read_table
 
 
 class Args(NamedTuple):
@@ -165,7 +166,8 @@ def test_complete_classifications() -> None:
 def clean_predictions(df: pd.DataFrame) -> pd.DataFrame:
     """ Fill in missing predicitons, and fix predicted labels """
 
-    df = df[['tool', 'record', 'metagenome', 'prediction']]
+    # Columns read from Parquet are categorical, which take no new labels
+    df = df[['tool', 'record', 'metagenome', 'prediction']].astype(object)
 
     df['record'] = clean_records(df['record'])
 
@@ -263,7 +265,9 @@ def main() -> None:
     if not os.path.isdir(out_dir):
         os.makedirs(out_dir)
 
-    df = clean_predictions(pd.read_csv(args.files))
+    df = clean_predictions(
+        read_table(args.files.name,
+                   usecols=['tool', 'record', 'metagenome', 'prediction']))
     df = pivot_wider(df)
 
     out_file = os.path.join(args.out_dir, 'pivoted_predictions.csv')
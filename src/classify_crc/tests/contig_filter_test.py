@@ -1,5 +1,6 @@
 """ Tests """
 
+import gzip
 import os
 import platform
 import random
@@ -88,6 +89,37 @@ def test_okay() -> None:
             shutil.rmtree(out_dir)
 
 
+# --------------------------------------------------
+def test_compressed() -> None:
+    """ Reads and writes gzipped files """
+
+    out_dir = random_string()
+    gz_file = os.path.join(out_dir, 'in', 'input1.fasta.gz')
+    try:
+        os.makedirs(os.path.dirname(gz_file))
+        with open(TEST1, 'rb') as in_fh, gzip.open(gz_file, 'wb') as out_fh:
+            out_fh.write(in_fh.read())
+
+        rv, out = getstatusoutput(f'{RUN} {gz_file} -o {out_dir}')
+
+        assert rv == 0
+        out_file = os.path.join(out_dir, 'input1.fasta.gz')
+        assert out.startswith(f'Wrote 1 sequence (out of 3) to {out_file}')
+        with gzip.open(out_file, 'rt') as fh:
+            assert fh.read().count('>') == 1
+
+        # Uncompressed input, compressed output
+        rv, out = getstatusoutput(f'{RUN} {TEST1} -z -o {out_dir}')
+
+        assert rv == 0
+        with gzip.open(out_file, 'rt') as fh:
+            assert fh.read().count('>') == 1
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
 # ---------------------------------------------------------------------------
 def random_string() -> str:
     """ Generate a random string """
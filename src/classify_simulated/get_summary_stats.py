@@ -7,13 +7,17 @@ Purpose: Calculate performance metrics
 
 import argparse
 import os
-from typing import NamedTuple, TextIO
+from typing import NamedTuple, Optional, TextIO
 from pandas._testing.asserters import assert_almost_equal
 
 from sklearn.metrics import confusion_matrix
 import numpy as np
 import pandas as pd
 from pandas.testing import assert_frame_equal, assert_series_equal
+from predictions import fill_category, read_predictions
+from resources import ENV_VAR, Monitor
+from table_io import (FORMATS, format_error, read_table, with_format,
+                      write_table)
 
 
 class Args(NamedTuple):
@@ -24,6 +28,8 @@ class Args(NamedTuple):
     min_bin: float
     max_bin: float
     out_dir: str
+    format: str
+    benchmark: Optional[str]
 
 
 # --------------------------------------------------
@@ -87,10 +93,30 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-f',
+                        '--format',
+                        metavar='FORMAT',
+                        help='Output table format: csv, parquet, or feather',
+                        choices=FORMATS,
+                        default='csv')
+
+    parser.add_argument('-B',
+                        '--benchmark',
+                        metavar='FILE',
+                        help='File to record resources used in, as a'
+                        f' Snakemake benchmark, also set by ${ENV_VAR}',
+                        type=str,
+                        default=os.environ.get(ENV_VAR))
+
     args = parser.parse_args()
 
+    error = format_error(args.format)
+    if error:
+        parser.error(error)
+
     return Args(args.file, args.taxonomy_file, args.bin_width,
-                args.smallest_bin, args.highest_bin, args.out_dir)
+                args.smallest_bin, args.highest_bin, args.out_dir,
+                args.format, args.benchmark)
 
 
 # --------------------------------------------------
@@ -116,10 +142,10 @@ def test_clean_records() -> None:
 def complete_classifications(df: pd.DataFrame) -> pd.DataFrame:
     """ Fill in missing classifications """
 
-    out_df = pd.DataFrame(
-        columns=['tool', 'record', 'metagenome', 'prediction'])
+    columns = ['tool', 'record', 'metagenome', 'prediction']
+    frames = []
 
-    for metagenome, metagenome_df in df.groupby('metagenome'):
+    for metagenome, metagenome_df in df.groupby('metagenome', observed=True):
         metagenome = metagenome_df['metagenome'].unique()
         all_records = metagenome_df['record'].unique()
         all_tools = metagenome_df['tool'].unique()
@@ -133,10 +159,15 @@ def complete_classifications(df: pd.DataFrame) -> pd.DataFrame:
         metagenome_df['metagenome'] = metagenome_df['metagenome'].fillna(
             metagenome[0])
 
-        out_df = pd.concat([out_df, metagenome_df])
+        frames.append(metagenome_df)
 
-    out_df['prediction'] = out_df['prediction'].fillna('non-viral')
-    out_df = out_df.reset_index(drop=True)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    # Metagenomes are concatenated once. All are from df, so categorical
+    # columns stay categorical
+    out_df = pd.concat(frames, ignore_index=True)[columns]
+    out_df['prediction'] = fill_category(out_df['prediction'], 'non-viral')
 
     return out_df
 
@@ -393,7 +424,7 @@ def get_tool_metrics(df: pd.DataFrame) -> pd.DataFrame:
         'metagenome', 'tool', 'length_bin', 'tp', 'fp', 'tn', 'fn', 'f1',
         'sensitivity', 'specificity', 'precision'
     ])
-    for _, tool_df in df.groupby(['metagenome', 'tool']):
+    for _, tool_df in df.groupby(['metagenome', 'tool'], observed=True):
         tool_metrics = get_lengthbin_metrics(tool_df)
 
         nrows = len(tool_metrics)
@@ -412,16 +443,23 @@ def main() -> None:
 
     args = get_args()
     out_dir = args.out_dir
+    monitor = Monitor(args.benchmark)
 
     if not os.path.isdir(out_dir):
         os.mkdir(out_dir)
 
-    out_file = os.path.join(out_dir, 'summary_stats.csv')
+    out_file = os.path.join(out_dir,
+                            with_format('summary_stats.csv', args.format))
 
-    contig_tax = pd.read_csv(args.taxonomy)
+    # Inputs can be of any table format
+    monitor.stage('read')
+    contig_tax = read_table(args.taxonomy.name)
 
-    in_df = pd.read_csv(args.file)
+    in_df = read_predictions(
+        args.file.name,
+        usecols=['tool', 'record', 'metagenome', 'prediction'])
 
+    monitor.stage('taxonomy')
     predictions = clean_predictions(in_df)
 
     predictions = add_taxonomy(predictions, contig_tax)
@@ -429,9 +467,13 @@ def main() -> None:
     predictions = bin_lengths(predictions, args.width, args.min_bin,
                               args.max_bin)
 
+    monitor.stage('metrics')
     metrics = get_tool_metrics(predictions)
 
-    metrics.to_csv(out_file, index=False)
+    monitor.stage('write')
+    write_table(metrics, out_file, args.format)
+
+    monitor.finish()
 
     print(f'Done. Wrote to file {out_file}.')
 
@@ -0,0 +1,172 @@
+"""
+Date   : 2026-10-17
+Purpose: Typed schema of the unified prediction table
+
+Reformatted predictions of all tools share one table. Columns holding a
+few distinct labels (tool, actual, metagenome, prediction, lifecycle,
+stat_name) are categorical, and length, value, and stat are numeric, so
+that tables of millions of predictions stay small in memory. Record names
+are kept as strings.
+"""
+
+import io
+from typing import Iterable, Iterator, List, Optional
+import pandas as pd
+from pandas.api.types import union_categoricals
+from table_io import read_table, read_table_chunks
+
+# Type of each schema column. Not every table has every column
+DTYPES = {
+    'tool': 'category',
+    'length': 'Int64',
+    'actual': 'category',
+    'metagenome': 'category',
+    'prediction': 'category',
+    'lifecycle': 'category',
+    'value': 'float64',
+    'stat': 'float64',
+    'stat_name': 'category'
+}
+
+CATEGORIES = [col for col, dtype in DTYPES.items() if dtype == 'category']
+
+
+# --------------------------------------------------
+def enforce_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """ Cast columns of prediction table to their schema types """
+
+    columns = {}
+    for col, dtype in DTYPES.items():
+        if col in df:
+            values = df[col]
+            if dtype != 'category':
+                values = pd.to_numeric(values)
+            columns[col] = values.astype(dtype)
+
+    return df.assign(**columns)
+
+
+# --------------------------------------------------
+def test_enforce_schema() -> None:
+    """ Test enforce_schema() """
+
+    df = pd.DataFrame({
+        'tool': 'vibrant',
+        'record': ['frag_1', 'frag_2'],
+        'length': '500',
+        'value': ['1', None],
+        'lifecycle': [None, None]
+    })
+    typed = enforce_schema(df)
+
+    assert list(typed.columns) == list(df.columns)
+    assert typed.dtypes.astype(str).tolist() == [
+        'category', 'object', 'Int64', 'float64', 'category'
+    ]
+    assert typed['length'].tolist() == [500, 500]
+    assert typed['tool'].cat.categories.tolist() == ['vibrant']
+
+    # Missing values are written as before
+    out_fh = io.StringIO()
+    typed.to_csv(out_fh, index=False)
+    assert out_fh.getvalue() == ('tool,record,length,value,lifecycle\n'
+                                 'vibrant,frag_1,500,1.0,\n'
+                                 'vibrant,frag_2,500,,\n')
+
+
+# --------------------------------------------------
+def read_predictions(file: str,
+                     usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    """ Read prediction table of any format with schema types, optionally
+    only some columns """
+
+    # Tables written before the schema have '-' for missing viralVerify
+    # scores
+    return enforce_schema(
+        read_table(file,
+                   usecols=usecols,
+                   dtype=DTYPES,
+                   na_values={'value': ['-']}))
+
+
+# --------------------------------------------------
+def read_prediction_chunks(file: str,
+                           chunk_size: int) -> Iterator[pd.DataFrame]:
+    """ Read prediction table of any format with schema types, a chunk of
+    rows at a time """
+
+    for df in read_table_chunks(file,
+                                chunk_size,
+                                dtype=DTYPES,
+                                na_values={'value': ['-']}):
+        yield enforce_schema(df)
+
+
+# --------------------------------------------------
+def concat_predictions(dfs: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """ Concatenate prediction tables, keeping categorical columns
+    categorical by giving them the union of their categories """
+
+    dfs = list(dfs)
+
+    for col in CATEGORIES:
+        frames = [df for df in dfs if col in df]
+        if not frames:
+            continue
+
+        categories = union_categoricals(
+            [df[col].astype('category') for df in frames]).categories
+        for df in frames:
+            df[col] = df[col].astype('category').cat.set_categories(
+                categories)
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+# --------------------------------------------------
+def test_concat_predictions() -> None:
+    """ Test concat_predictions() """
+
+    first = enforce_schema(
+        pd.DataFrame({
+            'tool': 'dvf',
+            'record': ['frag_1', 'frag_2'],
+            'value': [0.1, 0.9]
+        }))
+    second = enforce_schema(
+        pd.DataFrame({
+            'tool': 'seeker',
+            'record': ['frag_1'],
+            'value': [0.5]
+        }))
+
+    combined = concat_predictions([first, second])
+
+    assert combined['tool'].dtype == 'category'
+    assert combined['tool'].tolist() == ['dvf', 'dvf', 'seeker']
+    assert combined['value'].tolist() == [0.1, 0.9, 0.5]
+    assert combined.index.tolist() == [0, 1, 2]
+
+
+# --------------------------------------------------
+def fill_category(values: pd.Series, fill: str) -> pd.Series:
+    """ Fill missing values, adding fill to the categories of a
+    categorical column if it is not one already """
+
+    if values.dtype == 'category' and fill not in values.cat.categories:
+        values = values.cat.add_categories([fill])
+
+    return values.fillna(fill)
+
+
+# --------------------------------------------------
+def test_fill_category() -> None:
+    """ Test fill_category() """
+
+    values = pd.Series(['viral', None], dtype='category')
+    assert fill_category(values, 'non-viral').tolist() == [
+        'viral', 'non-viral'
+    ]
+
+    values = pd.Series(['viral', None])
+    assert fill_category(values, 'viral').tolist() == ['viral', 'viral']
@@ -6,20 +6,52 @@ Purpose: Post processing tool predictions
 """
 
 import argparse
+import collections
+import csv
+import functools
+import itertools
+import multiprocessing as mp
 import numpy as np
 import os
 import pandas as pd
-from typing import List, NamedTuple, TextIO
+import sys
+from typing import Iterator, List, NamedTuple, Optional, TextIO, Tuple
+from predictions import enforce_schema
+from resources import ENV_VAR, Monitor
+from table_io import FORMATS, TableWriter, format_error
+
+# Rows of large outputs reformatted at a time
+CHUNK_SIZE = 200_000
+
+# Lifecycle and confidence (1 is highest) of sequences in each VirSorter
+# category
+VIRSORTER_CATEGORIES = {
+    '1': ('lytic', 1),
+    '2': ('lytic', 2),
+    '3': ('lytic', 3),
+    '4': ('prophage', 1),
+    '5': ('prophage', 2),
+    '6': ('prophage', 3)
+}
 
 
-class Args(NamedTuple):
-    """ Command-line arguments """
-    file: TextIO
+class Job(NamedTuple):
+    """ Tool output to reformat """
+    file: str
     out_dir: str
     metagenome: str
     tool: str
 
 
+class Args(NamedTuple):
+    """ Command-line arguments """
+    jobs: List[Job]
+    workers: int
+    chunk_size: int
+    format: str
+    benchmark: Optional[str]
+
+
 # --------------------------------------------------
 def get_args() -> Args:
     """ Get command-line arguments """
@@ -29,10 +61,11 @@ def get_args() -> Args:
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
     parser.add_argument('file',
-                        help='Classification output',
+                        help='Classification output (for VirSorter, its'
+                        ' Predicted_viral_sequences directory)',
                         metavar='FILE',
-                        type=argparse.FileType('rt'),
-                        default=None)
+                        type=str,
+                        nargs='?')
 
     parser.add_argument('-o',
                         '--out_dir',
@@ -45,8 +78,7 @@ def get_args() -> Args:
                         '--metagenome',
                         help='Simulated metagenome (profile_metagenome)',
                         metavar='',
-                        type=str,
-                        required=True)
+                        type=str)
 
     parser.add_argument('-t',
                         '--tool',
@@ -57,50 +89,226 @@ def get_args() -> Args:
                             'breadsticks', 'dvf', 'marvel', 'metaphinder', 'seeker',
                             'vibrant', 'viralverify', 'virfinder', 'virsorter',
                             'virsorter2'
-                        ],
-                        required=True)
+                        ])
+
+    parser.add_argument('-b',
+                        '--batch',
+                        help='Tab-separated manifest of files to reformat'
+                        ' instead of FILE, with columns file, tool,'
+                        ' metagenome, and optionally out_dir',
+                        metavar='MANIFEST',
+                        type=argparse.FileType('rt'))
+
+    parser.add_argument('-w',
+                        '--workers',
+                        help='Number of files to reformat in parallel',
+                        metavar='INT',
+                        type=int,
+                        default=1)
+
+    parser.add_argument('-c',
+                        '--chunk_size',
+                        help='Rows read at a time from DeepVirFinder,'
+                        ' VirFinder, Seeker, and VIBRANT output, all if 0',
+                        metavar='ROWS',
+                        type=int,
+                        default=CHUNK_SIZE)
+
+    parser.add_argument('-f',
+                        '--format',
+                        help='Output table format: csv, parquet, or feather',
+                        metavar='FORMAT',
+                        choices=FORMATS,
+                        default='csv')
+
+    parser.add_argument('-B',
+                        '--benchmark',
+                        help='File to record resources used in, as a'
+                        f' Snakemake benchmark, also set by ${ENV_VAR}',
+                        metavar='FILE',
+                        type=str,
+                        default=os.environ.get(ENV_VAR))
 
     args = parser.parse_args()
 
-    return Args(args.file, args.out_dir, args.metagenome, args.tool)
+    if args.workers <= 0:
+        parser.error(f'workers "{args.workers}" must be greater than 0')
+
+    if args.chunk_size < 0:
+        parser.error(f'chunk_size "{args.chunk_size}" must not be negative')
+
+    error = format_error(args.format)
+    if error:
+        parser.error(error)
+
+    single = [('FILE', args.file), ('-m/--metagenome', args.metagenome),
+              ('-t/--tool', args.tool)]
+
+    if args.file and not can_read(args.file, args.tool):
+        parser.error(f'No such file "{args.file}"')
+
+    if args.batch:
+        given = [flag for flag, value in single if value is not None]
+        if given:
+            parser.error(f'{", ".join(given)} cannot be used with --batch')
+
+        try:
+            jobs = read_manifest(args.batch, args.out_dir)
+        except ValueError as err:
+            parser.error(f'--batch: {err}')
+
+        return Args(jobs, args.workers, args.chunk_size, args.format,
+                    args.benchmark)
+
+    missing = [flag for flag, value in single if value is None]
+    if missing:
+        parser.error('the following arguments are required: ' +
+                     ', '.join(missing))
+
+    return Args(
+        [Job(args.file, args.out_dir, args.metagenome, args.tool)],
+        args.workers, args.chunk_size, args.format, args.benchmark)
 
 
 # --------------------------------------------------
 def main() -> None:
     """ Do the stuff """
 
-    # Parse rguments
+    # Parse arguments
     args = get_args()
-    tool = args.tool
-    out_dir = args.out_dir
+    jobs = args.jobs
+    monitor = Monitor(args.benchmark)
+
+    reformat = functools.partial(reformat_file,
+                                 chunk_size=args.chunk_size,
+                                 fmt=args.format)
+
+    # Files are reformatted in one process, or spread over a pool of them
+    monitor.stage('reformat')
+    try:
+        if args.workers > 1 and len(jobs) > 1:
+            with mp.Pool(min(args.workers, len(jobs))) as pool:
+                out_files = pool.map(reformat, jobs, chunksize=1)
+        else:
+            out_files = list(map(reformat, jobs))
+    except ValueError as err:
+        sys.exit(str(err))
+
+    monitor.finish()
+
+    if len(out_files) == 1:
+        print(f'Done. Wrote to {out_files[0]}')
+    else:
+        print(f'Done. Wrote {len(out_files)} files.')
+
+
+# --------------------------------------------------
+def read_manifest(fh: TextIO, out_dir: str) -> List[Job]:
+    """ Read files to reformat from manifest. Rows without an out_dir are
+    written to out_dir """
+
+    reader = csv.DictReader(fh, delimiter='\t')
+
+    columns = set(reader.fieldnames or [])
+    missing = {'file', 'tool', 'metagenome'} - columns
+    if missing:
+        raise ValueError(f'missing column(s) {", ".join(sorted(missing))}')
+
+    jobs = []
+    for line_num, row in enumerate(reader, start=2):
+        file, tool = row['file'], row['tool']
 
-    # Reformat based on tool
-    reformatted = reformatters[tool](args)
+        if tool not in reformatters:
+            raise ValueError(f'line {line_num}: unknown tool "{tool}"')
+        if not can_read(file, tool):
+            raise ValueError(f'line {line_num}: No such file "{file}"')
+
+        jobs.append(
+            Job(file, row.get('out_dir') or out_dir, row['metagenome'], tool))
+
+    # Output files are named by tool, so each needs its own out_dir
+    counts = collections.Counter(map(get_out_file, jobs))
+    repeated = [out_file for out_file, count in counts.items() if count > 1]
+    if repeated:
+        raise ValueError(f'more than one row writes to "{repeated[0]}"')
+
+    return jobs
+
+
+# --------------------------------------------------
+def can_read(file: str, tool: str) -> bool:
+    """ Check that tool output exists, which for VirSorter can be the
+    directory of its category FASTAs """
+
+    return os.path.isfile(file) or (tool == 'virsorter'
+                                    and os.path.isdir(file))
+
+
+# --------------------------------------------------
+def get_out_file(job: Job, fmt: str = 'csv') -> str:
+    """ Name of formatted output file in table format fmt """
+
+    return os.path.join(job.out_dir, f'{job.tool}_pred_formatted.{fmt}')
+
+
+# --------------------------------------------------
+def reformat_file(job: Job,
+                  chunk_size: int = CHUNK_SIZE,
+                  fmt: str = 'csv') -> str:
+    """ Reformat one tool output, return the name of the file written """
 
     # Reorder columns
     cols = [
         'tool', 'record', 'metagenome', 'prediction', 'lifecycle', 'value',
         'stat', 'stat_name'
     ]
-    final_df = reformatted[cols]
 
     # Dataframe write operations
-    if not os.path.isdir(out_dir):
-        os.mkdir(out_dir)
+    os.makedirs(job.out_dir, exist_ok=True)
 
-    out_file = os.path.join(out_dir, f'{tool}_pred_formatted.csv')
+    out_file = get_out_file(job, fmt)
 
-    with open(out_file, 'wt') as out:
-        final_df.to_csv(out, index=False)
+    # Reformat based on tool, with columns cast to their schema types.
+    # The columns are written even when there are no rows
+    try:
+        with TableWriter(out_file, fmt, cols) as writer:
+            for df in reformat_chunks(job, chunk_size):
+                writer.write(enforce_schema(df[cols]))
+    except (KeyError, ValueError) as err:
+        if os.path.isfile(out_file):
+            os.remove(out_file)
+        raise ValueError(f'File {job.file}: could not reformat {job.tool}'
+                         f' output ({err})') from err
 
-    print(f'Done. Wrote to {out_file}')
+    return out_file
 
 
 # --------------------------------------------------
-def reformat_dvf(args: Args):
+def reformat_chunks(job: Job, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """ Reformat tool output in chunks of chunk_size rows where the tool
+    allows, otherwise all at once """
+
+    if job.tool in row_formatters and chunk_size > 0:
+        for raw_df in pd.read_csv(job.file, sep='\t', chunksize=chunk_size):
+            yield row_formatters[job.tool](raw_df, job)
+    elif job.tool == 'vibrant' and chunk_size > 0:
+        phages = read_vibrant(job.file)
+        while rows := list(itertools.islice(phages, chunk_size)):
+            yield format_vibrant(rows, job)
+    else:
+        yield reformatters[job.tool](job)
+
+
+# --------------------------------------------------
+def reformat_dvf(job: Job):
     """ Reformat DeepVirFinder output """
 
-    raw_df = pd.read_csv(args.file, sep='\t')
+    return format_dvf(pd.read_csv(job.file, sep='\t'), job)
+
+
+# --------------------------------------------------
+def format_dvf(raw_df: pd.DataFrame, job: Job) -> pd.DataFrame:
+    """ Reformat rows of DeepVirFinder output """
 
     # Rename columns that are present
     df = raw_df.rename(
@@ -119,27 +327,26 @@ def reformat_dvf(args: Args):
     df['prediction'] = np.where(df['value'] < 0.5, 'non-viral', 'viral')
 
     # Add constant columns
-    index_range = range(len(df.index))
-    df['tool'] = pd.Series([args.tool for x in index_range])
-    df['metagenome'] = pd.Series([args.metagenome for x in index_range])
-    df['stat_name'] = pd.Series(['p' for x in index_range])
-    df['lifecycle'] = pd.Series([None for x in index_range])
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
+    df['stat_name'] = 'p'
+    df['lifecycle'] = None
 
     return df
 
 
 # --------------------------------------------------
-def reformat_marvel(args: Args):
+def reformat_marvel(job: Job):
     """ Reformat MARVEL output """
 
-    df = pd.read_csv(args.file)
+    df = pd.read_csv(job.file)
 
     # Shorten record to just ID
     df['record'] = df['record'].str.strip(">")
 
     # Add constant columns
-    df['tool'] = args.tool
-    df['metagenome'] = args.metagenome
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
     df['prediction'] = 'phage'
     df['lifecycle'] = None
     df['value'] = None
@@ -150,10 +357,10 @@ def reformat_marvel(args: Args):
 
 
 # --------------------------------------------------
-def reformat_metaphinder(args: Args):
+def reformat_metaphinder(job: Job):
     """ Reformat MetaPhinder output """
 
-    raw_df = pd.read_csv(args.file, sep='\t')
+    raw_df = pd.read_csv(job.file, sep='\t')
 
     # Rename columns that are present
     df = raw_df.rename(
@@ -170,21 +377,25 @@ def reformat_metaphinder(args: Args):
                                 'viral')
 
     # Add constant columns
-    index_range = range(len(df.index))
-    df['tool'] = pd.Series([args.tool for x in index_range])
-    df['metagenome'] = pd.Series([args.metagenome for x in index_range])
-    df['lifecycle'] = pd.Series([None for x in index_range])
-    df['stat'] = pd.Series([None for x in index_range])
-    df['stat_name'] = pd.Series([None for x in index_range])
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
+    df['lifecycle'] = None
+    df['stat'] = None
+    df['stat_name'] = None
 
     return df
 
 
 # --------------------------------------------------
-def reformat_seeker(args: Args):
+def reformat_seeker(job: Job):
     """ Reformat Seeker output """
 
-    raw_df = pd.read_csv(args.file, sep='\t')
+    return format_seeker(pd.read_csv(job.file, sep='\t'), job)
+
+
+# --------------------------------------------------
+def format_seeker(raw_df: pd.DataFrame, job: Job) -> pd.DataFrame:
+    """ Reformat rows of Seeker output """
 
     # Rename columns that are present
     df = raw_df.rename({'name': 'record', 'score': 'value'}, axis='columns')
@@ -193,59 +404,92 @@ def reformat_seeker(args: Args):
     df['prediction'] = df['prediction'].str.lower()
 
     # Add constant columns
-    index_range = range(len(df.index))
-    df['tool'] = pd.Series([args.tool for x in index_range])
-    df['metagenome'] = pd.Series([args.metagenome for x in index_range])
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
 
     # Add empty columns
-    df['stat'] = pd.Series([None for x in index_range], dtype=str)
-    df['stat_name'] = pd.Series([None for x in index_range], dtype=str)
-    df['lifecycle'] = pd.Series([None for x in index_range], dtype=str)
+    df['stat'] = None
+    df['stat_name'] = None
+    df['lifecycle'] = None
 
     return df
 
 
 # --------------------------------------------------
-def reformat_vibrant(args: Args):
+def reformat_vibrant(job: Job):
     """ Reformat vibrant output """
 
-    # Read in the file
-    seqs: List = args.file.readlines()
+    return format_vibrant(list(read_vibrant(job.file)), job)
+
+
+# --------------------------------------------------
+def read_vibrant(file: str) -> Iterator[Tuple[str, str]]:
+    """ Read the record ID and lifecycle of each phage from VIBRANT's list
+    of phages, or from the headers of its phage FASTA """
+
+    with open(file, 'rt') as fh:
+        fasta = None
+        for line in fh:
+            # Decide from the first line whether the file is a FASTA
+            if fasta is None:
+                fasta = line.startswith('>')
+
+            if fasta:
+                if not line.startswith('>'):
+                    continue
+                line = line[1:]
+
+            # Record ID is the name up to the first whitespace
+            fields = line.split(maxsplit=1)
+            if not fields:
+                continue
 
-    df = pd.DataFrame(seqs, columns=['seq'])
+            # Prophages have _fragment_ appended to the full header
+            yield fields[0], 'prophage' if '_fragment_' in line else 'lytic'
 
-    # Extract sequence ID
-    # 1 or more [alphanumeric or .] followed by one whitespace
-    # pylint: disable=unsupported-assignment-operation
-    df['record'] = df['seq'].str.extract(r'(?P<sequence>[\w.]+)[\s]')
 
-    # Label prophages, as they will have _fragment_ in the name
-    df['lifecycle'] = np.where(df['seq'].str.contains(r'_fragment_'),
-                               'prophage', 'lytic')
+# --------------------------------------------------
+def test_read_vibrant(tmp_path) -> None:
+    """ Test read_vibrant() """
+
+    expected = [('k141_5', 'lytic'), ('k141_8', 'prophage')]
+
+    list_file = tmp_path / 'phages_combined.txt'
+    list_file.write_text('k141_5 flag=1 multi=2.0000 len=5203\n'
+                         'k141_8 len=9630_fragment_1\n\n')
+    assert list(read_vibrant(str(list_file))) == expected
+
+    fasta_file = tmp_path / 'phages_combined.fna'
+    fasta_file.write_text('>k141_5 flag=1 multi=2.0000 len=5203\nACGT\n'
+                          'ACGT\n>k141_8 len=9630_fragment_1\nTTGA\n')
+    assert list(read_vibrant(str(fasta_file))) == expected
+
+
+# --------------------------------------------------
+def format_vibrant(rows: List[Tuple[str, str]], job: Job) -> pd.DataFrame:
+    """ Reformat record IDs and lifecycles of VIBRANT phages """
 
-    # Remove unused columns
-    df = df.drop(columns=['seq'])
+    df = pd.DataFrame(rows, columns=['record', 'lifecycle'])
 
     # Add constant columns
-    index_range = range(len(df.index))
-    df['tool'] = pd.Series([args.tool for x in index_range], dtype=str)
-    df['metagenome'] = pd.Series([args.metagenome for x in index_range])
-    df['prediction'] = pd.Series(['viral' for x in index_range], dtype=str)
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
+    df['prediction'] = 'viral'
 
     # Add empty columns
-    df['value'] = pd.Series([None for x in index_range], dtype=str)
-    df['stat'] = pd.Series([None for x in index_range], dtype=str)
-    df['stat_name'] = pd.Series([None for x in index_range], dtype=str)
+    df['value'] = None
+    df['stat'] = None
+    df['stat_name'] = None
 
     return df
 
 
 # --------------------------------------------------
-def reformat_viralverify(args: Args):
+def reformat_viralverify(job: Job):
     """ Reformat viralVerify output """
 
-    # Read in the dataframe
-    raw_df = pd.read_csv(args.file)
+    # Read in the dataframe, where contigs without a score have '-'
+    raw_df = pd.read_csv(job.file, na_values={'Score': ['-']})
 
     # Rename current columns
     df = raw_df.rename(
@@ -258,22 +502,25 @@ def reformat_viralverify(args: Args):
         axis='columns')
 
     # Add constant columns
-    index_range = range(len(df.index))
-    df['tool'] = pd.Series([args.tool for x in index_range])
-    df['metagenome'] = pd.Series([args.metagenome for x in index_range])
-    df['lifecycle'] = pd.Series([None for x in index_range])
-    df['stat'] = pd.Series([None for x in index_range], dtype=str)
-    df['stat_name'] = pd.Series([None for x in index_range])
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
+    df['lifecycle'] = None
+    df['stat'] = None
+    df['stat_name'] = None
 
     return df
 
 
 # --------------------------------------------------
-def reformat_virfinder(args: Args):
+def reformat_virfinder(job: Job):
     """ Reformat virfinder output """
 
-    # Read in the dataframe
-    raw_df = pd.read_csv(args.file, sep='\t')
+    return format_virfinder(pd.read_csv(job.file, sep='\t'), job)
+
+
+# --------------------------------------------------
+def format_virfinder(raw_df: pd.DataFrame, job: Job) -> pd.DataFrame:
+    """ Reformat rows of virfinder output """
 
     # Rename current columns
     df = raw_df.rename({
@@ -290,86 +537,108 @@ def reformat_virfinder(args: Args):
     df['prediction'] = np.where(df['value'] < 0.5, 'non-viral', 'viral')
 
     # Add constant columns
-    index_range = range(len(df.index))
-    df['tool'] = pd.Series([args.tool for x in index_range])
-    df['metagenome'] = pd.Series([args.metagenome for x in index_range])
-    df['stat_name'] = pd.Series(['p' for x in index_range])
-    df['lifecycle'] = pd.Series([None for x in index_range])
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
+    df['stat_name'] = 'p'
+    df['lifecycle'] = None
 
     return df
 
 
 # --------------------------------------------------
-def reformat_virsorter(args: Args):
-    """ Reformat virsorter output """
-
-    # Read in the single column in the file
-    df = pd.read_csv(args.file)
-
-    if not df.empty:
-
-        # pylint: disable=no-member
-        df = df.rename({'sequences': 'record'}, axis='columns')
-
-        # Extract category number from sequence name
-        df['value'] = df['record'].str.extract(r'-cat_(?P<value>[\d])')
-
-        # Keep only original record name
-        df['record'] = df['record'].str.replace(r'_Fragment.*', '', regex=True)
-        df['record'] = df['record'].str.replace(r'(_)([\d]+)$',
-                                                '.\\2',
-                                                regex=True)
-
-        # Keep only the category number
-        df['value'] = df['value'].str[-1]
-
-        # Replace category code with lifecycle
-        df['lifecycle'] = df['value']
-        df['lifecycle'] = df['lifecycle'].str.replace(r'[123]',
-                                                      'lytic',
-                                                      regex=True)
-        df['lifecycle'] = df['lifecycle'].str.replace(r'[456]',
-                                                      'prophage',
-                                                      regex=True)
-
-        # Convert value to 1, 2, or 3
-        df['value'] = df['value'].str.replace('4', '1')
-        df['value'] = df['value'].str.replace('5', '2')
-        df['value'] = df['value'].str.replace('6', '3')
-
-        # Add constant columns
-        index_range = range(len(df.index))
-        df['tool'] = pd.Series([args.tool for x in index_range])
-        df['metagenome'] = pd.Series([args.metagenome for x in index_range])
-        df['prediction'] = pd.Series(['viral' for x in index_range])
-
-        # Add empty columns
-        df['stat'] = pd.Series([None for x in index_range], dtype=str)
-        df['stat_name'] = pd.Series([None for x in index_range], dtype=str)
-
-    else:  # Dataframe is empty, just output column names
-        for col in [
-                'tool', 'record', 'metagenome', 'prediction', 'lifecycle',
-                'value', 'stat', 'stat_name'
-        ]:
-
-            # pylint: disable=unsupported-assignment-operation
-            df[col] = pd.Series([], dtype=str)
+def reformat_virsorter(job: Job):
+    """ Reformat virsorter output, its directory of category FASTAs """
+
+    if os.path.isdir(job.file):
+        sequences = read_virsorter_fastas(job.file)
+    else:
+        sequences = read_virsorter_list(job.file)
+
+    # Lifecycle and category are those of the FASTA a sequence is in
+    rows = []
+    for name, category in sequences:
+        lifecycle, value = VIRSORTER_CATEGORIES.get(category, (None, None))
+        rows.append((virsorter_record(name), lifecycle, value))
+
+    df = pd.DataFrame(rows, columns=['record', 'lifecycle', 'value'])
+
+    # Add constant columns
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
+    df['prediction'] = 'viral'
+
+    # Add empty columns
+    df['stat'] = None
+    df['stat_name'] = None
 
     return df
 
 
 # --------------------------------------------------
-def reformat_virsorter2(args: Args):
-    """ Reformat virsorter2 output """
+def read_virsorter_fastas(pred_dir: str) -> Iterator[Tuple[str, str]]:
+    """ Read the name and category of each sequence from the headers of
+    the category FASTAs in VirSorter's Predicted_viral_sequences """
+
+    for category in VIRSORTER_CATEGORIES:
+        prefix = 'VIRSorter_' if category in '123' else 'VIRSorter_prophages_'
+        fasta = os.path.join(pred_dir, f'{prefix}cat-{category}.fasta')
+
+        # Categories without a FASTA have no sequences
+        if not os.path.isfile(fasta):
+            continue
+
+        with open(fasta, 'rt') as fh:
+            for line in fh:
+                if line.startswith('>'):
+                    name = line[1:].rstrip().replace('VIRSorter_', '', 1)
+                    yield name, category
+
+
+# --------------------------------------------------
+def read_virsorter_list(file: str) -> Iterator[Tuple[str, str]]:
+    """ Read the name and category of each sequence from a list of the
+    category FASTA headers, with a "sequences" header line, where the
+    category is at the end of each name """
+
+    with open(file, 'rt') as fh:
+        next(fh, None)
+        for line in fh:
+            name = line.rstrip()
+            if name:
+                yield name, name.rpartition('-cat_')[2][:1]
+
+
+# --------------------------------------------------
+def virsorter_record(name: str) -> str:
+    """ Original record name from VirSorter sequence name, which has
+    fragment and category information appended, and '.' replaced by '_' """
 
-    raw_df = pd.read_csv(args.file, sep='\t')
+    name = name.split('_Fragment', 1)[0]
+    head, sep, version = name.rpartition('_')
 
-    index_range = range(len(raw_df.index))
+    return f'{head}.{version}' if sep and version.isdecimal() else name
+
+
+# --------------------------------------------------
+def test_virsorter_record() -> None:
+    """ Test virsorter_record() """
+
+    assert virsorter_record(
+        'frag_4_NC_014099_1_Fragment_4_of_NC_014099_1_Sulfolobus_turreted'
+        '_icosahedral_virus_2__complete_genome-cat_2') == 'frag_4_NC_014099.1'
+    assert virsorter_record('k141_5989-cat_1') == 'k141_5989-cat.1'
+    assert virsorter_record('k141_') == 'k141_'
+
+
+# --------------------------------------------------
+def reformat_virsorter2(job: Job):
+    """ Reformat virsorter2 output """
+
+    raw_df = pd.read_csv(job.file, sep='\t')
 
     if len(raw_df) == 0:
         # pylint: disable=unsupported-assignment-operation
-        raw_df['max_score'] = pd.Series(['' for x in index_range], dtype=str)
+        raw_df['max_score'] = ''
 
     # Rename columns that are present
     # pylint: disable=no-member
@@ -389,14 +658,13 @@ def reformat_virsorter2(args: Args):
     df['record'] = df['record'].str.replace(r'[\|]{2}.*$', '', regex=True)
 
     # Add constant columns
-    index_range = range(len(df.index))
-    df['tool'] = pd.Series([args.tool for x in index_range], dtype=str)
-    df['metagenome'] = pd.Series([args.metagenome for x in index_range])
+    df['tool'] = job.tool
+    df['metagenome'] = job.metagenome
 
     # Add empty columns
-    df['stat'] = pd.Series([None for x in index_range], dtype=str)
-    df['stat_name'] = pd.Series([None for x in index_range], dtype=str)
-    df['lifecycle'] = pd.Series([None for x in index_range], dtype=str)
+    df['stat'] = None
+    df['stat_name'] = None
+    df['lifecycle'] = None
 
     return df
 
@@ -414,6 +682,14 @@ reformatters = {
     'virsorter2': reformat_virsorter2
 }
 
+# Tools giving a tab-separated row per contig, whose output is reformatted
+# a chunk of rows at a time
+row_formatters = {
+    'dvf': format_dvf,
+    'seeker': format_seeker,
+    'virfinder': format_virfinder
+}
+
 # --------------------------------------------------
 if __name__ == '__main__':
     main()
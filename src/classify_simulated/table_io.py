@@ -0,0 +1,288 @@
+"""
+Date   : 2026-10-17
+Purpose: Write tables as CSV, Parquet, or Feather, and read them in
+         whichever format they were written
+
+CSV is the default. Parquet and Feather files keep column types, are
+compressed, and can be read a few columns at a time, but need pyarrow.
+Readers tell the format from the first bytes of a file, so no step needs
+to be told the format of its input.
+"""
+
+import importlib.util
+import os
+from typing import Any, Iterator, List, Optional, TextIO
+import pandas as pd
+
+FORMATS = ['csv', 'parquet', 'feather']
+
+# First bytes of files of each columnar format. Feather (version 2) files
+# are Arrow IPC files
+MAGIC = {b'PAR1': 'parquet', b'ARROW1': 'feather', b'FEA1': 'feather'}
+
+
+# --------------------------------------------------
+def has_pyarrow() -> bool:
+    """ Check if pyarrow is installed, as needed by the columnar formats """
+
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+# --------------------------------------------------
+def format_error(fmt: str) -> Optional[str]:
+    """ Reason table format cannot be written, if any """
+
+    if fmt != 'csv' and not has_pyarrow():
+        return f'--format {fmt} requires pyarrow, which is not installed'
+
+    return None
+
+
+# --------------------------------------------------
+def with_format(filename: str, fmt: str) -> str:
+    """ Replace .csv extension of file name with that of format """
+
+    root, ext = os.path.splitext(filename)
+
+    return f'{root}.{fmt}' if ext == '.csv' else filename
+
+
+# --------------------------------------------------
+def test_with_format() -> None:
+    """ Test with_format() """
+
+    assert with_format('out/combined.csv', 'csv') == 'out/combined.csv'
+    assert with_format('out/combined.csv', 'parquet') == 'out/combined.parquet'
+    assert with_format('out/combined.csv', 'feather') == 'out/combined.feather'
+    assert with_format('out/combined', 'parquet') == 'out/combined'
+
+
+# --------------------------------------------------
+def detect_format(filename: str) -> str:
+    """ Format of table file, from its first bytes """
+
+    with open(filename, 'rb') as fh:
+        start = fh.read(6)
+
+    for magic, fmt in MAGIC.items():
+        if start.startswith(magic):
+            return fmt
+
+    return 'csv'
+
+
+# --------------------------------------------------
+def read_table(filename: str,
+               usecols: Optional[List[str]] = None,
+               **csv_args: Any) -> pd.DataFrame:
+    """ Read table of any format, optionally only some columns. Other
+    arguments are given to pd.read_csv() """
+
+    fmt = detect_format(filename)
+
+    if fmt == 'parquet':
+        return pd.read_parquet(filename, columns=usecols)
+
+    if fmt == 'feather':
+        return pd.read_feather(filename, columns=usecols)
+
+    return pd.read_csv(filename, usecols=usecols, **csv_args)
+
+
+# --------------------------------------------------
+def read_table_chunks(filename: str, chunk_size: int,
+                      **csv_args: Any) -> Iterator[pd.DataFrame]:
+    """ Read table of any format chunk_size rows at a time, except Feather
+    files, which are read a record batch at a time, as written. Other
+    arguments are given to pd.read_csv() """
+
+    fmt = detect_format(filename)
+
+    if fmt == 'csv':
+        yield from pd.read_csv(filename, chunksize=chunk_size, **csv_args)
+        return
+
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == 'parquet':
+        batches = pq.ParquetFile(filename).iter_batches(batch_size=chunk_size)
+        for batch in batches:
+            yield batch.to_pandas()
+    else:
+        with pa.memory_map(filename) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+
+
+# --------------------------------------------------
+def read_columns(filename: str) -> List[str]:
+    """ Read only the column names of table of any format """
+
+    fmt = detect_format(filename)
+
+    if fmt == 'csv':
+        return list(pd.read_csv(filename, nrows=0).columns)
+
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == 'parquet':
+        schema = pq.read_schema(filename)
+    else:
+        with pa.memory_map(filename) as source:
+            schema = pa.ipc.open_file(source).schema
+
+    return [name for name in schema.names if not name.startswith('__index')]
+
+
+# --------------------------------------------------
+def write_table(df: pd.DataFrame, filename: str, fmt: str) -> None:
+    """ Write table, without its index, in format """
+
+    if fmt == 'parquet':
+        df.to_parquet(filename, index=False)
+    elif fmt == 'feather':
+        df.reset_index(drop=True).to_feather(filename)
+    else:
+        df.to_csv(filename, index=False)
+
+
+# --------------------------------------------------
+def test_round_trip(tmp_path) -> None:
+    """ Test write_table() and read_table() """
+
+    df = pd.DataFrame({
+        'tool': pd.Categorical(['dvf', 'seeker']),
+        'record': ['frag_1', 'frag_2'],
+        'length': pd.array([500, None], dtype='Int64'),
+        'value': [0.5, 0.25]
+    })
+
+    for fmt in FORMATS if has_pyarrow() else ['csv']:
+        filename = str(tmp_path / f'table.{fmt}')
+        write_table(df.set_index('record', drop=False), filename, fmt)
+
+        assert detect_format(filename) == fmt
+        assert read_table(filename)['record'].tolist() == ['frag_1', 'frag_2']
+        assert read_columns(filename) == df.columns.tolist()
+        assert set(read_table(filename, usecols=['value', 'tool'])) == {
+            'tool', 'value'
+        }
+
+        # Columnar formats keep column types
+        if fmt != 'csv':
+            pd.testing.assert_frame_equal(read_table(filename), df)
+
+
+# --------------------------------------------------
+class TableWriter:
+    """ Table written a chunk of rows at a time. Columnar formats keep the
+    schema of the first chunk, and Feather files store categorical columns
+    as strings, since their categories can differ between chunks """
+
+    def __init__(self, filename: str, fmt: str, columns: List[str]) -> None:
+        self.filename = filename
+        self.fmt = fmt
+        self.columns = columns
+        self.out_fh: Optional[TextIO] = None
+        self.writer: Any = None
+        self.schema: Any = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        """ Write chunk of rows """
+
+        if self.fmt == 'csv':
+            header = self.out_fh is None
+            if self.out_fh is None:
+                self.out_fh = open(  # pylint: disable=consider-using-with
+                    self.filename, 'wt')
+            df.to_csv(self.out_fh, header=header, index=False)
+            return
+
+        # pylint: disable=import-outside-toplevel
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            fields = []
+            for field in schema:
+                if pa.types.is_dictionary(field.type):
+                    field = field.with_type(
+                        pa.dictionary(pa.int32(), pa.string()) if self.fmt ==
+                        'parquet' else pa.string())
+                fields.append(field)
+            self.schema = pa.schema(fields, metadata=schema.metadata)
+
+            if self.fmt == 'parquet':
+                self.writer = pq.ParquetWriter(self.filename, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(
+                    self.filename,
+                    self.schema,
+                    options=pa.ipc.IpcWriteOptions(compression='lz4'))
+
+        self.writer.write_table(
+            pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def close(self) -> None:
+        """ Finish file, writing just the columns if there were no rows """
+
+        if self.out_fh is not None:
+            self.out_fh.close()
+        elif self.writer is not None:
+            self.writer.close()
+        else:
+            write_table(pd.DataFrame(columns=self.columns), self.filename,
+                        self.fmt)
+
+    def __enter__(self) -> 'TableWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --------------------------------------------------
+def test_table_writer(tmp_path) -> None:
+    """ Test TableWriter """
+
+    chunks = [
+        pd.DataFrame({
+            'tool': pd.Categorical(['dvf', 'dvf']),
+            'value': [0.5, 0.25]
+        }),
+        pd.DataFrame({
+            'tool': pd.Categorical(['seeker']),
+            'value': [1.0]
+        })
+    ]
+
+    for fmt in FORMATS if has_pyarrow() else ['csv']:
+        filename = str(tmp_path / f'table.{fmt}')
+        with TableWriter(filename, fmt, ['tool', 'value']) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+
+        df = read_table(filename)
+        assert df['tool'].astype(str).tolist() == ['dvf', 'dvf', 'seeker']
+        assert df['value'].tolist() == [0.5, 0.25, 1.0]
+
+        # Chunks are no longer than asked for
+        sizes = [len(chunk) for chunk in read_table_chunks(filename, 2)]
+        assert sum(sizes) == 3 and max(sizes) <= 2
+
+        # Only columns are written if there are no rows
+        filename = str(tmp_path / f'empty.{fmt}')
+        with TableWriter(filename, fmt, ['tool', 'value']):
+            pass
+
+        df = read_table(filename)
+        assert df.columns.tolist() == ['tool', 'value'] and df.empty
+
+    with open(tmp_path / 'table.csv') as fh:
+        assert fh.read() == 'tool,value\ndvf,0.5\ndvf,0.25\nseeker,1.0\n'
@@ -0,0 +1,338 @@
+"""
+Date   : 2026-10-17
+Purpose: Index FASTA files and fetch subsequences by seeking into them
+
+The index is the same as that of `samtools faidx`: one line per record,
+with tab-separated name, length, offset of the first base, bases per line,
+and bytes per line.
+"""
+
+import io
+import os
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, TextIO
+
+
+class FaiRecord(NamedTuple):
+    """ Location of a sequence within a FASTA file """
+    name: str
+    length: int
+    offset: int
+    line_bases: int
+    line_width: int
+
+
+# --------------------------------------------------
+def build_index(fh: BinaryIO) -> List[FaiRecord]:
+    """ Index all records of a FASTA file """
+
+    records: List[FaiRecord] = []
+    name: Optional[str] = None
+    offset = length = line_bases = line_width = 0
+    last_line = False
+    pos = 0
+
+    for line in fh:
+        if line.startswith(b'>'):
+            if name is not None:
+                records.append(
+                    FaiRecord(name, length, offset, line_bases, line_width))
+
+            header = line[1:].split(None, 1)
+            name = header[0].decode() if header else ''
+            offset = pos + len(line)
+            length = line_bases = line_width = 0
+            last_line = False
+
+        elif name is not None:
+            n_bases = len(line.rstrip(b'\r\n'))
+
+            if n_bases > 0 and last_line:
+                raise ValueError(
+                    f'Different line length in sequence "{name}"')
+
+            if line_bases == 0:
+                line_bases, line_width = n_bases, len(line)
+
+            # Only the last line of a sequence may be shorter
+            elif n_bases != line_bases or len(line) != line_width:
+                last_line = True
+
+            length += n_bases
+
+        pos += len(line)
+
+    if name is not None:
+        records.append(FaiRecord(name, length, offset, line_bases,
+                                 line_width))
+
+    return records
+
+
+# --------------------------------------------------
+def test_build_index() -> None:
+    """ Test build_index() """
+
+    fasta = b'>seq_1 First\nACGT\nACGT\nAC\n>seq_2\nAAA\n>empty\n'
+    assert build_index(io.BytesIO(fasta)) == [
+        FaiRecord('seq_1', 10, 13, 4, 5),
+        FaiRecord('seq_2', 3, 33, 3, 4),
+        FaiRecord('empty', 0, 44, 0, 0)
+    ]
+
+    # Windows line endings
+    fasta = b'>seq_1\r\nACG\r\nA\r\n'
+    assert build_index(io.BytesIO(fasta)) == [FaiRecord('seq_1', 4, 8, 3, 5)]
+
+    # Lines of uneven length cannot be indexed
+    try:
+        build_index(io.BytesIO(b'>seq_1\nAC\nA\nAC\n'))
+        assert False
+    except ValueError as err:
+        assert str(err) == 'Different line length in sequence "seq_1"'
+
+
+# --------------------------------------------------
+def write_index(records: List[FaiRecord], out_fh: TextIO) -> None:
+    """ Write index in .fai format """
+
+    for record in records:
+        print(*record, sep='\t', file=out_fh)
+
+
+# --------------------------------------------------
+def read_records(fh: TextIO) -> List[FaiRecord]:
+    """ Read .fai index records in the order of the file """
+
+    records = []
+
+    for line in fh:
+        name, *fields = line.rstrip('\n').split('\t')[:5]
+        length, offset, line_bases, line_width = map(int, fields)
+        records.append(
+            FaiRecord(name, length, offset, line_bases, line_width))
+
+    return records
+
+
+# --------------------------------------------------
+def read_index(fh: TextIO) -> Dict[str, FaiRecord]:
+    """ Read .fai index into dictionary keyed by sequence name """
+
+    return {record.name: record for record in read_records(fh)}
+
+
+# --------------------------------------------------
+def test_read_index() -> None:
+    """ Test read_records(), read_index(), and write_index() """
+
+    records = [FaiRecord('seq_1', 10, 13, 4, 5), FaiRecord('a b', 0, 9, 0, 0)]
+    out_fh = io.StringIO()
+    write_index(records, out_fh)
+
+    assert out_fh.getvalue() == 'seq_1\t10\t13\t4\t5\na b\t0\t9\t0\t0\n'
+    assert read_records(io.StringIO(out_fh.getvalue())) == records
+    assert read_index(io.StringIO(out_fh.getvalue())) == {
+        'seq_1': records[0],
+        'a b': records[1]
+    }
+
+
+# --------------------------------------------------
+def load_index(filename: str) -> List[FaiRecord]:
+    """ Read index of FASTA file from filename.fai, first building and
+    saving it if missing or older than the FASTA """
+
+    index_file = filename + '.fai'
+
+    if os.path.isfile(index_file) and \
+            os.path.getmtime(index_file) >= os.path.getmtime(filename):
+        with open(index_file, 'rt') as index_fh:
+            return read_records(index_fh)
+
+    with open(filename, 'rb') as fasta_fh:
+        records = build_index(fasta_fh)
+
+    # Index is written under a temporary name so concurrent readers never
+    # see it partly written. It is only kept in memory if it cannot be saved
+    tmp_file = f'{index_file}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_file, 'wt') as out_fh:
+            write_index(records, out_fh)
+        os.replace(tmp_file, index_file)
+    except OSError:
+        if os.path.isfile(tmp_file):
+            os.remove(tmp_file)
+
+    return records
+
+
+# --------------------------------------------------
+def test_load_index(tmp_path) -> None:
+    """ Test load_index() """
+
+    fasta = tmp_path / 'frags.fasta'
+    fasta.write_bytes(b'>frag_1 First\nACGT\n>frag_2\nGG\n')
+    index_file = tmp_path / 'frags.fasta.fai'
+
+    records = load_index(str(fasta))
+    assert records == [
+        FaiRecord('frag_1', 4, 14, 4, 5),
+        FaiRecord('frag_2', 2, 27, 2, 3)
+    ]
+    assert index_file.read_text() == ('frag_1\t4\t14\t4\t5\n'
+                                      'frag_2\t2\t27\t2\t3\n')
+
+    # Saved index is used
+    index_file.write_text('frag_3\t4\t14\t4\t5\n')
+    os.utime(fasta, (0, 0))
+    assert load_index(str(fasta)) == [FaiRecord('frag_3', 4, 14, 4, 5)]
+
+    # Index older than FASTA is rebuilt
+    os.utime(index_file, (0, 0))
+    os.utime(fasta)
+    assert load_index(str(fasta)) == records
+
+    # Records of the same name are all kept, whether built or saved
+    fasta.write_bytes(b'>frag_1\nACGT\n>frag_1\nGG\n>frag_2\nT\n')
+    os.remove(index_file)
+    records = load_index(str(fasta))
+    assert [record.name for record in records] == [
+        'frag_1', 'frag_1', 'frag_2'
+    ]
+    assert load_index(str(fasta)) == records
+
+
+# --------------------------------------------------
+def fetch(fh: BinaryIO, record: FaiRecord, start: int, end: int) -> bytes:
+    """ Read bases start (0-based) up to end of an indexed sequence """
+
+    start = max(0, start)
+    end = min(end, record.length)
+
+    if start >= end:
+        return b''
+
+    def locate(pos: int) -> int:
+        """ File offset of base at pos """
+        lines, col = divmod(pos, record.line_bases)
+        return record.offset + lines * record.line_width + col
+
+    first = locate(start)
+    fh.seek(first)
+
+    return fh.read(locate(end) - first).translate(None, b'\r\n')
+
+
+# --------------------------------------------------
+def test_fetch() -> None:
+    """ Test fetch() """
+
+    fasta = b'>seq_1 First\nACGT\nTGCA\nAC\n>seq_2\r\nGGG\r\nT\r\n'
+    fh = io.BytesIO(fasta)
+    index = build_index(fh)
+    seq_1, seq_2 = index[0], index[1]
+
+    assert fetch(fh, seq_1, 0, 10) == b'ACGTTGCAAC'
+    assert fetch(fh, seq_1, 3, 5) == b'TT'
+    assert fetch(fh, seq_1, 4, 8) == b'TGCA'
+    assert fetch(fh, seq_1, 8, 20) == b'AC'
+    assert fetch(fh, seq_1, 5, 5) == b''
+    assert fetch(fh, seq_2, 0, 4) == b'GGGT'
+    assert fetch(fh, seq_2, 2, 4) == b'GT'
+
+
+# --------------------------------------------------
+def fetch_title(fh: BinaryIO, record: FaiRecord) -> bytes:
+    """ Read header line (without ">") of an indexed sequence """
+
+    # Header is the line before the first base, read backwards in
+    # growing windows until its start is found
+    size = 256
+    while True:
+        start = max(0, record.offset - size)
+        fh.seek(start)
+        text = fh.read(record.offset - start)
+        line_start = text.rfind(b'\n', 0, len(text) - 1) + 1
+
+        if line_start > 0 or start == 0:
+            return text[line_start + 1:].rstrip()
+
+        size *= 4
+
+
+# --------------------------------------------------
+def test_fetch_title() -> None:
+    """ Test fetch_title() """
+
+    fasta = (b'>seq_1 First\nACGT\nTGCA\nAC\n'
+             b'>seq_2 ' + b'x' * 300 + b'\r\nGG\n')
+    fh = io.BytesIO(fasta)
+    index = build_index(fh)
+    seq_1, seq_2 = index[0], index[1]
+
+    assert fetch_title(fh, seq_1) == b'seq_1 First'
+    assert fetch_title(fh, seq_2) == b'seq_2 ' + b'x' * 300
+
+
+# --------------------------------------------------
+class IndexedFasta:
+    """ FASTA file whose sequences can be fetched by name and position """
+
+    def __init__(self, filename: str, index_file: Optional[str] = None):
+        if index_file is None:
+            index_file = filename + '.fai'
+
+        if os.path.isfile(index_file):
+            with open(index_file, 'rt') as index_fh:
+                self.index = read_index(index_fh)
+        else:
+            with open(filename, 'rb') as fasta_fh:
+                self.index = {
+                    record.name: record
+                    for record in build_index(fasta_fh)
+                }
+
+        self.fh = open(filename, 'rb')  # pylint: disable=consider-using-with
+
+    def fetch(self, name: str, start: int, end: int) -> bytes:
+        """ Read bases start (0-based) up to end of sequence name """
+
+        if name not in self.index:
+            raise KeyError(f'Sequence "{name}" not in index')
+
+        return fetch(self.fh, self.index[name], start, end)
+
+    def close(self) -> None:
+        """ Close FASTA file """
+        self.fh.close()
+
+    def __enter__(self) -> 'IndexedFasta':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --------------------------------------------------
+def test_indexed_fasta(tmp_path) -> None:
+    """ Test IndexedFasta """
+
+    fasta = tmp_path / 'genome.fasta'
+    fasta.write_bytes(b'>seq_1 First\nACGT\nTGCA\nAC\n>seq_2\nGGG\n')
+
+    # Index is built when there is no .fai
+    with IndexedFasta(str(fasta)) as genome:
+        assert genome.fetch('seq_1', 2, 6) == b'GTTG'
+        assert genome.fetch('seq_2', 0, 3) == b'GGG'
+
+    index_file = tmp_path / 'genome.idx'
+    with open(index_file, 'wt') as out_fh:
+        write_index([FaiRecord('seq_3', 4, 13, 4, 5)], out_fh)
+
+    with IndexedFasta(str(fasta), str(index_file)) as genome:
+        assert genome.fetch('seq_3', 0, 4) == b'ACGT'
+        try:
+            genome.fetch('seq_1', 0, 4)
+            assert False
+        except KeyError:
+            pass
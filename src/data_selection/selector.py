@@ -6,21 +6,74 @@ Purpose: Select genome fragments for analysis
 """
 
 import argparse
+import contextlib
+import csv
 import fnmatch
+import functools
+import io
+import multiprocessing as mp
 import os
 import random
+import shutil
 import sys
-from Bio import SeqIO
-from typing import NamedTuple
+from typing import (Callable, Dict, Iterator, List, NamedTuple, Optional,
+                    Set, TextIO, Tuple, Union)
+from compressed_io import (compressed_name, is_gzipped, open_input,
+                           open_output)
+from faidx import FaiRecord, IndexedFasta, fetch, fetch_title, load_index
+from fasta_io import FastaRecord, FastaWriter, read_ids, read_records
 
 
 class Args(NamedTuple):
     """ Command-line arguments """
     dir: str
     num: int
-    seed: bool
+    seed: Optional[int]
     out: str
     replace: bool
+    compress: bool
+    tree: bool
+    quotas: Dict[Tuple[str, str], int]
+    workers: int
+
+
+# --------------------------------------------------
+class FragCoords(NamedTuple):
+    """ Fragment written by chopper.py in coordinate mode """
+    id: str
+    name: str
+    parent_id: str
+    start: int
+    end: int
+    parent_file: str
+
+
+# --------------------------------------------------
+class RecordPos(NamedTuple):
+    """ Record of compressed FASTA, which cannot be indexed, by its place
+    in the file """
+    id: str
+    position: int
+
+
+# Where a fragment is, in a FASTA file or its parent genome
+Frag = Union[FaiRecord, RecordPos, FragCoords]
+
+
+# --------------------------------------------------
+class Stratum(NamedTuple):
+    """ Directory of fragment files to select from """
+    in_dir: str
+    out_dir: str
+    num: int
+
+
+# --------------------------------------------------
+class Settings(NamedTuple):
+    """ Selection settings shared by all strata """
+    seed: Optional[int]
+    replace: bool
+    compress: bool
 
 
 # --------------------------------------------------
@@ -57,10 +110,43 @@ def get_args() -> Args:
                         action='store_true')
 
     parser.add_argument('-s',
-                        '--seed',
-                        help='Use seed to fix randomness',
+                        help='Use seed 123 to fix selection',
+                        dest='seed',
+                        action='store_const',
+                        const=123)
+
+    parser.add_argument('--seed',
+                        help='Random seed to fix selection',
+                        metavar='int',
+                        type=int)
+
+    parser.add_argument('-z',
+                        '--compress',
+                        help='Write BGZF compressed output',
+                        action='store_true')
+
+    parser.add_argument('-t',
+                        '--tree',
+                        help='Select from each directory {kingdom}/{length}'
+                        ' in dir, writing to the same path in --out',
                         action='store_true')
 
+    parser.add_argument('-q',
+                        '--quotas',
+                        help='With --tree, tab-separated file with columns'
+                        ' kingdom, length, and num of the directories to'
+                        ' select from',
+                        metavar='file',
+                        type=argparse.FileType('rt'))
+
+    parser.add_argument('-w',
+                        '--workers',
+                        help='Number of directories to select from in'
+                        ' parallel with --tree',
+                        metavar='int',
+                        type=int,
+                        default=1)
+
     args = parser.parse_args()
 
     if not os.path.isdir(args.dir):
@@ -70,8 +156,26 @@ def get_args() -> Args:
         parser.error(f'Number of fragments ({args.num})'
                      f' must be greater than 0')
 
-    return Args(args.dir, args.num, args.seed,
-                args.out, args.replace)
+    if args.workers <= 0:
+        parser.error(f'workers "{args.workers}" must be greater than 0')
+
+    quotas = {}
+    if args.quotas:
+        if not args.tree:
+            parser.error('--quotas requires --tree')
+        try:
+            quotas = read_quotas(args.quotas)
+        except ValueError as err:
+            parser.error(str(err))
+        args.quotas.close()
+
+        for kingdom, length in quotas:
+            if not os.path.isdir(os.path.join(args.dir, kingdom, length)):
+                parser.error(f'Directory "{kingdom}/{length}" in --quotas'
+                             f' does not exist in "{args.dir}".')
+
+    return Args(args.dir, args.num, args.seed, args.out, args.replace,
+                args.compress, args.tree, quotas, args.workers)
 
 
 # --------------------------------------------------
@@ -79,28 +183,182 @@ def main() -> None:
     """ Where the magic happens """
 
     args = get_args()
-    in_dir = args.dir
-    num_frags = args.num
-    out_dir = args.out
-    replacement = args.replace
 
-    if not os.path.isdir(out_dir):
-        os.makedirs(out_dir)
+    if args.tree:
+        strata = get_strata(args.dir, args.out, args.num, args.quotas)
+    else:
+        strata = [Stratum(args.dir, args.out, args.num)]
+
+    select_one = functools.partial(select_stratum,
+                                   settings=Settings(args.seed, args.replace,
+                                                     args.compress))
+
+    n_total = 0
+    for (n_rec, out_file), err in run_strata(select_one, strata,
+                                             args.workers):
+        sys.stderr.write(err)
+        n_total += n_rec
+
+        if args.tree:
+            print(f'Wrote {n_rec} records to {out_file}.')
+        else:
+            print(f'Done. Wrote {n_rec} records to {out_file}.')
 
-    if args.seed:
-        random.seed(123)
+    if args.tree:
+        print(f'Done. Wrote {n_total} records from {len(strata)}'
+              f' directories to {args.out}.')
 
-    filenames = os.listdir(in_dir)
-    filepaths = [os.path.join(in_dir, fn) for fn in filenames]
-    frag_files = [fn for fn in filepaths if fnmatch.fnmatch(fn, '*.fasta')]
 
-    chosen_frags = select_frags(frag_files, num_frags, replacement)
+# --------------------------------------------------
+def read_quotas(fh: TextIO) -> Dict[Tuple[str, str], int]:
+    """ Read number of fragments to select from each directory """
+
+    quotas = {}
+
+    for row in csv.DictReader(fh, delimiter='\t'):
+        try:
+            stratum = (row['kingdom'], row['length'])
+            num = int(row['num'])
+        except (KeyError, TypeError, ValueError) as err:
+            raise ValueError(
+                f'Quotas must have columns kingdom, length, and num with'
+                f' whole numbers, bad row: {row}') from err
+
+        if num <= 0:
+            raise ValueError(f'Number of fragments ({num}) for'
+                             f' "{"/".join(stratum)}" must be greater than 0')
+        quotas[stratum] = num
+
+    return quotas
+
+
+# --------------------------------------------------
+def test_read_quotas() -> None:
+    """ Test read_quotas() """
+
+    quotas = io.StringIO('kingdom\tlength\tnum\n'
+                         'archaea\t500\t10\n'
+                         'viral\t1000\t20\n')
+    assert read_quotas(quotas) == {
+        ('archaea', '500'): 10,
+        ('viral', '1000'): 20
+    }
+
+    for bad in ['kingdom\tnum\narchaea\t10\n',
+                'kingdom\tlength\tnum\narchaea\t500\tmany\n',
+                'kingdom\tlength\tnum\narchaea\t500\t0\n']:
+        try:
+            read_quotas(io.StringIO(bad))
+            assert False
+        except ValueError:
+            pass
+
+
+# --------------------------------------------------
+def get_strata(in_dir: str, out_dir: str, num: int,
+               quotas: Dict[Tuple[str, str], int]) -> List[Stratum]:
+    """ Find fragment directories {kingdom}/{length}, or those in quotas,
+    with the number of fragments to select from each """
+
+    if not quotas:
+        quotas = {(kingdom, length): num
+                  for kingdom in list_dirs(in_dir)
+                  for length in list_dirs(os.path.join(in_dir, kingdom))}
+
+    return [
+        Stratum(os.path.join(in_dir, kingdom, length),
+                os.path.join(out_dir, kingdom, length), num)
+        for (kingdom, length), num in quotas.items()
+    ]
+
+
+# --------------------------------------------------
+def list_dirs(parent: str) -> List[str]:
+    """ Sorted names of directories in parent """
+
+    return sorted(entry.name for entry in os.scandir(parent)
+                  if entry.is_dir())
+
+
+# --------------------------------------------------
+def test_get_strata() -> None:
+    """ Test get_strata() """
+
+    in_dir = 'tests/inputs/chopped'
+    strata = get_strata(in_dir, 'out', 4, {})
+
+    assert strata[0] == Stratum(f'{in_dir}/archaea/10', 'out/archaea/10', 4)
+    assert len(strata) == len(
+        [length for kingdom in os.listdir(in_dir)
+         for length in os.listdir(os.path.join(in_dir, kingdom))])
+
+    assert get_strata(in_dir, 'out', 4, {('viral', '5'): 2}) == [
+        Stratum(f'{in_dir}/viral/5', 'out/viral/5', 2)
+    ]
+
+
+# --------------------------------------------------
+def run_strata(
+        func: Callable[[Stratum], Tuple[int, str]], strata: List[Stratum],
+        workers: int) -> Iterator[Tuple[Tuple[int, str], str]]:
+    """ Select from each stratum, in a pool of workers if more than one,
+    yielding results in order with the warnings printed making them """
+
+    if workers == 1:
+        for stratum in strata:
+            yield func(stratum), ''
+        return
+
+    with mp.Pool(min(workers, len(strata))) as pool:
+        yield from pool.imap(functools.partial(capture_stderr, func), strata)
+
+
+# --------------------------------------------------
+def capture_stderr(func: Callable[[Stratum], Tuple[int, str]],
+                   stratum: Stratum) -> Tuple[Tuple[int, str], str]:
+    """ Run func in a worker, also returning what it printed to STDERR """
 
-    out_file = os.path.join(out_dir, 'selected_frags.fasta')
+    err = io.StringIO()
 
-    n_rec = SeqIO.write(chosen_frags, out_file, 'fasta')
+    with contextlib.redirect_stderr(err):
+        result = func(stratum)
 
-    print(f'Done. Wrote {n_rec} records to {out_file}.')
+    return result, err.getvalue()
+
+
+# --------------------------------------------------
+def select_stratum(stratum: Stratum, settings: Settings) -> Tuple[int, str]:
+    """ Select fragments from one directory, return number written and
+    output file """
+
+    # Each stratum is selected from as by its own run, so selections are
+    # the same whichever worker makes them
+    random.seed(settings.seed)
+
+    if not os.path.isdir(stratum.out_dir):
+        os.makedirs(stratum.out_dir)
+
+    # Directory listing order varies, so files are sorted for selections to
+    # be the same with the same seed
+    filenames = sorted(os.listdir(stratum.in_dir))
+    filepaths = [os.path.join(stratum.in_dir, fn) for fn in filenames]
+    frag_files = [
+        fn for fn in filepaths
+        if fnmatch.fnmatch(fn, '*.fasta') or fnmatch.fnmatch(fn, '*.fasta.gz')
+        or is_coords_file(fn)
+    ]
+
+    chosen_frags = select_frags(frag_files, stratum.num, settings.replace)
+
+    out_file = compressed_name(
+        os.path.join(stratum.out_dir, 'selected_frags.fasta'),
+        settings.compress)
+
+    with open_output(out_file, 'wb') as out_fh, \
+            FastaWriter(out_fh) as writer:
+        n_rec = writer.write_records(chosen_frags)
+
+    return n_rec, out_file
 
 
 # --------------------------------------------------
@@ -117,43 +375,46 @@ def die(msg='Error') -> None:
 
 
 # --------------------------------------------------
-def select_frags(frag_files, num_frags, replacement) -> list:
+def select_frags(frag_files: List[str], num_frags: int,
+                 replacement: bool) -> List[FastaRecord]:
     """ Make fragment selection """
 
-    # Initially choose a number of files equal to number of fragments
-    chosen_files = select_files(frag_files, num_frags, replacement)
-
-    # Lists for chosen fragments and their id's for list comparison
-    chosen_frags = []
-    chosen_frag_ids = []
-
-    for fh in chosen_files:
+    sampler = FragSampler()
+    chosen: List[Tuple[str, Frag]] = []
 
-        # Randomly select fragments from each file, without repeats
-        chosen_frags, chosen_frag_ids, _ = check_frags(fh,
-                                                       chosen_frags,
-                                                       chosen_frag_ids)
+    # Initially choose a number of files equal to number of fragments,
+    # drawing one fragment from each
+    for filename in select_files(frag_files, num_frags, replacement):
+        frag = sampler.draw(filename)
+        if frag is not None:
+            chosen.append((filename, frag))
 
-    # Use variable to track files whose fragments have not been exhausted
-    unexhausted_files = frag_files
+    # Files whose fragments have not been exhausted
+    unexhausted_files = [
+        filename for filename in frag_files if not sampler.exhausted(filename)
+    ]
 
-    while len(chosen_frag_ids) < num_frags and replacement:
+    while len(chosen) < num_frags and replacement:
 
-        fh = random.choice(unexhausted_files)
+        if not unexhausted_files:
+            warn(f'Directory does not have {num_frags} unique fragments. '
+                 f'Returning {len(chosen)} fragments.')
+            break
 
-        chosen_frags, chosen_frag_ids, exhausted = check_frags(fh,
-                                                               chosen_frags,
-                                                               chosen_frag_ids)
+        n_file = random.randrange(len(unexhausted_files))
+        filename = unexhausted_files[n_file]
+        frag = sampler.draw(filename)
 
-        if exhausted:
-            unexhausted_files.remove(fh)
+        if frag is not None:
+            chosen.append((filename, frag))
 
-        if len(unexhausted_files) == 0:
-            warn(f'Directory does not have {num_frags} unique fragments. '
-                 f'Returning {len(chosen_frag_ids)} fragments.')
-            break
+        # Exhausted file is swapped with the last one to remove it in O(1)
+        if sampler.exhausted(filename):
+            unexhausted_files[n_file] = unexhausted_files[-1]
+            unexhausted_files.pop()
 
-    return chosen_frags
+    # Sequences are only read once all fragments are chosen
+    return fetch_frags(chosen)
 
 
 # --------------------------------------------------
@@ -179,29 +440,266 @@ def select_files(frag_files, num_frags, replacement) -> list:
 
 
 # --------------------------------------------------
-def check_frags(fh, chosen_frags, chosen_frag_ids) -> tuple:
-    """ Try to find unique frag in file """
+class FragSampler:
+    """ Draws fragments from files without replacement. Each file's
+    fragments are shuffled lazily, one position per draw, so a draw takes
+    constant time and a file is known to be exhausted once all of its
+    fragments are drawn. Where the fragments of each file drawn from are
+    is kept for the life of the sampler, one stratum """
 
-    frag_recs = []
+    def __init__(self) -> None:
+        self.frags: Dict[str, List[Frag]] = {}
+        # Positions of a partial Fisher-Yates shuffle that were swapped
+        self.swaps: Dict[str, Dict[int, int]] = {}
+        self.n_drawn: Dict[str, int] = {}
+        self.chosen_ids: Set[str] = set()
 
-    for seq_record in SeqIO.parse(fh, 'fasta'):
-        frag_recs.append(seq_record)
+    def get_frags(self, filename: str) -> List[Frag]:
+        """ Where the fragments of file are, read the first time """
 
-    if all(frag.id in chosen_frag_ids for frag in frag_recs):
-        exhausted = True
-        return chosen_frags, chosen_frag_ids, exhausted
+        if filename not in self.frags:
+            self.frags[filename] = read_frags(filename)
 
-    exhausted = False
+        return self.frags[filename]
 
-    chosen_frag = random.choice(frag_recs)
+    def draw(self, filename: str) -> Optional[Frag]:
+        """ Draw fragment not yet chosen from file, None if exhausted """
 
-    while chosen_frag.id in chosen_frag_ids:
-        chosen_frag = random.choice(frag_recs)
+        frags = self.get_frags(filename)
+        swaps = self.swaps.setdefault(filename, {})
+        n_drawn = self.n_drawn.get(filename, 0)
 
-    chosen_frags.append(chosen_frag)
-    chosen_frag_ids.append(chosen_frag.id)
+        while n_drawn < len(frags):
+            pick = random.randrange(n_drawn, len(frags))
+            frag = frags[swaps.get(pick, pick)]
+            swaps[pick] = swaps.pop(n_drawn, n_drawn)
+            n_drawn += 1
+            self.n_drawn[filename] = n_drawn
 
-    return chosen_frags, chosen_frag_ids, exhausted
+            # Fragment IDs may be repeated in other files
+            frag_id = get_frag_id(frag)
+            if frag_id not in self.chosen_ids:
+                self.chosen_ids.add(frag_id)
+                return frag
+
+        return None
+
+    def exhausted(self, filename: str) -> bool:
+        """ Check if all fragments of file were drawn. Files not drawn from
+        are not read """
+
+        return filename in self.n_drawn and \
+            self.n_drawn[filename] == len(self.get_frags(filename))
+
+
+# --------------------------------------------------
+def test_frag_sampler(tmp_path) -> None:
+    """ Test FragSampler """
+
+    fasta = tmp_path / 'frags.fasta'
+    fasta.write_bytes(b''.join(f'>frag_{i}\nACGT\n'.encode()
+                               for i in range(1, 6)))
+    other = tmp_path / 'other.fasta'
+    other.write_bytes(b'>frag_1\nACGT\n>frag_6\nACGT\n')
+
+    sampler = FragSampler()
+    random.seed(1)
+    drawn = [sampler.draw(str(fasta)) for _ in range(5)]
+
+    assert not sampler.exhausted(str(other))
+
+    # All fragments are drawn once, in random order
+    ids = [get_frag_id(frag) for frag in drawn if frag]
+    assert sorted(ids) == [f'frag_{i}' for i in range(1, 6)]
+    assert ids != sorted(ids)
+    assert sampler.exhausted(str(fasta))
+    assert sampler.draw(str(fasta)) is None
+
+    # Fragments already chosen from other files are skipped
+    frag = sampler.draw(str(other))
+    assert frag and get_frag_id(frag) == 'frag_6'
+    assert sampler.draw(str(other)) is None
+    assert sampler.exhausted(str(other))
+
+    # Same seed, same draws
+    sampler = FragSampler()
+    random.seed(1)
+    assert [sampler.draw(str(fasta)) for _ in range(5)] == drawn
+
+
+# --------------------------------------------------
+def is_coords_file(filename: str) -> bool:
+    """ Check if file has fragment coordinates with a genome index """
+
+    return filename.endswith(('_frags.tsv', '_frags.tsv.gz')) and \
+        os.path.isfile(get_index_file(filename))
+
+
+# --------------------------------------------------
+def get_index_file(filename: str) -> str:
+    """ Get .fai index file written with fragment coordinates """
+
+    if filename.endswith('.gz'):
+        filename = filename[:-len('.gz')]
+
+    return os.path.splitext(filename)[0] + '.fai'
+
+
+# --------------------------------------------------
+def test_is_coords_file() -> None:
+    """ Test is_coords_file() """
+
+    in_dir = 'tests/inputs/coords/archaea/50'
+    assert is_coords_file(f'{in_dir}/archaea_1_genomic_frags.tsv')
+    assert not is_coords_file(f'{in_dir}/archaea_1_genomic_frags.fai')
+
+    # Coordinates written with sequences have no index
+    in_dir = 'tests/inputs/chopped/archaea/50'
+    assert not is_coords_file(f'{in_dir}/archaea_1_genomic_frags.tsv')
+
+
+# --------------------------------------------------
+def read_frags(filename: str) -> List[Frag]:
+    """ Read where fragments are in a file: from the index of a FASTA file,
+    or as coordinates from .tsv. Compressed FASTA cannot be indexed, so
+    only the ID of each record is kept, with its place in the file """
+
+    if is_coords_file(filename):
+        with open_input(filename) as fh:
+            return [
+                FragCoords(row['id'], row['name'], row['parent_id'],
+                           int(row['frag_start']), int(row['frag_end']),
+                           row['parent_file'])
+                for row in csv.DictReader(fh, delimiter='\t')
+            ]
+
+    if is_gzipped(filename):
+        with open_input(filename, 'rb') as fh:
+            return [
+                RecordPos(frag_id, index)
+                for index, frag_id in enumerate(read_ids(fh))
+            ]
+
+    return list(load_index(filename))
+
+
+# --------------------------------------------------
+def get_frag_id(frag: Frag) -> str:
+    """ Get ID of fragment """
+
+    return frag.name if isinstance(frag, FaiRecord) else frag.id
+
+
+# --------------------------------------------------
+def fetch_frags(chosen: List[Tuple[str, Frag]]) -> List[FastaRecord]:
+    """ Read records of chosen fragments, in the order chosen, reading the
+    fragments of each file together """
+
+    places: Dict[str, List[int]] = {}
+    for i, (filename, _) in enumerate(chosen):
+        places.setdefault(filename, []).append(i)
+
+    records: List[FastaRecord] = [FastaRecord('', '', b'')] * len(chosen)
+    for filename, positions in places.items():
+        fetched = fetch_file_frags(filename, [chosen[i][1] for i in positions])
+        for i, record in zip(positions, fetched):
+            records[i] = record
+
+    return records
+
+
+# --------------------------------------------------
+def fetch_file_frags(filename: str, frags: List[Frag]) -> List[FastaRecord]:
+    """ Read records of fragments of one file: from the FASTA file, by
+    their offsets or by one pass through compressed FASTA, or their
+    sequences from their parent genomes """
+
+    if isinstance(frags[0], RecordPos):
+        wanted = {
+            frag.position: n
+            for n, frag in enumerate(frags) if isinstance(frag, RecordPos)
+        }
+        records = [FastaRecord('', '', b'')] * len(frags)
+        with open_input(filename, 'rb') as fh:
+            for index, record in enumerate(read_records(fh)):
+                if index in wanted:
+                    records[wanted.pop(index)] = record
+                    if not wanted:
+                        break
+        return records
+
+    if isinstance(frags[0], FaiRecord):
+        with open(filename, 'rb') as fh:
+            return [
+                FastaRecord(frag.name,
+                            fetch_title(fh, frag).decode(),
+                            fetch(fh, frag, 0, frag.length))
+                for frag in frags if isinstance(frag, FaiRecord)
+            ]
+
+    # Each parent genome is opened, and its index read, once for all of
+    # its fragments
+    records = []
+    with contextlib.ExitStack() as stack:
+        genomes: Dict[str, IndexedFasta] = {}
+        for frag in frags:
+            if not isinstance(frag, FragCoords):
+                continue
+
+            if frag.parent_file not in genomes:
+                genomes[frag.parent_file] = stack.enter_context(
+                    IndexedFasta(
+                        os.path.join(os.path.dirname(filename),
+                                     frag.parent_file),
+                        get_index_file(filename)))
+
+            seq = genomes[frag.parent_file].fetch(frag.parent_id,
+                                                  frag.start - 1, frag.end)
+            records.append(
+                FastaRecord(frag.id, f'{frag.id} {frag.name}', seq))
+
+    return records
+
+
+# --------------------------------------------------
+def test_fetch_frags(tmp_path) -> None:
+    """ Test read_frags() and fetch_frags() """
+
+    in_dir = 'tests/inputs/coords/archaea/50'
+    coords = f'{in_dir}/archaea_1_genomic_frags.tsv'
+    frags = read_frags(coords)
+
+    assert len(frags) == 3
+    assert all(isinstance(frag, FragCoords) for frag in frags)
+
+    # Same as fragment written by chopper.py with sequences. FASTA is
+    # copied, since its index is saved beside it
+    fasta = str(tmp_path / 'frags.fasta')
+    shutil.copy(
+        'tests/inputs/chopped/archaea/50/archaea_1_genomic_frags.fasta', fasta)
+    with open(fasta, 'rb') as fh:
+        expected = list(read_records(fh))
+
+    assert fetch_frags([(coords, frag) for frag in frags]) == expected
+
+    # Fragments read from FASTA by their offsets
+    frags = read_frags(fasta)
+    assert all(isinstance(frag, FaiRecord) for frag in frags)
+    assert fetch_frags([(fasta, frag) for frag in frags]) == expected
+
+    # Only IDs of compressed FASTA are kept, and records are read in the
+    # order chosen, whatever their order in the file
+    compressed = str(tmp_path / 'frags.fasta.gz')
+    with open(fasta, 'rb') as in_fh, open_output(compressed, 'wb') as out_fh:
+        out_fh.write(in_fh.read())
+
+    frags = read_frags(compressed)
+    assert frags == [
+        RecordPos(record.id, i) for i, record in enumerate(expected)
+    ]
+    chosen = [(compressed, frags[2]), (fasta, read_frags(fasta)[0]),
+              (compressed, frags[1])]
+    assert fetch_frags(chosen) == [expected[2], expected[0], expected[1]]
 
 
 # --------------------------------------------------
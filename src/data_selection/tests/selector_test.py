@@ -1,5 +1,6 @@
 """ Tests """
 
+import gzip
 import os
 import random
 import re
@@ -9,6 +10,19 @@ from subprocess import getstatusoutput
 PRG = './selector.py'
 TEST1 = 'tests/inputs/chopped/archaea/5'
 TEST2 = 'tests/inputs/chopped/archaea/50'
+COORDS = 'tests/inputs/coords/archaea/50'
+TREE = 'tests/inputs/chopped'
+
+
+# --------------------------------------------------
+def copy_inputs(in_dir: str, tmp_path) -> str:
+    """ Copy input directory into tmp_path, so that indexes saved beside
+    its FASTA files are not written among the inputs """
+
+    out_dir = str(tmp_path / in_dir)
+    shutil.copytree(in_dir, out_dir)
+
+    return out_dir
 
 
 # --------------------------------------------------
@@ -66,9 +80,10 @@ def test_bad_number() -> None:
 
 
 # --------------------------------------------------
-def test_ok() -> None:
+def test_ok(tmp_path) -> None:
     """ Runs on good input """
 
+    in_dir = copy_inputs(TEST1, tmp_path)
     out_dir = 'out_test'
     out_file = os.path.join(out_dir, 'selected_frags.fasta')
     try:
@@ -76,7 +91,7 @@ def test_ok() -> None:
             shutil.rmtree(out_dir)
 
         # -n less than number of files
-        rv, out = getstatusoutput(f'{PRG} {TEST1} -n 2 -o {out_dir}')
+        rv, out = getstatusoutput(f'{PRG} {in_dir} -n 2 -o {out_dir}')
 
         assert out == (f'Done. Wrote 2 records to {out_file}.')
         assert rv == 0
@@ -85,7 +100,7 @@ def test_ok() -> None:
         assert open(out_file).read().count('>') == 2
 
         # -n more than number of files, with replacement
-        rv, out = getstatusoutput(f'{PRG} {TEST1} -n 20 -o {out_dir} -r')
+        rv, out = getstatusoutput(f'{PRG} {in_dir} -n 20 -o {out_dir} -r')
 
         assert out == (f'Done. Wrote 20 records to {out_file}.')
         assert rv == 0
@@ -99,9 +114,10 @@ def test_ok() -> None:
 
 
 # --------------------------------------------------
-def test_warns_too_many() -> None:
+def test_warns_too_many(tmp_path) -> None:
     """ Warns on too large num_frags """
 
+    in_dirs = [copy_inputs(TEST1, tmp_path), copy_inputs(TEST2, tmp_path)]
     out_dir = 'out_test'
     out_file = os.path.join(out_dir, 'selected_frags.fasta')
     try:
@@ -109,7 +125,7 @@ def test_warns_too_many() -> None:
             shutil.rmtree(out_dir)
 
         # No replacement, so number of frags limited to number of files
-        rv, out = getstatusoutput(f'{PRG} {TEST1} -n 20 -o {out_dir}')
+        rv, out = getstatusoutput(f'{PRG} {in_dirs[0]} -n 20 -o {out_dir}')
 
         assert re.search(r'Number of requested fragments \(\d+\)', out)
         assert rv == 0
@@ -118,7 +134,8 @@ def test_warns_too_many() -> None:
         assert open(out_file).read().count('>') == 2
 
         # With replacement, number of frags limited to all frags in all files
-        rv, out = getstatusoutput(f'{PRG} {TEST2} -n 100 -o {out_dir} -r')
+        rv, out = getstatusoutput(
+            f'{PRG} {in_dirs[1]} -n 100 -o {out_dir} -r')
 
         assert re.search(r'Directory does not have \d+ unique', out)
         assert rv == 0
@@ -129,3 +146,176 @@ def test_warns_too_many() -> None:
     finally:
         if os.path.isdir(out_dir):
             shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_coords(tmp_path) -> None:
+    """ Selects from fragment coordinates """
+
+    in_dirs = [copy_inputs(TEST2, tmp_path), COORDS]
+    out_dirs = ['out_test', 'out_test_coords']
+    try:
+        # All fragments are selected from both forms of the same fragments
+        for in_dir, out_dir in zip(in_dirs, out_dirs):
+            out_file = os.path.join(out_dir, 'selected_frags.fasta')
+            rv, out = getstatusoutput(
+                f'{PRG} {in_dir} -n 6 -r -s -o {out_dir}')
+            assert rv == 0
+            assert out == f'Done. Wrote 6 records to {out_file}.'
+
+        selected = [
+            sorted(
+                open(os.path.join(out_dir, 'selected_frags.fasta')).read().
+                split('>')) for out_dir in out_dirs
+        ]
+        assert selected[0] == selected[1]
+
+    finally:
+        for out_dir in out_dirs:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_compressed(tmp_path) -> None:
+    """ Selects from gzipped fragments, writing compressed output """
+
+    fasta_dir = copy_inputs(TEST2, tmp_path)
+    in_dir = 'in_test_gz'
+    out_dirs = ['out_test', 'out_test_gz']
+    try:
+        os.makedirs(in_dir)
+        for filename in os.listdir(TEST2):
+            if filename.endswith('.fasta'):
+                with open(os.path.join(TEST2, filename), 'rb') as in_fh, \
+                        gzip.open(os.path.join(in_dir, filename + '.gz'),
+                                  'wb') as out_fh:
+                    out_fh.write(in_fh.read())
+
+        rv, _ = getstatusoutput(
+            f'{PRG} {fasta_dir} -n 6 -r -o {out_dirs[0]}')
+        assert rv == 0
+        rv, out = getstatusoutput(
+            f'{PRG} {in_dir} -n 6 -r -z -o {out_dirs[1]}')
+        assert rv == 0
+        out_file = os.path.join(out_dirs[1], 'selected_frags.fasta.gz')
+        assert out == f'Done. Wrote 6 records to {out_file}.'
+
+        with gzip.open(out_file, 'rt') as fh:
+            selected = sorted(fh.read().split('>'))
+        assert selected == sorted(
+            open(os.path.join(out_dirs[0],
+                              'selected_frags.fasta')).read().split('>'))
+
+    finally:
+        for out_dir in [in_dir, *out_dirs]:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_index(tmp_path) -> None:
+    """ Saves offset index next to each FASTA, and uses it when rerun """
+
+    in_dir = copy_inputs(TEST2, tmp_path)
+    out_dirs = ['out_test', 'out_test_index']
+    try:
+        for out_dir in out_dirs:
+            rv, _ = getstatusoutput(f'{PRG} {in_dir} -n 2 -s -o {out_dir}')
+            assert rv == 0
+
+        for filename in os.listdir(TEST2):
+            if filename.endswith('.fasta'):
+                assert os.path.isfile(
+                    os.path.join(in_dir, filename + '.fai'))
+
+        selected = [
+            open(os.path.join(out_dir, 'selected_frags.fasta')).read()
+            for out_dir in out_dirs
+        ]
+        assert selected[0] == selected[1]
+
+    finally:
+        for out_dir in out_dirs:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_seed(tmp_path) -> None:
+    """ -s takes no value, and is the same as --seed 123 """
+
+    in_dir = copy_inputs(TEST2, tmp_path)
+    out_dirs = ['out_test', 'out_test_seed']
+    try:
+        rv, _ = getstatusoutput(f'{PRG} -n 2 -o {out_dirs[0]} -s {in_dir}')
+        assert rv == 0
+
+        rv, _ = getstatusoutput(
+            f'{PRG} -n 2 -o {out_dirs[1]} --seed 123 {in_dir}')
+        assert rv == 0
+
+        selected = [
+            open(os.path.join(out_dir, 'selected_frags.fasta')).read()
+            for out_dir in out_dirs
+        ]
+        assert selected[0] == selected[1]
+
+        rv, out = getstatusoutput(f'{PRG} --seed foo {in_dir}')
+        assert rv != 0
+        assert re.search('invalid int value: \'foo\'', out)
+
+    finally:
+        for out_dir in out_dirs:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_tree(tmp_path) -> None:
+    """ Selects from each kingdom/length directory, as separate runs do """
+
+    tree = copy_inputs(TREE, tmp_path)
+    quotas = 'quotas_test.tsv'
+    out_dirs = ['out_test', 'out_test_tree']
+    try:
+        with open(quotas, 'wt') as out_fh:
+            out_fh.write('kingdom\tlength\tnum\n'
+                         'archaea\t50\t4\n'
+                         'viral\t5\t2\n')
+
+        for kingdom, length, num in [('archaea', '50', 4), ('viral', '5', 2)]:
+            rv, _ = getstatusoutput(
+                f'{PRG} {tree}/{kingdom}/{length} -n {num} -r -s'
+                f' -o {out_dirs[0]}/{kingdom}/{length}')
+            assert rv == 0
+
+        rv, out = getstatusoutput(
+            f'{PRG} {tree} -t -q {quotas} -w 2 -r -s -o {out_dirs[1]}')
+        assert rv == 0
+        assert out.splitlines() == [
+            f'Wrote 4 records to {out_dirs[1]}/archaea/50/'
+            'selected_frags.fasta.',
+            f'Wrote 2 records to {out_dirs[1]}/viral/5/selected_frags.fasta.',
+            f'Done. Wrote 6 records from 2 directories to {out_dirs[1]}.'
+        ]
+
+        for stratum in ['archaea/50', 'viral/5']:
+            selected = [
+                open(os.path.join(out_dir, stratum,
+                                  'selected_frags.fasta')).read()
+                for out_dir in out_dirs
+            ]
+            assert selected[0] == selected[1]
+
+        # Quotas are only used with --tree
+        rv, out = getstatusoutput(f'{PRG} {tree} -q {quotas}')
+        assert rv != 0
+        assert re.search('--quotas requires --tree', out)
+
+    finally:
+        if os.path.isfile(quotas):
+            os.remove(quotas)
+        for out_dir in out_dirs:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
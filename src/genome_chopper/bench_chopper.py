@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Date   : 2026-10-17
+Purpose: Benchmark chopper.py throughput on a synthetic genome
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, NamedTuple
+
+
+class Args(NamedTuple):
+    """ Command-line arguments """
+    programs: List[str]
+    size: int
+    lengths: List[int]
+    overlap: int
+    seed: int
+
+
+# --------------------------------------------------
+class Timing(NamedTuple):
+    """ Result of one benchmark run """
+    program: str
+    length: int
+    seconds: float
+    max_rss: float
+
+
+# --------------------------------------------------
+def get_args() -> Args:
+    """ Get command-line arguments """
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark chopper.py throughput on a synthetic genome',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('-p',
+                        '--programs',
+                        help='Chopper script(s) to benchmark',
+                        metavar='PRG',
+                        type=str,
+                        nargs='+',
+                        default=['./chopper.py'])
+
+    parser.add_argument('-s',
+                        '--size',
+                        help='Synthetic genome size (Mb)',
+                        metavar='INT',
+                        type=int,
+                        default=100)
+
+    parser.add_argument('-l',
+                        '--length',
+                        help='Fragment length(s) (b)',
+                        metavar='INT',
+                        type=int,
+                        nargs='+',
+                        default=[500])
+
+    parser.add_argument('-v',
+                        '--overlap',
+                        help='Overlap length (b)',
+                        metavar='INT',
+                        type=int,
+                        default=0)
+
+    parser.add_argument('-r',
+                        '--seed',
+                        help='Random seed for synthetic genome',
+                        metavar='INT',
+                        type=int,
+                        default=123)
+
+    args = parser.parse_args()
+
+    for program in args.programs:
+        if not os.path.isfile(program):
+            parser.error(f'Program "{program}" does not exist.')
+
+    if args.size <= 0:
+        parser.error(f'size "{args.size}" must be greater than 0')
+
+    return Args(args.programs, args.size, args.length, args.overlap,
+                args.seed)
+
+
+# --------------------------------------------------
+def main() -> None:
+    """ Time each program at each length """
+
+    args = get_args()
+    n_bases = args.size * 1_000_000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        genome = os.path.join(tmp_dir, 'synthetic.fasta')
+        write_genome(genome, n_bases, args.seed)
+
+        print('program', 'length', 'seconds', 'bases_per_s', 'max_rss_mb',
+              sep='\t')
+
+        for length in args.lengths:
+            for program in args.programs:
+                out_dir = os.path.join(tmp_dir, 'out')
+                timing = time_run(program, genome, length, args.overlap,
+                                  out_dir)
+                print(timing.program, timing.length,
+                      f'{timing.seconds:.2f}',
+                      f'{n_bases / timing.seconds:.0f}',
+                      f'{timing.max_rss:.0f}',
+                      sep='\t')
+
+
+# --------------------------------------------------
+def write_genome(filename: str, n_bases: int, seed: int) -> None:
+    """ Write a random single-record genome, wrapped at 80 bases """
+
+    random.seed(seed)
+
+    # Map each random byte onto one of the four bases
+    table = bytes(b'ACGT'[i % 4] for i in range(256))
+    seq = random.randbytes(n_bases).translate(table)
+
+    with open(filename, 'wb') as out_fh:
+        out_fh.write(b'>synthetic_1 Synthetic genome\n')
+        for i in range(0, n_bases, 80):
+            out_fh.write(seq[i:i + 80] + b'\n')
+
+
+# --------------------------------------------------
+def time_run(program: str, genome: str, length: int, overlap: int,
+             out_dir: str) -> Timing:
+    """ Run program in its own process, measuring wall time and RSS """
+
+    cmd = [sys.executable, program, '-l', str(length), '-v', str(overlap),
+           '-o', out_dir, genome]
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+
+    # Reap the child directly to get resource usage for this run alone
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    if proc.returncode != 0:
+        sys.exit(f'Program "{program}" failed with exit code'
+                 f' {proc.returncode}.')
+
+    return Timing(program, length, seconds, usage.ru_maxrss / 1024)
+
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
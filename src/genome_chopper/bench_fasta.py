@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Date   : 2026-10-17
+Purpose: Benchmark fasta_io.py against Bio.SeqIO
+"""
+
+import argparse
+import collections
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import IO, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+from Bio import SeqIO
+from fasta_io import FastaWriter, read_ids, read_lengths, read_records
+
+
+class Args(NamedTuple):
+    """ Command-line arguments """
+    file: Optional[str]
+    size: int
+    seed: int
+
+
+# --------------------------------------------------
+def get_args() -> Args:
+    """ Get command-line arguments """
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark fasta_io.py against Bio.SeqIO',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('file',
+                        help='FASTA file, such as MEGAHIT final.contigs.fa.'
+                        ' A synthetic assembly is made if not given',
+                        metavar='FILE',
+                        type=str,
+                        nargs='?')
+
+    parser.add_argument('-s',
+                        '--size',
+                        help='Synthetic assembly size (Mb)',
+                        metavar='INT',
+                        type=int,
+                        default=500)
+
+    parser.add_argument('-r',
+                        '--seed',
+                        help='Random seed for synthetic assembly',
+                        metavar='INT',
+                        type=int,
+                        default=123)
+
+    args = parser.parse_args()
+
+    if args.file and not os.path.isfile(args.file):
+        parser.error(f'File "{args.file}" does not exist.')
+
+    if args.size <= 0:
+        parser.error(f'size "{args.size}" must be greater than 0')
+
+    return Args(args.file, args.size, args.seed)
+
+
+# --------------------------------------------------
+def main() -> None:
+    """ Time each access mode with each reader """
+
+    args = get_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = args.file
+        if not filename:
+            filename = os.path.join(tmp_dir, 'final.contigs.fa')
+            write_contigs(filename, args.size * 1_000_000, args.seed)
+
+        size_mb = os.path.getsize(filename) / 1e6
+
+        print('mode', 'reader', 'seconds', 'mb_per_s', 'speedup', sep='\t')
+
+        for mode, (seqio_func, fasta_io_func) in MODES.items():
+            seqio_secs = time_mode(seqio_func, filename, 'rt')
+            fasta_io_secs = time_mode(fasta_io_func, filename, 'rb')
+
+            for reader, seconds in [('seqio', seqio_secs),
+                                    ('fasta_io', fasta_io_secs)]:
+                print(mode, reader, f'{seconds:.2f}',
+                      f'{size_mb / seconds:.0f}',
+                      f'{seqio_secs / seconds:.1f}',
+                      sep='\t')
+
+
+# --------------------------------------------------
+def seqio_write(fh: IO[str]) -> None:
+    """ Copy records with Bio.SeqIO """
+
+    with open(os.devnull, 'wt') as out_fh:
+        SeqIO.write(SeqIO.parse(fh, 'fasta'), out_fh, 'fasta')
+
+
+# --------------------------------------------------
+def fasta_io_write(fh: IO[bytes]) -> None:
+    """ Copy records with fasta_io.py """
+
+    with open(os.devnull, 'wb') as out_fh, FastaWriter(out_fh) as writer:
+        writer.write_records(read_records(fh))
+
+
+# --------------------------------------------------
+def exhaust(items: Iterable) -> None:
+    """ Consume items without keeping them """
+
+    collections.deque(items, maxlen=0)
+
+
+# Each access mode as the tools use it, with Bio.SeqIO and fasta_io.py
+MODES: Dict[str, Tuple[Callable[[IO], None], Callable[[IO], None]]] = {
+    'ids': (lambda fh: exhaust(rec.id for rec in SeqIO.parse(fh, 'fasta')),
+            lambda fh: exhaust(read_ids(fh))),
+    'lengths': (lambda fh: exhaust((rec.id, len(rec))
+                                   for rec in SeqIO.parse(fh, 'fasta')),
+                lambda fh: exhaust(read_lengths(fh))),
+    'records': (lambda fh: exhaust(bytes(rec.seq)
+                                   for rec in SeqIO.parse(fh, 'fasta')),
+                lambda fh: exhaust(read_records(fh))),
+    'write': (seqio_write, fasta_io_write)
+}
+
+
+# --------------------------------------------------
+def time_mode(func: Callable[[IO], None], filename: str, mode: str) -> float:
+    """ Wall time of func on file opened in mode """
+
+    with open(filename, mode) as fh:
+        start = time.perf_counter()
+        func(fh)
+
+        return time.perf_counter() - start
+
+
+# --------------------------------------------------
+def write_contigs(filename: str, n_bases: int, seed: int) -> None:
+    """ Write random contigs named and laid out like MEGAHIT's, with each
+    sequence on one line """
+
+    random.seed(seed)
+
+    # Map each random byte onto one of the four bases
+    table = bytes(b'ACGT'[i % 4] for i in range(256))
+    written = 0
+    n_contig = 0
+
+    with open(filename, 'wb') as out_fh:
+        while written < n_bases:
+            length = max(200, int(random.lognormvariate(6.5, 0.9)))
+            multi = random.uniform(1, 20)
+            out_fh.write(f'>k141_{n_contig} flag=1 multi={multi:.4f}'
+                         f' len={length}\n'.encode())
+            out_fh.write(random.randbytes(length).translate(table) + b'\n')
+            written += length
+            n_contig += 1
+
+    print(f'Wrote {n_contig} contigs ({written} bases) to "{filename}".',
+          file=sys.stderr)
+
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
@@ -6,34 +6,71 @@ Purpose: Chop a genome into simulated contigs
 """
 
 import argparse
+import contextlib
+import functools
+import io
+import multiprocessing as mp
+import numpy as np
+import numpy.typing as npt
 import os
+import random
+import struct
 import sys
-from typing import Dict, List, NamedTuple, TextIO, Tuple, TypedDict
-from Bio import SeqIO
-from Bio.SeqRecord import SeqRecord
-from collections import defaultdict
+from typing import (IO, BinaryIO, Callable, Dict, Iterator, List, NamedTuple,
+                    Optional, TextIO, Tuple)
+from compressed_io import (compressed_name, is_gzipped, open_input,
+                           open_output)
+from faidx import build_index, write_index
+from fasta_io import FastaRecord, FastaWriter, read_lengths, read_records
 
 
 class Args(NamedTuple):
     """ Command-line arguments """
     genome: List[TextIO]
     out_dir: str
-    length: int
+    lengths: List[int]
     overlap: int
     blank: bool
+    kmers: List[int]
+    workers: int
+    coords: bool
+    compress: bool
+    sample: int
+    seed: Optional[int]
 
 
 # --------------------------------------------------
-class SeqAnnotations(TypedDict):
-    """ SeqRecord Annotations """
+class Settings(NamedTuple):
+    """ How to chop each input file """
+    out_dirs: Dict[int, str]
+    overlap: int
+    blank: bool
+    kmers: List[int]
+    coords: bool
+    compress: bool
+    sample: int
+    seed: Optional[int]
+
+
+# --------------------------------------------------
+class Fragments(NamedTuple):
+    """ Fragments of a parent sequence, as positions in its buffer """
     parent_id: str
     parent_name: str
-    frag_start: int
-    frag_end: int
-    a_pct: float
-    c_pct: float
-    g_pct: float
-    t_pct: float
+    seq: bytes
+    starts: np.ndarray
+    stops: np.ndarray
+    numbers: Optional[np.ndarray] = None
+
+
+# --------------------------------------------------
+# Translation of bases to 2-bit codes, anything else is 4
+BASE_CODES = bytes({
+    'A': 0,
+    'C': 1,
+    'G': 2,
+    'T': 3
+}.get(chr(i).upper(), 4) for i in range(256))
 
 
 # --------------------------------------------------
@@ -59,10 +96,11 @@ def get_args() -> Args:
 
     parser.add_argument('-l',
                         '--length',
-                        help='Segment length (b)',
+                        help='Segment length(s) (b)',
                         metavar='INT',
                         type=int,
-                        default='100')
+                        nargs='+',
+                        default=[100])
 
     parser.add_argument('-v',
                         '--overlap',
@@ -76,17 +114,87 @@ def get_args() -> Args:
                         help='Write blank when sequence shorter than -l',
                         action='store_true')
 
+    parser.add_argument('-k',
+                        '--kmers',
+                        help='Also write k-mer frequency matrices for k',
+                        metavar='K',
+                        type=int,
+                        nargs='+',
+                        default=[])
+
+    parser.add_argument('-c',
+                        '--coords',
+                        help='Write only fragment coordinates and a .fai'
+                        ' index of the input, not fragment sequences',
+                        action='store_true')
+
+    parser.add_argument('-z',
+                        '--compress',
+                        help='Write BGZF compressed .fasta.gz and .tsv.gz',
+                        action='store_true')
+
+    parser.add_argument('-w',
+                        '--workers',
+                        help='Number of input files to chop in parallel',
+                        metavar='INT',
+                        type=int,
+                        default=1)
+
+    parser.add_argument('-n',
+                        '--sample',
+                        help='Write only this many randomly drawn fragments'
+                        ' of each length per input file, all if 0',
+                        metavar='INT',
+                        type=int,
+                        default=0)
+
+    parser.add_argument('-s',
+                        '--seed',
+                        help='Random seed to fix --sample, 123 if given'
+                        ' without a value',
+                        metavar='INT',
+                        type=int,
+                        nargs='?',
+                        const=123)
+
     args = parser.parse_args()
 
-    if args.length <= 0:
-        parser.error(f'length "{args.length}" must be greater than 0')
+    for length in args.length:
+        if length <= 0:
+            parser.error(f'length "{length}" must be greater than 0')
 
-    if args.overlap > args.length:
-        parser.error(f'overlap "{args.overlap}"'
-                     f' cannot be greater than length "{args.length}"')
+        if args.overlap >= length:
+            parser.error(f'overlap "{args.overlap}"'
+                         f' must be less than length "{length}"')
 
-    return Args(args.genome, args.out_dir, args.length,
-                args.overlap, args.blank)
+    for k in args.kmers:
+        if not 2 <= k <= 6:
+            parser.error(f'k-mer size "{k}" must be between 2 and 6')
+
+    if args.workers <= 0:
+        parser.error(f'workers "{args.workers}" must be greater than 0')
+
+    if args.sample < 0:
+        parser.error(f'sample "{args.sample}" must not be negative')
+
+    # Index offsets are only valid for uncompressed files
+    if args.coords:
+        for fh in args.genome:
+            if is_gzipped(fh.name):
+                parser.error(f'--coords requires uncompressed input,'
+                             f' "{fh.name}" is compressed')
+
+    # Output is named by input file, so same-named inputs would collide
+    out_bases = [get_out_base(fh.name) for fh in args.genome]
+    for out_base in out_bases:
+        if out_bases.count(out_base) > 1:
+            parser.error(f'Multiple input files named "{out_base}",'
+                         ' outputs would overwrite each other')
+
+    return Args(args.genome, args.out_dir, sorted(set(args.length)),
+                args.overlap, args.blank, sorted(set(args.kmers)),
+                args.workers, args.coords, args.compress, args.sample,
+                args.seed)
 
 
 # --------------------------------------------------
@@ -108,21 +216,167 @@ def main() -> None:
 
     args = get_args()
     files = args.genome
-    out_dir = args.out_dir
-    length = args.length
-    overlap = args.overlap
-    write_blank = args.blank
+    lengths = args.lengths
+
+    # Each length gets its own directory when chopping several at once
+    out_dirs = {
+        length: os.path.join(args.out_dir, str(length))
+        if len(lengths) > 1 else args.out_dir
+        for length in lengths
+    }
+
+    for out_dir in out_dirs.values():
+        if not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+
+    chop_one = functools.partial(
+        chop_genome,
+        settings=Settings(out_dirs, args.overlap, args.blank, args.kmers,
+                          args.coords, args.compress, args.sample,
+                          args.seed))
+
+    filenames = [fh.name for fh in files]
+    for fh in files:
+        fh.close()
+
+    if args.workers > 1:
+        # Messages from each file are reported in input order
+        with mp.Pool(min(args.workers, len(filenames))) as pool:
+            for out, err in pool.imap(
+                    functools.partial(capture_output, chop_one), filenames):
+                sys.stderr.write(err)
+                sys.stderr.flush()
+                sys.stdout.write(out)
+                sys.stdout.flush()
+    else:
+        for filename in filenames:
+            chop_one(filename)
 
-    if not os.path.isdir(out_dir):
-        os.makedirs(out_dir)
+    print(f'Done. Processed {len(files)} '
+          f'file{"s" if len(files)!= 1 else ""}.')
 
-    for fh in files:
 
-        frag_recs = []
+# --------------------------------------------------
+def get_out_base(filename: str) -> str:
+    """ Get base name of output files from input file name """
+
+    basename = os.path.basename(filename)
+    if basename.endswith('.gz'):
+        basename = basename[:-len('.gz')]
+
+    return os.path.splitext(basename)[0]
+
+
+# --------------------------------------------------
+def test_get_out_base() -> None:
+    """ Test get_out_base() """
+
+    assert get_out_base('tests/inputs/input1.fasta') == 'input1'
+    assert get_out_base('GCF_000427115.1_genomic.fna') == \
+        'GCF_000427115.1_genomic'
+    assert get_out_base('GCF_000427115.1_genomic.fna.gz') == \
+        'GCF_000427115.1_genomic'
+
+
+# --------------------------------------------------
+def chop_genome(filename: str, settings: Settings) -> None:
+    """ Chop one input file into fragments of each length """
+
+    out_file_base = get_out_base(filename)
+    writers = {
+        length: FragWriter(
+            os.path.join(out_dir, out_file_base), settings.kmers,
+            os.path.relpath(filename, out_dir) if settings.coords else None,
+            settings.compress)
+        for length, out_dir in settings.out_dirs.items()
+    }
+
+    # Fragment sequences can be fetched from the input using its index
+    if settings.coords:
+        write_fasta_index(filename, [
+            os.path.join(out_dir, out_file_base + '_frags.fai')
+            for out_dir in settings.out_dirs.values()
+        ])
+
+    # Windows to keep are drawn before chopping, from their number
+    chosen = None
+    if settings.sample:
+        chosen = sample_windows(
+            filename, list(settings.out_dirs), settings.overlap,
+            settings.sample,
+            random.Random(None if settings.seed is None else
+                          f'{settings.seed}/{out_file_base}'))
+
+    # Input is parsed once, fragments of all lengths are written as
+    # they are made
+    with open_input(filename, 'rb') as fh:
+        chopped = chop_file(fh, list(settings.out_dirs), settings.overlap)
+        if chosen is not None:
+            chopped = sample_frags(chopped, chosen)
+
+        for length, frags in chopped:
+            writers[length].write(frags)
+
+    for writer in writers.values():
+        n_rec = writer.close()
+
+        if n_rec > 0:
+            print(f'Wrote {n_rec} records to "{writer.out_file}".')
+
+        elif settings.blank:
+            writer.write_blank()
+            print(f'Wrote 0 records to "{writer.out_file}".')
+
+
+# --------------------------------------------------
+def write_fasta_index(filename: str, out_files: List[str]) -> None:
+    """ Write .fai index of FASTA file to each output file """
 
-        for seq_record in SeqIO.parse(fh, "fasta"):
+    with open(filename, 'rb') as fasta_fh:
+        index = build_index(fasta_fh)
 
-            seq_len = len(seq_record)
+    for out_file in out_files:
+        with open(out_file, 'wt') as out_fh:
+            write_index(index, out_fh)
+
+
+# --------------------------------------------------
+def capture_output(func: Callable[[str], None],
+                   filename: str) -> Tuple[str, str]:
+    """ Run func on filename in a worker, returning what it printed to
+    STDOUT and STDERR so messages can be reported in order """
+
+    out, err = io.StringIO(), io.StringIO()
+
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        func(filename)
+
+    return out.getvalue(), err.getvalue()
+
+
+# --------------------------------------------------
+def test_capture_output() -> None:
+    """ Test capture_output() """
+
+    def noisy(filename: str) -> None:
+        print(f'Wrote "{filename}".')
+        warn('Warning: careful')
+
+    assert capture_output(noisy, 'a.fasta') == ('Wrote "a.fasta".\n',
+                                                'Warning: careful\n')
+
+
+# --------------------------------------------------
+def chop_file(fh: IO[bytes], lengths: List[int],
+              overlap: int) -> Iterator[Tuple[int, Fragments]]:
+    """ Chop all sequences in a file into fragments of each length,
+    skipping those too short """
+
+    for seq_record in read_records(fh):
+
+        seq_len = len(seq_record.seq)
+
+        for length in lengths:
             min_overlap = 2*length - seq_len
 
             if length > seq_len:
@@ -136,80 +390,47 @@ def main() -> None:
                      f'(2*{length}-{seq_len}={min_overlap}). Skipping.')
                 continue
 
-            for frags in chop(seq_record, length, overlap):
-                frag_recs.append(frags)
-
-        out_file_base = os.path.splitext(os.path.basename(fh.name))[0]
-        out_file_fa = os.path.join(out_dir,  out_file_base + '_frags.fasta')
-        out_file_tsv = os.path.join(out_dir,  out_file_base + '_frags.tsv')
-
-        if len(frag_recs) > 0:
-            n_rec = SeqIO.write(frag_recs, out_file_fa, "fasta")
-            print(f'Wrote {n_rec} records to "{out_file_fa}".')
-
-        if len(frag_recs) == 0:
-            if write_blank:
-                with open(out_file_fa, 'wt') as out_fh:
-                    print('', file=out_fh)
-                print(f'Wrote 0 records to "{out_file_fa}".')
-
-        write_annotations(frag_recs, out_file_tsv, write_blank)
-
-    print(f'Done. Processed {len(files)} '
-          f'file{"s" if len(files)!= 1 else ""}.')
+            yield length, chop(seq_record, length, overlap)
 
 
 # --------------------------------------------------
-def chop(record: SeqRecord, frag_len: int, overlap: int) -> List[SeqRecord]:
+def chop(record: FastaRecord, frag_len: int, overlap: int) -> Fragments:
     """ Chop sequence from record """
 
     starts, stops = get_positions(len(record.seq), frag_len, overlap)
 
-    frag_recs = []
-    n_frag = 0
+    # Fragments are only positions in the sequence buffer
+    return Fragments(record.id, record.description, record.seq, starts,
+                     stops)
 
-    for start, stop in zip(starts, stops):
-        n_frag += 1
-        frag = record.seq[start: stop+1]
 
-        freqs = find_tetra(frag)
-
-        frag_annotations = SeqAnnotations(parent_id=record.id,
-                                          parent_name=record.description,
-                                          frag_start=start + 1,
-                                          frag_end=stop + 1,
-                                          a_pct=freqs['A'],
-                                          c_pct=freqs['C'],
-                                          g_pct=freqs['G'],
-                                          t_pct=freqs['T']
-                                          )
+# --------------------------------------------------
+def test_chop() -> None:
+    """ Test chop """
 
-        frag_rec = SeqRecord(frag, id=f'frag_{n_frag}_{record.id}',
-                             description=f'Fragment {n_frag}'
-                                         f' of {record. description}',
-                                         annotations=frag_annotations
-                             )
+    record = FastaRecord('seq_1', 'seq_1 Fake sequence', b'ACGTACGTAC')
 
-        frag_recs.append(frag_rec)
+    frags = chop(record, 4, 1)
 
-    return frag_recs
+    assert frags.parent_id == 'seq_1'
+    assert frags.parent_name == 'seq_1 Fake sequence'
+    assert frags.seq == b'ACGTACGTAC'
+    assert frags.starts.tolist() == [0, 3, 6]
+    assert frags.stops.tolist() == [3, 6, 9]
 
 
 # --------------------------------------------------
-def get_positions(length: int, frag: int, overlap: int) -> Tuple:
+def get_positions(length: int, frag: int,
+                  overlap: int) -> Tuple[np.ndarray, np.ndarray]:
     """ Get starting and stopping positions """
 
-    starts = [0]
-    stops = [frag-1]
+    step = frag - overlap
 
-    stop = stops[-1]
-    while stop < length - 1:
-        start = starts[-1] + frag - overlap
-        stop = start + frag - 1
+    # First fragment is always made, then one per step that fits
+    n_frags = 1 + max(0, (length - frag) // step)
 
-        if stop <= length - 1:
-            starts.append(start)
-            stops.append(stop)
+    starts = np.arange(n_frags, dtype=np.int64) * step
+    stops = starts + (frag - 1)
 
     return (starts, stops)
 
@@ -218,62 +439,523 @@ def get_positions(length: int, frag: int, overlap: int) -> Tuple:
 def test_get_positions():
     """ Test get_positions """
 
-    assert get_positions(4, 2, 1) == ([0, 1, 2], [1, 2, 3])
-    assert get_positions(4, 2, 0) == ([0, 2], [1, 3])
-    assert get_positions(4, 3, 2) == ([0, 1], [2, 3])
-    assert get_positions(5, 4, 3) == ([0, 1], [3, 4])
-    assert get_positions(5, 3, 2) == ([0, 1, 2], [2, 3, 4])
-    assert get_positions(5, 3, 1) == ([0, 2], [2, 4])
-    assert get_positions(5, 2, 1) == ([0, 1, 2, 3], [1, 2, 3, 4])
-    assert get_positions(5, 2, 0) == ([0, 2], [1, 3])
+    def positions(length: int, frag: int,
+                  overlap: int) -> Tuple[List[int], List[int]]:
+        """ Convert arrays for comparison """
+        starts, stops = get_positions(length, frag, overlap)
+        assert starts.dtype == stops.dtype == np.int64
+        return (starts.tolist(), stops.tolist())
+
+    assert positions(4, 2, 1) == ([0, 1, 2], [1, 2, 3])
+    assert positions(4, 2, 0) == ([0, 2], [1, 3])
+    assert positions(4, 3, 2) == ([0, 1], [2, 3])
+    assert positions(5, 4, 3) == ([0, 1], [3, 4])
+    assert positions(5, 3, 2) == ([0, 1, 2], [2, 3, 4])
+    assert positions(5, 3, 1) == ([0, 2], [2, 4])
+    assert positions(5, 2, 1) == ([0, 1, 2, 3], [1, 2, 3, 4])
+    assert positions(5, 2, 0) == ([0, 2], [1, 3])
+
+
+# --------------------------------------------------
+def count_windows(seq_len: int, length: int, overlap: int) -> int:
+    """ Number of fragments chop_file() makes of a sequence """
+
+    if length > seq_len or overlap < 2 * length - seq_len:
+        return 0
+
+    return 1 + (seq_len - length) // (length - overlap)
+
+
+# --------------------------------------------------
+def test_count_windows() -> None:
+    """ count_windows() agrees with chop_file() """
+
+    fasta = b''.join(f'>seq_{n}\n'.encode() + b'ACGT' * n + b'\n'
+                     for n in range(1, 40))
+
+    for length, overlap in [(5, 0), (8, 3), (20, 19), (30, 0)]:
+        with contextlib.redirect_stderr(io.StringIO()):
+            expected = [
+                len(frags.starts) for _, frags in chop_file(
+                    io.BytesIO(fasta), [length], overlap)
+            ]
+
+        counts = [
+            count_windows(4 * n, length, overlap) for n in range(1, 40)
+        ]
+        assert [count for count in counts if count] == expected
+
+
+# --------------------------------------------------
+def sample_windows(filename: str, lengths: List[int], overlap: int,
+                   num: int, rng: random.Random) -> Dict[int, np.ndarray]:
+    """ Draw num fragments of each length from all of a file's sequences,
+    without replacement. Fragments are numbered across all sequences in
+    order, and found by reading only sequence lengths """
+
+    with open_input(filename, 'rb') as fh:
+        seq_lens = [seq_len for _, seq_len in read_lengths(fh)]
+
+    chosen = {}
+    for length in lengths:
+        total = sum(
+            count_windows(seq_len, length, overlap) for seq_len in seq_lens)
+        chosen[length] = np.array(sorted(
+            rng.sample(range(total), min(num, total))),
+                                  dtype=np.int64)
+
+    return chosen
+
+
+# --------------------------------------------------
+def sample_frags(
+        chopped: Iterator[Tuple[int, Fragments]],
+        chosen: Dict[int, np.ndarray]) -> Iterator[Tuple[int, Fragments]]:
+    """ Keep only chosen fragments, numbered as in sample_windows() """
+
+    offsets = dict.fromkeys(chosen, 0)
+
+    for length, frags in chopped:
+        first = offsets[length]
+        offsets[length] += len(frags.starts)
+
+        picks = chosen[length]
+        begin, end = np.searchsorted(picks, [first, offsets[length]])
+        keep = picks[begin:end] - first
+
+        if len(keep) > 0:
+            yield length, frags._replace(starts=frags.starts[keep],
+                                         stops=frags.stops[keep],
+                                         numbers=keep + 1)
 
 
 # --------------------------------------------------
-def find_tetra(seq: str) -> Dict[str, float]:
-    """ Calculate Tetranucleotide Frequency """
+def test_sample_frags(tmp_path) -> None:
+    """ Test sample_windows() and sample_frags() """
+
+    fasta = tmp_path / 'genome.fasta'
+    fasta.write_bytes(b'>seq_1\n' + b'ACGT' * 5 + b'\n>seq_2\nAC\n'
+                      b'>seq_3\n' + b'ACGT' * 3 + b'\n')
 
-    counts: Dict[str, int] = defaultdict(int)
-    freqs: Dict[str, float] = defaultdict(float)
+    # Fragments of length 4 are numbered 0-4 in seq_1, 5-7 in seq_3
+    chosen = sample_windows(str(fasta), [4], 0, 3, random.Random(1))
+    assert len(chosen[4]) == 3
+    assert chosen[4].tolist() == sample_windows(str(fasta), [4], 0, 3,
+                                                random.Random(1))[4].tolist()
 
-    for base in seq:
-        counts[base.upper()] += 1
+    chosen = {4: np.array([1, 5, 7])}
+    with open(fasta, 'rb') as fh, \
+            contextlib.redirect_stderr(io.StringIO()):
+        sampled = list(sample_frags(chop_file(fh, [4], 0), chosen))
 
-    for base, count in counts.items():
-        freqs[base] = count / len(seq)
+    assert [(frags.parent_id, frags.starts.tolist(), frags.numbers.tolist())
+            for _, frags in sampled if frags.numbers is not None] == [
+                ('seq_1', [4], [2]), ('seq_3', [0, 8], [1, 3])
+            ]
+
+    # No more than all fragments are drawn
+    chosen = sample_windows(str(fasta), [4, 30], 0, 100, random.Random(1))
+    assert chosen[4].tolist() == list(range(8))
+    assert chosen[30].tolist() == []
+
+
+# --------------------------------------------------
+def find_composition(seq: bytes, starts: npt.ArrayLike,
+                     stops: npt.ArrayLike) -> Dict[str, np.ndarray]:
+    """ Calculate base frequencies of all fragments of a sequence """
+
+    begins = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(stops, dtype=np.int64) + 1
+    lengths = ends - begins
+
+    buffer = np.frombuffer(seq, dtype=np.uint8)
+    bounds = np.concatenate((begins, ends))
+
+    freqs: Dict[str, np.ndarray] = {}
+
+    for base in 'ACGT':
+        # Fragment count is the difference of cumulative counts at its ends
+        counts = count_before(buffer, ord(base), bounds)
+        freqs[base] = (counts[len(begins):] - counts[:len(begins)]) / lengths
 
     return freqs
 
 
 # --------------------------------------------------
-def test_find_tetra():
+def test_find_composition() -> None:
+    """ Test find_composition """
+
+    def freqs_list(seq: bytes, starts: List[int],
+                   stops: List[int]) -> Dict[str, List[float]]:
+        """ Convert arrays for comparison """
+        freqs = find_composition(seq, starts, stops)
+        return {base: freq.tolist() for base, freq in freqs.items()}
+
+    empty: Dict[str, List[float]] = {'A': [], 'C': [], 'G': [], 'T': []}
+    assert freqs_list(b'', [], []) == empty
+
+    assert freqs_list(b'ACGT', [0, 1, 2, 3], [0, 1, 2, 3]) == {
+        'A': [1, 0, 0, 0],
+        'C': [0, 1, 0, 0],
+        'G': [0, 0, 1, 0],
+        'T': [0, 0, 0, 1]
+    }
+    assert freqs_list(b'ACCGGGTTTT', [0], [9]) == {
+        'A': [0.1],
+        'C': [0.2],
+        'G': [0.3],
+        'T': [0.4]
+    }
+
+    # Case insensitive, other characters count toward length only
+    assert freqs_list(b'aNCgNNTt', [0, 4], [3, 7]) == {
+        'A': [0.25, 0.0],
+        'C': [0.25, 0.0],
+        'G': [0.25, 0.0],
+        'T': [0.0, 0.5]
+    }
+
+
+# --------------------------------------------------
+def find_tetra(seq: bytes, starts: npt.ArrayLike, stops: npt.ArrayLike,
+               k: int = 4) -> np.ndarray:
+    """ Calculate k-mer (default tetranucleotide) frequencies of fragments """
+
+    return find_kmer_freqs(encode_kmers(seq, k), starts, stops, k)
+
+
+# --------------------------------------------------
+def find_kmer_freqs(kmers: np.ndarray, starts: npt.ArrayLike,
+                    stops: npt.ArrayLike, k: int) -> np.ndarray:
+    """ Aggregate encoded k-mers into frequencies for each fragment. Stops
+    are inclusive, so a fragment has stop - start - k + 2 k-mers """
+
+    begins = np.asarray(starts).tolist()
+    ends = np.asarray(stops).tolist()
+    freqs = np.zeros((len(begins), 4**k), dtype=np.float32)
+
+    for row, (start, stop) in enumerate(zip(begins, ends)):
+        # K-mers that start and end within the fragment. Fragments shorter
+        # than k have none, rather than a negative end counted from the
+        # end of the genome
+        frag_kmers = kmers[start:max(start, stop - k + 2)]
+        frag_kmers = frag_kmers[frag_kmers >= 0]
+
+        if len(frag_kmers) > 0:
+            freqs[row] = np.bincount(frag_kmers,
+                                     minlength=4**k) / len(frag_kmers)
+
+    return freqs
+
+
+# --------------------------------------------------
+def test_find_tetra() -> None:
     """ Test find_tetra """
 
-    assert find_tetra('') == {}
-    assert find_tetra('A') == {'A': 1}
-    assert find_tetra('C') == {'C': 1}
-    assert find_tetra('G') == {'G': 1}
-    assert find_tetra('T') == {'T': 1}
-    assert find_tetra('ACCGGGTTTT') == {'A': 0.1, 'C': 0.2, 'G': 0.3, 'T': 0.4}
+    # Columns are k-mers in lexicographic order: AA, AC, AG, AT, CA, ...
+    freqs = find_tetra(b'AACGT', [0, 2], [2, 4], 2)
+    assert freqs.shape == (2, 16)
+    assert freqs[0].tolist() == [0.5, 0.5] + [0.0] * 14
+    assert freqs[1].nonzero()[0].tolist() == [6, 11]
+    assert freqs[1, [6, 11]].tolist() == [0.5, 0.5]
+
+    # Default is tetranucleotides, k-mers spanning other characters skipped
+    freqs = find_tetra(b'AAAANTTTT', [0], [8])
+    assert freqs.shape == (1, 256)
+    assert freqs[0, [0, 255]].tolist() == [0.5, 0.5]
+
+    # Fragment with no complete k-mers
+    assert find_tetra(b'ANA', [0], [2]).tolist() == [[0.0] * 256]
+
+    # Fragments shorter than k
+    freqs = find_tetra(b'ACGTACGTACGTAAAA', [0, 2], [1, 3], 4)
+    assert freqs.tolist() == [[0.0] * 256] * 2
+
+    # Fragment exactly k long has one k-mer
+    freqs = find_tetra(b'ACGTACGTACGTAAAA', [12, 0], [15, 2], 4)
+    assert freqs[0, 0] == 1.0 and freqs[0].sum() == 1.0
+    assert freqs[1].tolist() == [0.0] * 256
 
 
 # --------------------------------------------------
-def write_annotations(frag_recs, out_file, write_blank):
-    """ Write fragment annotations to .tsv """
+def encode_kmers(seq: bytes, k: int) -> np.ndarray:
+    """ 2-bit encode the k-mer starting at each position, -1 if not ACGT """
 
-    if len(frag_recs) != 0:
+    codes = np.frombuffer(seq.translate(BASE_CODES), dtype=np.uint8)
 
-        with open(out_file, 'wt') as out_fh:
-            print('id', 'name', *frag_recs[0].annotations.keys(),
-                  sep='\t', file=out_fh)
+    n_kmers = max(len(codes) - k + 1, 0)
+    kmers = np.zeros(n_kmers, dtype=np.int16)
+    valid = np.ones(n_kmers, dtype=bool)
 
-            for rec in frag_recs:
-                print(rec.id, rec.description, *rec.annotations.values(),
-                      sep='\t', file=out_fh)
+    # Shift in one base of every k-mer at a time
+    for offset in range(k):
+        base_codes = codes[offset:offset + n_kmers]
+        kmers <<= 2
+        kmers |= base_codes & 3
+        valid &= base_codes < 4
 
-    elif len(frag_recs) == 0 and write_blank:
+    kmers[~valid] = -1
 
-        with open(out_file, 'wt') as out_fh:
-            print('', file=out_fh)
+    return kmers
+
+
+# --------------------------------------------------
+def test_encode_kmers() -> None:
+    """ Test encode_kmers """
+
+    assert encode_kmers(b'', 2).tolist() == []
+    assert encode_kmers(b'A', 2).tolist() == []
+    assert encode_kmers(b'ACGT', 1).tolist() == [0, 1, 2, 3]
+    assert encode_kmers(b'acgt', 2).tolist() == [1, 6, 11]
+    assert encode_kmers(b'ACNGT', 2).tolist() == [1, -1, -1, 11]
+    assert encode_kmers(b'TTTT', 4).tolist() == [255]
+
+
+# --------------------------------------------------
+def count_before(buffer: np.ndarray, base: int, positions: np.ndarray,
+                 block: int = 2**22) -> np.ndarray:
+    """ Count a base (either case) before each position in buffer """
+
+    counts = np.zeros(len(positions), dtype=np.int64)
+    total = 0
+
+    # Prefix sums are built a block at a time to bound memory use
+    for block_start in range(0, len(buffer), block):
+        block_seq = buffer[block_start:block_start + block]
+        block_end = block_start + len(block_seq)
+
+        # Setting the lowercase bit makes the comparison case insensitive
+        prefix = np.cumsum((block_seq | 0x20) == (base | 0x20),
+                           dtype=np.int64)
+
+        in_block = (positions > block_start) & (positions <= block_end)
+        counts[in_block] = total + prefix[positions[in_block] - block_start
+                                          - 1]
+
+        total += prefix[-1]
+
+    return counts
+
+
+# --------------------------------------------------
+def test_count_before() -> None:
+    """ Test count_before """
+
+    buffer = np.frombuffer(b'AaCANa', dtype=np.uint8)
+    positions = np.array([0, 1, 2, 3, 4, 6])
+
+    assert count_before(buffer, ord('A'), positions).tolist() == [
+        0, 1, 2, 2, 3, 4
+    ]
+
+    # Same counts when positions fall across blocks
+    for block in [1, 2, 4, 10]:
+        assert count_before(buffer, ord('A'), positions,
+                            block).tolist() == [0, 1, 2, 2, 3, 4]
+
+
+# --------------------------------------------------
+class FragWriter:
+    """ Output files for the fragments of one length, opened when the
+    first fragments are written. With parent_file, only coordinates
+    referring to that file are written, not sequences """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,
+                 out_file_base: str,
+                 kmers: List[int],
+                 parent_file: Optional[str] = None,
+                 compress: bool = False) -> None:
+        self.out_file_base = out_file_base
+        self.parent_file = parent_file
+        self.compress = compress
+        self.out_files_npy = {
+            k: f'{out_file_base}_frags_{k}mer.npy'
+            for k in kmers
+        }
+        self.n_rec = 0
+        self.stack = contextlib.ExitStack()
+        self.fa_writer: Optional[FastaWriter] = None
+        self.tsv_fh: IO[str]
+        self.npy_fhs: Dict[int, BinaryIO] = {}
+
+    @property
+    def out_file_fa(self) -> str:
+        """ Fragment .fasta file """
+        return compressed_name(self.out_file_base + '_frags.fasta',
+                               self.compress)
+
+    @property
+    def out_file_tsv(self) -> str:
+        """ Fragment annotation .tsv file """
+        return compressed_name(self.out_file_base + '_frags.tsv',
+                               self.compress)
+
+    @property
+    def out_file(self) -> str:
+        """ File the fragments are written to """
+        return self.out_file_tsv if self.parent_file else self.out_file_fa
+
+    def open(self) -> None:
+        """ Open output files and write headers """
+
+        stack = self.stack
+        if not self.parent_file:
+            fa_fh = stack.enter_context(open_output(self.out_file_fa, 'wb'))
+
+            # Buffered records are written before the file is closed
+            self.fa_writer = stack.enter_context(FastaWriter(fa_fh))
+        self.tsv_fh = stack.enter_context(open_output(self.out_file_tsv))
+        self.npy_fhs = {
+            k: stack.enter_context(open(out_file, 'wb'))
+            for k, out_file in self.out_files_npy.items()
+        }
+
+        print('id', 'name', 'parent_id', 'parent_name', 'frag_start',
+              'frag_end', 'a_pct', 'c_pct', 'g_pct', 't_pct',
+              *(['parent_file'] if self.parent_file else []),
+              sep='\t', file=self.tsv_fh)
+
+        # Row count is not known until all fragments are written
+        for k, npy_fh in self.npy_fhs.items():
+            write_npy_header(npy_fh, 0, 4**k)
+
+    def write(self, frags: Fragments) -> None:
+        """ Stream fragments to .fasta, their annotations to .tsv, and
+        their k-mer frequencies to a .npy matrix for each k """
+
+        if self.n_rec == 0:
+            self.open()
+
+        if self.fa_writer:
+            write_fasta(frags, self.fa_writer)
+        write_annotations(frags, self.tsv_fh, self.parent_file)
+        for k, npy_fh in self.npy_fhs.items():
+            write_kmer_freqs(frags, npy_fh, k)
+        self.n_rec += len(frags.starts)
+
+    def close(self) -> int:
+        """ Finalize .npy headers and close files, return record count """
+
+        for k, npy_fh in self.npy_fhs.items():
+            npy_fh.seek(0)
+            write_npy_header(npy_fh, self.n_rec, 4**k)
+
+        self.stack.close()
+
+        return self.n_rec
+
+    def write_blank(self) -> None:
+        """ Write blank files when there were no fragments """
+
+        out_files = [self.out_file_tsv]
+        if not self.parent_file:
+            out_files.insert(0, self.out_file_fa)
+
+        for out_file in out_files:
+            with open_output(out_file) as out_fh:
+                print('', file=out_fh)
+        for k, out_file in self.out_files_npy.items():
+            with open(out_file, 'wb') as out_bin_fh:
+                write_npy_header(out_bin_fh, 0, 4**k)
+
+
+# --------------------------------------------------
+def write_npy_header(out_fh: BinaryIO, n_rows: int, n_cols: int) -> None:
+    """ Write .npy header for a float32 matrix. Row count is fixed width
+    so the header can be rewritten in place once all rows are appended """
+
+    header = ("{'descr': '<f4', 'fortran_order': False, "
+              f"'shape': ({n_rows:20d}, {n_cols}), }}")
+
+    # Magic string, version, and header length precede the header, and
+    # data must start on a multiple of 64 bytes
+    header += ' ' * (-(10 + len(header) + 1) % 64) + '\n'
+
+    out_fh.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) +
+                 header.encode('latin1'))
+
+
+# --------------------------------------------------
+def test_write_npy_header(tmp_path) -> None:
+    """ Test write_npy_header """
+
+    out_file = tmp_path / 'test.npy'
+    matrix = np.arange(12, dtype=np.float32).reshape(3, 4)
+
+    with open(out_file, 'wb') as out_fh:
+        write_npy_header(out_fh, 0, 4)
+        out_fh.write(matrix.tobytes())
+        out_fh.seek(0)
+        write_npy_header(out_fh, 3, 4)
+
+    assert np.array_equal(np.load(out_file), matrix)
+
+    with open(out_file, 'wb') as out_fh:
+        write_npy_header(out_fh, 0, 4)
+
+    assert np.load(out_file).shape == (0, 4)
+
+
+# --------------------------------------------------
+def write_kmer_freqs(frags: Fragments, out_fh: BinaryIO, k: int,
+                     chunk: int = 1024) -> None:
+    """ Append fragment k-mer frequencies to .npy matrix, a chunk of
+    fragments at a time so the matrix is never held in memory """
+
+    kmers = encode_kmers(frags.seq, k)
+
+    for i in range(0, len(frags.starts), chunk):
+        freqs = find_kmer_freqs(kmers, frags.starts[i:i + chunk],
+                                frags.stops[i:i + chunk], k)
+        out_fh.write(freqs.astype('<f4').tobytes())
+
+
+# --------------------------------------------------
+def write_fasta(frags: Fragments, writer: FastaWriter) -> None:
+    """ Write fragment sequences to FASTA """
+
+    seq = memoryview(frags.seq)
+
+    for n_frag, start, stop in zip(get_numbers(frags), frags.starts.tolist(),
+                                   frags.stops.tolist()):
+        writer.write(f'frag_{n_frag}_{frags.parent_id} Fragment {n_frag}'
+                     f' of {frags.parent_name}', seq[start:stop + 1])
+
+
+# --------------------------------------------------
+def get_numbers(frags: Fragments) -> List[int]:
+    """ Number of each fragment within its parent sequence, from 1 """
+
+    if frags.numbers is None:
+        return list(range(1, len(frags.starts) + 1))
+
+    return frags.numbers.tolist()
+
+
+# --------------------------------------------------
+def write_annotations(frags: Fragments,
+                      out_fh: IO[str],
+                      parent_file: Optional[str] = None) -> None:
+    """ Write fragment annotations to .tsv, with the file holding the
+    parent sequence if given """
+
+    extra = [parent_file] if parent_file else []
+
+    freqs = find_composition(frags.seq, frags.starts, frags.stops)
+
+    rows = zip((frags.starts + 1).tolist(), (frags.stops + 1).tolist(),
+               freqs['A'].tolist(), freqs['C'].tolist(),
+               freqs['G'].tolist(), freqs['T'].tolist())
+
+    for n_frag, (start, stop, a_pct, c_pct, g_pct, t_pct) in zip(
+            get_numbers(frags), rows):
+        print(f'frag_{n_frag}_{frags.parent_id}',
+              f'Fragment {n_frag} of {frags.parent_name}',
+              frags.parent_id, frags.parent_name, start, stop,
+              a_pct, c_pct, g_pct, t_pct, *extra,
+              sep='\t', file=out_fh)
 
 
 # --------------------------------------------------
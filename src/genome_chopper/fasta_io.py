@@ -0,0 +1,283 @@
+"""
+Date   : 2026-10-17
+Purpose: Read and write FASTA files as bytes, without building SeqRecords
+
+Records can be read in three modes, each doing only the work it needs:
+read_ids() gives the ID of each record, read_lengths() its ID and sequence
+length, and read_records() its ID, description, and sequence as a bytes
+buffer. IDs and descriptions are those of Bio.SeqIO: the ID is the first
+word of the header line, and the description is the whole line.
+"""
+
+import io
+from typing import (IO, Callable, Iterable, Iterator, List, NamedTuple,
+                    Optional, Tuple, TypeVar, Union)
+
+# Files are read in chunks of about this size
+BUFFER_SIZE = 1 << 20
+
+# Bytes removed from sequences, as by Bio.SeqIO
+WHITESPACE = b' \t\r\n'
+
+NEWLINE = ord('\n')
+
+T = TypeVar('T')
+
+
+class FastaRecord(NamedTuple):
+    """ FASTA record with sequence as bytes """
+    id: str
+    description: str
+    seq: bytes
+
+
+# --------------------------------------------------
+def read_ids(fh: IO[bytes],
+             chunk_size: int = BUFFER_SIZE) -> Iterator[str]:
+    """ Read only the ID of each record """
+
+    for title, _ in scan(fh, None, chunk_size):
+        yield get_id(title)
+
+
+# --------------------------------------------------
+def read_lengths(fh: IO[bytes],
+                 chunk_size: int = BUFFER_SIZE) -> Iterator[Tuple[str, int]]:
+    """ Read the ID and sequence length of each record """
+
+    for title, counts in scan(fh, count_bases, chunk_size):
+        yield get_id(title), sum(counts)
+
+
+# --------------------------------------------------
+def read_records(fh: IO[bytes],
+                 chunk_size: int = BUFFER_SIZE) -> Iterator[FastaRecord]:
+    """ Read the ID, description, and sequence of each record """
+
+    for title, lines in scan(fh, strip_whitespace, chunk_size):
+        yield FastaRecord(get_id(title), title.decode(), b''.join(lines))
+
+
+# --------------------------------------------------
+def test_read() -> None:
+    """ Test read_ids(), read_lengths(), and read_records() """
+
+    fasta = (b'>seq_1 First sequence\nACGT\nAC\n'
+             b'>seq_2\r\nAC GT\r\nA\r\n'
+             b'>\n'
+             b'>seq_4  \nacgtn\n\n')
+
+    assert list(read_ids(io.BytesIO(fasta))) == ['seq_1', 'seq_2', '', 'seq_4']
+    assert list(read_lengths(io.BytesIO(fasta))) == [('seq_1', 6),
+                                                     ('seq_2', 5), ('', 0),
+                                                     ('seq_4', 5)]
+    assert list(read_records(io.BytesIO(fasta))) == [
+        FastaRecord('seq_1', 'seq_1 First sequence', b'ACGTAC'),
+        FastaRecord('seq_2', 'seq_2', b'ACGTA'),
+        FastaRecord('', '', b''),
+        FastaRecord('seq_4', 'seq_4', b'acgtn')
+    ]
+
+    # Records spanning many chunks
+    fasta = b'>seq_1\n' + b'ACGT\n' * 1000 + b'>seq_2\n' + b'A' * 999 + b'\n'
+    assert list(read_lengths(io.BytesIO(fasta))) == [('seq_1', 4000),
+                                                     ('seq_2', 999)]
+    assert [rec.seq for rec in read_records(io.BytesIO(fasta), 7)
+            ] == [b'ACGT' * 1000, b'A' * 999]
+
+    assert not list(read_records(io.BytesIO(b'')))
+
+    try:
+        list(read_ids(io.BytesIO(b'# Comment\n>seq_1\nACGT\n')))
+        assert False
+    except ValueError as err:
+        assert str(err) == 'FASTA file does not start with ">"'
+
+
+# --------------------------------------------------
+def scan(fh: IO[bytes],
+         clean: Optional[Callable[[bytes, int, int], T]],
+         chunk_size: int = BUFFER_SIZE) -> Iterator[Tuple[bytes, List[T]]]:
+    """ Yield the header line of each record, with a list of what clean
+    returns for each block of its sequence lines, given as a chunk of the
+    file with start and end positions. Lines are skipped if clean is None """
+
+    title: Optional[bytes] = None
+    body: List[T] = []
+
+    for chunk in read_chunks(fh, chunk_size):
+        pos, size = 0, len(chunk)
+
+        # Each chunk begins at the start of a line
+        while pos < size:
+            if chunk.startswith(b'>', pos):
+                if title is not None:
+                    yield title, body
+
+                end = chunk.find(b'\n', pos)
+                end = size if end < 0 else end
+                title, body = chunk[pos + 1:end].rstrip(), []
+                pos = end + 1
+                continue
+
+            if title is None:
+                raise ValueError('FASTA file does not start with ">"')
+
+            # Sequence lines run up to the next header line. Searching for
+            # '>' alone is much faster than for '\n>'
+            end = chunk.find(b'>', pos)
+            while end > 0 and chunk[end - 1] != NEWLINE:
+                end = chunk.find(b'>', end + 1)
+            end = size if end < 0 else end
+            if clean is not None:
+                body.append(clean(chunk, pos, end))
+            pos = end
+
+    if title is not None:
+        yield title, body
+
+
+# --------------------------------------------------
+def read_chunks(fh: IO[bytes],
+                chunk_size: int = BUFFER_SIZE) -> Iterator[bytes]:
+    """ Read file in chunks of whole lines """
+
+    while True:
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            return
+
+        if not chunk.endswith(b'\n'):
+            chunk += fh.readline()
+
+        yield chunk
+
+
+# --------------------------------------------------
+def test_read_chunks() -> None:
+    """ Test read_chunks() """
+
+    text = b'ACGT\nAC\nA\nACGTACGT\n'
+    assert list(read_chunks(io.BytesIO(text), 3)) == [
+        b'ACGT\n', b'AC\n', b'A\nACGTACGT\n'
+    ]
+    assert list(read_chunks(io.BytesIO(b'AC\nGT'), 4)) == [b'AC\nGT']
+
+
+# --------------------------------------------------
+def get_id(title: bytes) -> str:
+    """ Get record ID, the first word of the header """
+
+    words = title.split(None, 1)
+
+    return words[0].decode() if words else ''
+
+
+# --------------------------------------------------
+def strip_whitespace(chunk: bytes, start: int, end: int) -> bytes:
+    """ Get sequence lines in chunk from start to end without whitespace """
+
+    return chunk[start:end].translate(None, WHITESPACE)
+
+
+# --------------------------------------------------
+def count_bases(chunk: bytes, start: int, end: int) -> int:
+    """ Count bases in chunk from start to end, ignoring whitespace """
+
+    n_bases = end - start - chunk.count(b'\n', start, end)
+
+    # Checking for other whitespace is faster than counting it
+    for char in [b'\r', b' ', b'\t']:
+        if chunk.find(char, start, end) >= 0:
+            n_bases -= chunk.count(char, start, end)
+
+    return n_bases
+
+
+# --------------------------------------------------
+def test_count_bases() -> None:
+    """ Test count_bases() """
+
+    assert count_bases(b'ACGT\nAC\n', 0, 8) == 6
+    assert count_bases(b'AC GT\r\n\tA\n', 0, 10) == 5
+    assert count_bases(b'>seq_1\nAC GT\r\n\tA\n>', 7, 17) == 5
+    assert count_bases(b'\n', 0, 1) == 0
+
+
+# --------------------------------------------------
+class FastaWriter:
+    """ FASTA output buffered in memory and written in large blocks, with
+    sequences wrapped as by Bio.SeqIO """
+
+    def __init__(self,
+                 out_fh: IO[bytes],
+                 width: int = 60,
+                 buffer_size: int = BUFFER_SIZE) -> None:
+        self.out_fh = out_fh
+        self.width = width
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.n_rec = 0
+
+    def write(self, title: str, seq: Union[bytes, memoryview]) -> None:
+        """ Write record with header line title """
+
+        width = self.width
+        buffer = self.buffer
+
+        buffer += b'>' + title.encode() + b'\n'
+        for i in range(0, len(seq), width):
+            buffer += seq[i:i + width]
+            buffer += b'\n'
+        self.n_rec += 1
+
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_records(self, records: Iterable[FastaRecord]) -> int:
+        """ Write records, return number written """
+
+        n_rec = 0
+        for record in records:
+            self.write(record.description, record.seq)
+            n_rec += 1
+
+        return n_rec
+
+    def flush(self) -> None:
+        """ Write buffered records to file """
+
+        self.out_fh.write(self.buffer)
+        self.buffer.clear()
+
+    def __enter__(self) -> 'FastaWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+
+# --------------------------------------------------
+def test_fasta_writer() -> None:
+    """ Test FastaWriter """
+
+    out_fh = io.BytesIO()
+
+    with FastaWriter(out_fh, width=4, buffer_size=10) as writer:
+        writer.write('seq_1 First', b'ACGTAC')
+        writer.write('seq_2', memoryview(b'ACGTACGT')[4:])
+        assert writer.write_records(
+            iter([FastaRecord('seq_3', 'seq_3', b''),
+                  FastaRecord('seq_4', 'seq_4 D', b'A')])) == 2
+        assert writer.n_rec == 4
+
+    assert out_fh.getvalue() == (b'>seq_1 First\nACGT\nAC\n>seq_2\nACGT\n'
+                                 b'>seq_3\n>seq_4 D\nA\n')
+
+    # Records round trip
+    fasta = b'>seq_1 First\n' + b'A' * 60 + b'\n' + b'C' * 10 + b'\n'
+    out_fh = io.BytesIO()
+    with FastaWriter(out_fh) as writer:
+        writer.write_records(read_records(io.BytesIO(fasta)))
+
+    assert out_fh.getvalue() == fasta
@@ -1,6 +1,7 @@
 """ Tests """
 
 from subprocess import getstatusoutput
+import gzip
 import platform
 import os
 import re
@@ -166,3 +167,157 @@ def test_blank_out() -> None:
     finally:
         if os.path.isdir(out_dir):
             shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_kmers() -> None:
+    """ Writes k-mer frequency matrices """
+
+    out_dir = "out_test"
+    try:
+        rv, out = getstatusoutput(
+            f'{RUN} {TEST1} -l 500 -v 0 -o {out_dir} -k 2 4')
+        assert rv == 0
+        n_rec = int(re.findall(r'Wrote (\d+) records', out)[0])
+
+        for k in [2, 4]:
+            out_file = os.path.join(out_dir, f'input1_frags_{k}mer.npy')
+            assert os.path.isfile(out_file)
+            with open(out_file, 'rb') as fh:
+                header = fh.read(128).decode('latin1')
+            assert f"'shape': ({n_rec:20d}, {4**k})" in header
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_bad_kmers() -> None:
+    """ Dies on k-mer size out of range """
+
+    rv, out = getstatusoutput(f'{RUN} {TEST1} -k 7')
+    assert rv != 0
+    assert re.search('k-mer size "7" must be between 2 and 6', out)
+
+
+# --------------------------------------------------
+def test_multi_length() -> None:
+    """ Writes each length to its own directory """
+
+    out_dir = "out_test"
+    try:
+        rv, out = getstatusoutput(
+            f'{RUN} {TEST1} -l 500 1000 -v 0 -o {out_dir}')
+        assert rv == 0
+
+        for length, n_rec in [(500, 12), (1000, 6)]:
+            out_file = os.path.join(out_dir, str(length),
+                                    'input1_frags.fasta')
+            assert f'Wrote {n_rec} records to "{out_file}"' in out
+            assert open(out_file).read().count('>') == n_rec
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_workers() -> None:
+    """ Output with workers is same as without """
+
+    out_dirs = ["out_test", "out_test_workers"]
+    try:
+        rv1, out1 = getstatusoutput(
+            f'{RUN} {TEST1} {TEST2} -l 500 -v 0 -b -o {out_dirs[0]}')
+        rv2, out2 = getstatusoutput(
+            f'{RUN} {TEST1} {TEST2} -l 500 -v 0 -b -o {out_dirs[1]} -w 2')
+        assert rv1 == rv2 == 0
+        assert out1 == out2.replace(out_dirs[1], out_dirs[0])
+
+        for out_file in os.listdir(out_dirs[0]):
+            assert open(os.path.join(out_dirs[0], out_file)).read() == \
+                open(os.path.join(out_dirs[1], out_file)).read()
+
+    finally:
+        for out_dir in out_dirs:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_compressed() -> None:
+    """ Reads gzipped input and writes compressed output """
+
+    out_dirs = ["out_test", "out_test_gz"]
+    gz_file = os.path.join(out_dirs[1], 'input1.fasta.gz')
+    try:
+        os.makedirs(out_dirs[1])
+        with open(TEST1, 'rb') as in_fh, gzip.open(gz_file, 'wb') as out_fh:
+            out_fh.write(in_fh.read())
+
+        rv, _ = getstatusoutput(f'{RUN} {TEST1} -l 500 -o {out_dirs[0]}')
+        assert rv == 0
+        rv, out = getstatusoutput(f'{RUN} {gz_file} -l 500 -o {out_dirs[1]}'
+                                  ' -z')
+        assert rv == 0
+        assert 'input1_frags.fasta.gz' in out
+
+        for out_file in ['input1_frags.fasta', 'input1_frags.tsv']:
+            with gzip.open(os.path.join(out_dirs[1], out_file + '.gz'),
+                           'rt') as fh:
+                assert fh.read() == open(os.path.join(out_dirs[0],
+                                                      out_file)).read()
+
+        # Coordinates cannot index into compressed input
+        rv, out = getstatusoutput(f'{RUN} {gz_file} -c')
+        assert rv != 0
+        assert re.search('--coords requires uncompressed input', out)
+
+    finally:
+        for out_dir in out_dirs:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_sample() -> None:
+    """ Writes a seeded sample of the fragments of each length """
+
+    out_dirs = ["out_test", "out_test_sample", "out_test_sample2"]
+    try:
+        rv, _ = getstatusoutput(
+            f'{RUN} {TEST1} -l 500 1000 -v 0 -o {out_dirs[0]}')
+        assert rv == 0
+        for out_dir in out_dirs[1:]:
+            rv, out = getstatusoutput(
+                f'{RUN} {TEST1} -l 500 1000 -v 0 -n 4 -s -o {out_dir}')
+            assert rv == 0
+            assert 'Wrote 4 records' in out
+
+        for length in ['500', '1000']:
+            full, sample, sample2 = [
+                open(os.path.join(out_dir, length,
+                                  'input1_frags.fasta')).read()
+                for out_dir in out_dirs
+            ]
+            assert sample == sample2
+
+            # Sampled fragments are as named and cut in the full output
+            for record in sample.split('>')[1:]:
+                assert '>' + record in full
+
+        # Sample larger than all fragments writes them all
+        rv, out = getstatusoutput(
+            f'{RUN} {TEST1} -l 1000 -v 0 -n 100 -s -o {out_dirs[1]}')
+        assert rv == 0
+        assert 'Wrote 6 records' in out
+
+        rv, out = getstatusoutput(f'{RUN} {TEST1} -n -1')
+        assert rv != 0
+        assert re.search('sample "-1" must not be negative', out)
+
+    finally:
+        for out_dir in out_dirs:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
@@ -6,17 +6,37 @@ Purpose: Combine Snakemake benchmark files
 """
 
 import argparse
+import io
 import os
-import pandas as pd
 import re
+import string
 import sys
-from typing import List, NamedTuple, TextIO
+from typing import Dict, List, NamedTuple, Optional, TextIO, Tuple
+import pandas as pd
+from fasta_io import read_lengths
+from table_io import FORMATS, format_error, with_format, write_table
 
 
 class Args(NamedTuple):
     """ Command-line arguments """
     files: List[TextIO]
+    scripts: List[TextIO]
     out_dir: str
+    format: str
+    inputs: Optional[str]
+
+
+# Columns of Snakemake benchmark files. h:m:s is s written as text, and
+# the rest are numeric, with '-' where a value could not be measured
+COLUMNS = [
+    's', 'h:m:s', 'max_rss', 'max_vms', 'max_uss', 'max_pss', 'io_in',
+    'io_out', 'mean_load', 'cpu_time'
+]
+
+# Assumed benchmark file naming convention regex
+# {tool}/{kingdom}_{length}_benchmark.txt
+NAME_RE = re.compile(
+    r'(?P<tool>\w+)/(?P<kingdom>\w+)_(?P<length>\d+)_benchmark.txt')
 
 
 # --------------------------------------------------
@@ -33,6 +53,15 @@ def get_args() -> Args:
                         type=argparse.FileType('rt'),
                         nargs='+')
 
+    parser.add_argument('-s',
+                        '--scripts',
+                        metavar='FILE',
+                        help='Benchmark files of scripts of this repo, which'
+                        ' are not counted as tools. Given after FILE',
+                        type=argparse.FileType('rt'),
+                        nargs='+',
+                        default=[])
+
     parser.add_argument('-o',
                         '--out_dir',
                         metavar='DIR',
@@ -40,9 +69,35 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-f',
+                        '--format',
+                        metavar='FORMAT',
+                        help='Output table format: csv, parquet, or feather',
+                        choices=FORMATS,
+                        default='csv')
+
+    parser.add_argument('-i',
+                        '--inputs',
+                        metavar='TEMPLATE',
+                        help='FASTA input of each benchmark, with {kingdom}'
+                        ' and {length} in place of those of its file name.'
+                        ' If given, efficiency of each tool is written too',
+                        type=str)
+
     args = parser.parse_args()
 
-    return Args(args.files, args.out_dir)
+    error = format_error(args.format)
+    if error:
+        parser.error(error)
+
+    if args.inputs:
+        for _, field, _, _ in string.Formatter().parse(args.inputs):
+            if field is not None and field not in NAME_RE.groupindex:
+                parser.error(f'Unknown field "{{{field}}}" in inputs '
+                             f'"{args.inputs}"')
+
+    return Args(args.files, args.scripts, args.out_dir, args.format,
+                args.inputs)
 
 
 # --------------------------------------------------
@@ -52,63 +107,172 @@ def main() -> None:
     args = get_args()
     out_dir = args.out_dir
 
-    # Assumed column names for combining dataframes
-    old_header = ('s\th:m:s\tmax_rss\tmax_vms\tmax_uss\t'
-                  'max_pss\tio_in\tio_out\tmean_load\tcpu_time\n')
+    combined_df = pd.concat([read_benchmark(file) for file in args.files] +
+                            [read_benchmark(file, 'script')
+                             for file in args.scripts],
+                            ignore_index=True)
 
-    # Assumed benchmark file naming convention regex
-    # {tool}/{kingdom}_{length}_benchmark.txt
-    name_re = re.compile(
-        r'(?P<tool>\w+)/(?P<kingdom>\w+)_(?P<length>\d+)_benchmark.txt')
+    # Inputs are sized first, so that none missing leaves partial output.
+    # Scripts of this repo are left out of the efficiency of the tools
+    tools_df = combined_df[combined_df['kind'] == 'tool']
+    efficiency_df = get_efficiency(add_sizes(
+        tools_df, args.inputs)) if args.inputs else None
 
-    # Rows of combined dataframe
-    # Using list first instead of dataframe for speed
-    rows: List = []
+    # Dataframe write operattions
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
 
-    # Get rows of new dataframe
-    for file in args.files:
+    out_name = with_format('combined_benchmarks.csv', args.format)
+    out_file = os.path.join(out_dir, out_name)
 
-        file_header = file.readline()
+    write_table(combined_df, out_file, args.format)
 
-        if file_header != old_header:
-            sys.exit(f'File {file.name}: unexpected column names.')
+    print(f'Done. Wrote to {out_file}')
 
-        # Match the file name to get information about rule that produced file
-        name_match = name_re.search(file.name)
+    if efficiency_df is not None:
+        out_file = os.path.join(
+            out_dir, with_format('tool_efficiency.csv', args.format))
 
-        # Die if info cannot be inferred
-        if not name_match:
-            sys.exit(f'File {file.name}: unexpected file name.\n'
-                     'Consistency needed for inferring meta information.\n'
-                     'Expected {tool}/{kingdom}_{length}_benchmark.txt')
+        write_table(efficiency_df, out_file, args.format)
 
-        # Add new row to merged df (list at this time)
-        rows.extend(
-            map(lambda l: str.split(l.rstrip(), sep='\t'), file.readlines()))
+        print(f'Wrote efficiency to {out_file}')
 
-        # Add inferred information about rule
-        rows[-1].extend(list(name_match.group('tool', 'kingdom', 'length')))
 
-    # Move to dataframe
-    combined_df = pd.DataFrame(rows)
+# --------------------------------------------------
+def read_benchmark(file: TextIO, kind: str = 'tool') -> pd.DataFrame:
+    """ Read benchmark file with numeric columns, adding the fields of its
+    file name and the kind of step benchmarked, tool or script """
 
-    # Define new header with new rows
-    # Remove previous newline first
-    new_header = old_header[:-1] + '\ttool\tkingdom\tlength\n'
+    if file.readline().rstrip('\n').split('\t') != COLUMNS:
+        sys.exit(f'File {file.name}: unexpected column names.')
 
-    # Add header
-    combined_df.columns = new_header.rstrip().split('\t')
+    # Match the file name to get information about rule that produced file
+    name_match = NAME_RE.search(file.name)
 
-    # Dataframe write operattions
-    if not os.path.isdir(out_dir):
-        os.mkdir(out_dir)
+    # Die if info cannot be inferred
+    if not name_match:
+        sys.exit(f'File {file.name}: unexpected file name.\n'
+                 'Consistency needed for inferring meta information.\n'
+                 'Expected {tool}/{kingdom}_{length}_benchmark.txt')
 
-    out_file = os.path.join(out_dir, 'combined_benchmarks.csv')
+    df = pd.read_csv(file,
+                     sep='\t',
+                     header=None,
+                     names=COLUMNS,
+                     dtype={'h:m:s': str},
+                     na_values=['-'])
 
-    with open(out_file, 'wt') as out:
-        combined_df.to_csv(out, index=False)
+    return df.assign(tool=name_match['tool'],
+                     kingdom=name_match['kingdom'],
+                     length=int(name_match['length']),
+                     kind=kind)
 
-    print(f'Done. Wrote to {out_file}')
+
+# --------------------------------------------------
+def test_read_benchmark() -> None:
+    """ Test read_benchmark() """
+
+    file = io.StringIO('\t'.join(COLUMNS) + '\n'
+                       '28.3219\t0:00:28\t177.16\t1598.42\t123.52\t129.25\t'
+                       '33.67\t0.34\t10.51\t0.67\n'
+                       '30.5\t0:00:30\t180\t1600\t-\t-\t-\t-\t-\t1.5\n')
+    file.name = 'benchmarks/dvf/viral_500_benchmark.txt'
+
+    df = read_benchmark(file, 'script')
+
+    assert df.columns.tolist() == COLUMNS + [
+        'tool', 'kingdom', 'length', 'kind'
+    ]
+    assert df['h:m:s'].tolist() == ['0:00:28', '0:00:30']
+    assert df['max_rss'].tolist() == [177.16, 180]
+    assert df['cpu_time'].tolist() == [0.67, 1.5]
+    assert df['max_uss'].isna().tolist() == [False, True]
+
+    # Each repeat of the rule gets the fields of the file name
+    assert df['tool'].tolist() == ['dvf', 'dvf']
+    assert df['length'].tolist() == [500, 500]
+    assert df['kind'].tolist() == ['script', 'script']
+
+
+# --------------------------------------------------
+def fasta_size(filename: str) -> Tuple[int, int]:
+    """ Number of records and bases in FASTA file """
+
+    contigs, bases = 0, 0
+    with open(filename, 'rb') as fh:
+        for _, length in read_lengths(fh):
+            contigs += 1
+            bases += length
+
+    return contigs, bases
+
+
+# --------------------------------------------------
+def add_sizes(df: pd.DataFrame, template: str) -> pd.DataFrame:
+    """ Add number of contigs and bases of the input of each benchmark, the
+    FASTA named by template filled in with the fields of its file name.
+    Each input is read once """
+
+    fields = list(NAME_RE.groupindex)
+    inputs = [
+        template.format(**dict(zip(fields, values)))
+        for values in df[fields].itertuples(index=False)
+    ]
+
+    sizes: Dict[str, Tuple[int, int]] = {}
+    for filename in inputs:
+        if filename not in sizes:
+            if not os.path.isfile(filename):
+                sys.exit(f'File {filename}: input FASTA not found.')
+            sizes[filename] = fasta_size(filename)
+
+    return df.assign(contigs=[sizes[filename][0] for filename in inputs],
+                     bases=[sizes[filename][1] for filename in inputs])
+
+
+# --------------------------------------------------
+def get_efficiency(df: pd.DataFrame) -> pd.DataFrame:
+    """ Efficiency of each tool from benchmarks with input sizes. Rates are
+    of totals over all runs, so larger inputs weigh more """
+
+    totals = df.groupby('tool', sort=False).agg(runs=('s', 'size'),
+                                                contigs=('contigs', 'sum'),
+                                                bases=('bases', 'sum'),
+                                                s=('s', 'sum'),
+                                                max_rss=('max_rss', 'sum'),
+                                                cpu_time=('cpu_time', 'sum'))
+
+    return pd.DataFrame({
+        'runs': totals['runs'],
+        'contigs': totals['contigs'],
+        'bases': totals['bases'],
+        'bases_per_s': totals['bases'] / totals['s'],
+        'rss_mb_per_mbp': totals['max_rss'] / (totals['bases'] / 1e6),
+        'cpu_s_per_contig': totals['cpu_time'] / totals['contigs']
+    }).reset_index()
+
+
+# --------------------------------------------------
+def test_get_efficiency() -> None:
+    """ Test get_efficiency() """
+
+    df = pd.DataFrame({
+        'tool': ['dvf', 'dvf', 'seeker'],
+        's': [10.0, 30.0, 5.0],
+        'max_rss': [100.0, 300.0, 50.0],
+        'cpu_time': [8.0, 32.0, 1.0],
+        'contigs': [1_000, 3_000, 1_000],
+        'bases': [500_000, 1_500_000, 500_000]
+    })
+
+    efficiency = get_efficiency(df)
+
+    assert efficiency['tool'].tolist() == ['dvf', 'seeker']
+    assert efficiency['runs'].tolist() == [2, 1]
+    assert efficiency['bases'].tolist() == [2_000_000, 500_000]
+    assert efficiency['bases_per_s'].tolist() == [50_000, 100_000]
+    assert efficiency['rss_mb_per_mbp'].tolist() == [200, 100]
+    assert efficiency['cpu_s_per_contig'].tolist() == [0.01, 0.001]
 
 
 # --------------------------------------------------
@@ -7,15 +7,20 @@ Purpose: Combine all predictions from a tool
 
 import argparse
 import os
-import pandas as pd
 import sys
+from multiprocessing.pool import ThreadPool
 from typing import List, NamedTuple, TextIO
+from predictions import concat_predictions, read_predictions
+from table_io import (FORMATS, format_error, read_columns, with_format,
+                      write_table)
 
 
 class Args(NamedTuple):
     """ Command-line arguments """
     files: List[TextIO]
     out_dir: str
+    format: str
+    threads: int
 
 
 # --------------------------------------------------
@@ -39,9 +44,30 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-f',
+                        '--format',
+                        metavar='FORMAT',
+                        help='Output table format: csv, parquet, or feather',
+                        choices=FORMATS,
+                        default='csv')
+
+    parser.add_argument('-t',
+                        '--threads',
+                        metavar='INT',
+                        help='Number of files to read at once',
+                        type=int,
+                        default=1)
+
     args = parser.parse_args()
 
-    return Args(args.files, args.out_dir)
+    error = format_error(args.format)
+    if error:
+        parser.error(error)
+
+    if args.threads <= 0:
+        parser.error(f'threads "{args.threads}" must be greater than 0')
+
+    return Args(args.files, args.out_dir, args.format, args.threads)
 
 
 # --------------------------------------------------
@@ -52,37 +78,31 @@ def main() -> None:
     out_dir = args.out_dir
 
     # Assumed column names for combining dataframes
-    header = ('tool,record,length,actual,prediction,'
-              'lifecycle,value,stat,stat_name\n')
+    columns = [
+        'tool', 'record', 'length', 'actual', 'prediction', 'lifecycle',
+        'value', 'stat', 'stat_name'
+    ]
 
-    # Rows of combined dataframe
-    rows: List = []
-
-    # Get rows of new dataframe
+    # Headers are checked before any file is read in full
     for file in args.files:
-
-        file_header = file.readline()
-
-        if file_header != header:
+        if read_columns(file.name) != columns:
             sys.exit(f'File {file.name}: unexpected column names.')
 
-        rows.extend(
-            map(lambda l: str.split(l.rstrip(), sep=','), file.readlines()))
-
-    # Move to dataframe
-    combined_df = pd.DataFrame(rows)
+    # Tables of each file, with schema types, in any table format, read
+    # by a pool of threads
+    with ThreadPool(min(args.threads, len(args.files))) as pool:
+        dfs = pool.map(read_predictions, [file.name for file in args.files])
 
-    # Add header
-    combined_df.columns = header.rstrip().split(',')
+    # Categorical columns stay categorical across files
+    combined_df = concat_predictions(dfs)
 
     # Dataframe write operattions
     if not os.path.isdir(out_dir):
-        os.mkdir(out_dir)
+        os.makedirs(out_dir)
 
-    out_file = os.path.join(out_dir, 'combined.csv')
+    out_file = os.path.join(out_dir, with_format('combined.csv', args.format))
 
-    with open(out_file, 'wt') as out:
-        combined_df.to_csv(out, index=False)
+    write_table(combined_df, out_file, args.format)
 
     print(f'Done. Wrote to {out_file}')
 
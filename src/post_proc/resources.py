@@ -0,0 +1,179 @@
+"""
+Date   : 2026-10-17
+Purpose: Record resources used by a script as a Snakemake benchmark file
+
+Scripts given a benchmark file, by -B|--benchmark or the BENCHMARK_FILE
+environment variable, write the wall time, CPU time, and peak RSS of their
+process and its children in the columns of Snakemake benchmark files, so
+that benchmark.py combines them with those of the tools. Columns that
+Snakemake measures with psutil, which is not used here, are written as '-'.
+The time of each stage of the script is written beside it, in
+{name}_stages.tsv. Like Snakemake's, the files are written again by each
+run, so a rerun does not count as another run.
+"""
+
+import datetime
+import os
+import resource
+import sys
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+# Environment variable naming benchmark file of scripts not given one
+ENV_VAR = 'BENCHMARK_FILE'
+
+# Columns of Snakemake benchmark files
+COLUMNS = [
+    's', 'h:m:s', 'max_rss', 'max_vms', 'max_uss', 'max_pss', 'io_in',
+    'io_out', 'mean_load', 'cpu_time'
+]
+
+STAGE_COLUMNS = ['stage', 's', 'cpu_time', 'max_rss']
+
+
+class Usage(NamedTuple):
+    """ Resources used up to a point in time """
+    wall: float
+    cpu: float
+    max_rss: float
+
+
+# --------------------------------------------------
+def get_usage() -> Usage:
+    """ Resources used so far. CPU time is that of this process and its
+    children that have finished, and peak RSS (MB) is that of this process
+    or of its largest child """
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    # ru_maxrss is in kilobytes, except on macOS, where it is in bytes
+    scale = 1 << 20 if sys.platform == 'darwin' else 1 << 10
+
+    return Usage(
+        time.perf_counter(), own.ru_utime + own.ru_stime +
+        children.ru_utime + children.ru_stime,
+        max(own.ru_maxrss, children.ru_maxrss) / scale)
+
+
+# --------------------------------------------------
+def format_usage(start: Usage, end: Usage) -> List[str]:
+    """ Benchmark row of resources used between start and end """
+
+    seconds = end.wall - start.wall
+    cpu = end.cpu - start.cpu
+    mean_load = 100 * cpu / seconds if seconds else 0
+
+    return [
+        f'{seconds:.4f}',
+        str(datetime.timedelta(seconds=int(seconds))), f'{end.max_rss:.2f}',
+        '-', '-', '-', '-', '-', f'{mean_load:.2f}', f'{cpu:.2f}'
+    ]
+
+
+# --------------------------------------------------
+def test_format_usage() -> None:
+    """ Test format_usage() """
+
+    assert format_usage(Usage(10.5, 1, 50), Usage(3710.5, 1851, 200.5)) == [
+        '3700.0000', '1:01:40', '200.50', '-', '-', '-', '-', '-', '50.00',
+        '1850.00'
+    ]
+
+
+# --------------------------------------------------
+def write_rows(filename: str, columns: List[str],
+               rows: List[List[str]]) -> None:
+    """ Write tab-separated rows to file, with a header """
+
+    with open(filename, 'wt') as fh:
+        fh.write('\t'.join(columns) + '\n')
+        for row in rows:
+            fh.write('\t'.join(row) + '\n')
+
+
+# --------------------------------------------------
+def stages_file(filename: str) -> str:
+    """ Name of file of stage times beside benchmark file """
+
+    return os.path.splitext(filename)[0] + '_stages.tsv'
+
+
+# --------------------------------------------------
+def test_stages_file() -> None:
+    """ Test stages_file() """
+
+    assert stages_file('benchmarks/reformat_dvf/sample_1_benchmark.txt') == (
+        'benchmarks/reformat_dvf/sample_1_benchmark_stages.tsv')
+
+
+# --------------------------------------------------
+class Monitor:
+    """ Resources used by a script from when the monitor is made, and the
+    time of each stage it is told of. Nothing is measured or written
+    without a benchmark file """
+
+    def __init__(self, filename: Optional[str]) -> None:
+        self.filename = filename
+        self.start = get_usage() if filename else None
+        self.stages: List[Tuple[str, Usage]] = []
+
+    def stage(self, name: str) -> None:
+        """ Start next stage, ending the one before """
+
+        if self.filename:
+            self.stages.append((name, get_usage()))
+
+    def finish(self) -> None:
+        """ End last stage, and write the resources used """
+
+        if not self.filename or not self.start:
+            return
+
+        end = get_usage()
+
+        if os.path.dirname(self.filename):
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+
+        write_rows(self.filename, COLUMNS, [format_usage(self.start, end)])
+
+        if self.stages:
+            ends = [usage for _, usage in self.stages[1:]] + [end]
+            write_rows(stages_file(self.filename), STAGE_COLUMNS,
+                       [[
+                           name, f'{stop.wall - start.wall:.4f}',
+                           f'{stop.cpu - start.cpu:.2f}',
+                           f'{stop.max_rss:.2f}'
+                       ] for (name, start), stop in zip(self.stages, ends)])
+
+
+# --------------------------------------------------
+def test_monitor(tmp_path) -> None:
+    """ Test Monitor """
+
+    filename = str(tmp_path / 'dvf' / 'sample_1_benchmark.txt')
+
+    for _ in range(2):
+        monitor = Monitor(filename)
+        monitor.stage('read')
+        monitor.stage('write')
+        monitor.finish()
+
+    # A rerun replaces the row of the run before
+    with open(filename) as fh:
+        lines = [line.rstrip('\n').split('\t') for line in fh]
+    assert lines[0] == COLUMNS
+    assert len(lines) == 2
+    assert all(len(line) == len(COLUMNS) for line in lines)
+    assert float(lines[1][COLUMNS.index('max_rss')]) > 0
+
+    with open(stages_file(filename)) as fh:
+        lines = [line.rstrip('\n').split('\t') for line in fh]
+    assert lines[0] == STAGE_COLUMNS
+    assert [line[0] for line in lines[1:]] == ['read', 'write']
+
+    # Nothing is written without a file
+    monitor = Monitor(None)
+    monitor.stage('read')
+    monitor.finish()
+    assert len(os.listdir(tmp_path / 'dvf')) == 2
@@ -10,6 +10,8 @@ from typing import List
 PRG = './benchmark.py'
 BAD_FMT = 'tests/inputs/benchmarks/bad_format.csv'
 BAD_NAME = 'tests/inputs/benchmarks/bad_benchmark_name.txt'
+FRAGS = 'tests/inputs/benchmarks/selected_frags.fasta'
+SCRIPT = 'tests/inputs/benchmarks/reformat_virsorter/archaea_500_benchmark.txt'
 INPUTS = []
 
 kingdoms = ['archaea', 'bacteria', 'fungi', 'viral']
@@ -75,6 +77,39 @@ def test_bad_file_name():
     assert re.search('unexpected file name', out)
 
 
+# --------------------------------------------------
+def test_bad_inputs_field():
+    """ Unknown field in inputs template """
+
+    retval, out = getstatusoutput(f'{PRG} -i {{metagenome}}.fa {INPUTS[0]}')
+    assert retval != 0
+    assert out.lower().startswith('usage:')
+    assert re.search('Unknown field "{metagenome}"', out)
+
+
+# --------------------------------------------------
+def test_missing_input_fasta():
+    """ Input FASTA of benchmark does not exist """
+
+    out_dir = 'out_test'
+
+    try:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+        retval, out = getstatusoutput(
+            f'{PRG} -o {out_dir} -i {{kingdom}}_{{length}}.fa {INPUTS[0]}')
+        assert retval != 0
+        assert re.search('archaea_500.fa: input FASTA not found', out)
+
+        # Nothing is written
+        assert not os.path.isdir(out_dir)
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
 # --------------------------------------------------
 def run(files: List) -> None:
     """ Run the program with given file(s) """
@@ -96,7 +131,7 @@ def run(files: List) -> None:
         # Header is retained
         header = ('s,h:m:s,max_rss,max_vms,max_uss,'
                   'max_pss,io_in,io_out,mean_load,cpu_time,'
-                  'tool,kingdom,length\n')
+                  'tool,kingdom,length,kind\n')
         assert open(out_file).readlines()[0] == header
 
         # Number of rows is retained*
@@ -121,3 +156,65 @@ def test_runs_okay() -> None:
     """ Works with good files """
 
     run(INPUTS)
+
+
+# --------------------------------------------------
+def test_efficiency() -> None:
+    """ Efficiency of each tool from input sizes """
+
+    out_dir = 'out_test'
+
+    try:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+        rv, out = getstatusoutput(
+            f'{PRG} -o {out_dir} -i {FRAGS} {" ".join(INPUTS)}')
+
+        assert rv == 0
+        out_file = os.path.join(out_dir, 'tool_efficiency.csv')
+        assert out.endswith(f'Wrote efficiency to {out_file}')
+
+        lines = open(out_file).read().splitlines()
+        assert lines[0] == ('tool,runs,contigs,bases,bases_per_s,'
+                            'rss_mb_per_mbp,cpu_s_per_contig')
+
+        # Every benchmark had the same input of 2 fragments and 20 bases
+        tool, runs, contigs, bases, *_ = lines[1].split(',')
+        assert (tool, runs, contigs, bases) == ('virsorter', '16', '32',
+                                                '320')
+        assert len(lines) == 2
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_scripts() -> None:
+    """ Benchmarks of scripts are combined, but are not tools """
+
+    out_dir = 'out_test'
+
+    try:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+        rv, _ = getstatusoutput(
+            f'{PRG} -o {out_dir} -i {FRAGS} {INPUTS[0]} -s {SCRIPT}')
+        assert rv == 0
+
+        out_file = os.path.join(out_dir, 'combined_benchmarks.csv')
+        lines = open(out_file).read().splitlines()
+        assert [line.split(',')[-4:] for line in lines[1:]] == [
+            ['virsorter', 'archaea', '500', 'tool'],
+            ['reformat_virsorter', 'archaea', '500', 'script']
+        ]
+
+        out_file = os.path.join(out_dir, 'tool_efficiency.csv')
+        lines = open(out_file).read().splitlines()
+        assert [line.split(',')[0] for line in lines[1:]] == ['virsorter']
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
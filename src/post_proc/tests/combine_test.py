@@ -110,3 +110,69 @@ def test_runs_mulitple() -> None:
     """ Works with multiple files """
 
     run([INPUT1, INPUT2])
+
+
+# --------------------------------------------------
+def test_format() -> None:
+    """ Columnar output is read back as input, giving the same table """
+
+    out_dir = 'out_test'
+
+    try:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+        for fmt in ['parquet', 'feather']:
+            fmt_dir = os.path.join(out_dir, fmt)
+            rv, out = getstatusoutput(
+                f'{PRG} -f {fmt} -o {fmt_dir} {INPUT1} {INPUT2}')
+            assert rv == 0
+            out_file = os.path.join(fmt_dir, f'combined.{fmt}')
+            assert out == f'Done. Wrote to {out_file}'
+
+            rv, _ = getstatusoutput(f'{PRG} -o {fmt_dir} {out_file}')
+            assert rv == 0
+            fmt_csv = open(os.path.join(fmt_dir, 'combined.csv')).read()
+
+            rv, _ = getstatusoutput(f'{PRG} -o {out_dir} {INPUT1} {INPUT2}')
+            assert rv == 0
+            assert fmt_csv == open(os.path.join(out_dir,
+                                                'combined.csv')).read()
+
+        rv, out = getstatusoutput(f'{PRG} -f excel {INPUT1}')
+        assert rv != 0
+        assert re.search("invalid choice: 'excel'", out)
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_threads() -> None:
+    """ Files read by a pool of threads are combined in order """
+
+    out_dir = 'out_test'
+
+    try:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+        combined = []
+        for threads in [1, 3]:
+            thread_dir = os.path.join(out_dir, str(threads))
+            rv, _ = getstatusoutput(f'{PRG} -t {threads} -o {thread_dir}'
+                                    f' {INPUT1} {INPUT2} {INPUT1}')
+            assert rv == 0
+            combined.append(
+                open(os.path.join(thread_dir, 'combined.csv')).read())
+
+        assert combined[0] == combined[1]
+
+        rv, out = getstatusoutput(f'{PRG} -t 0 {INPUT1}')
+        assert rv != 0
+        assert re.search('threads "0" must be greater than 0', out)
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
@@ -7,6 +7,7 @@ from subprocess import getstatusoutput
 
 PRG = './reformat.py'
 DVF_RAW = 'tests/inputs/reformat/dvf_raw.txt'
+BENCHMARK = 'tests/inputs/benchmarks/virsorter/viral_500_benchmark.txt'
 
 
 # --------------------------------------------------
@@ -172,6 +173,35 @@ def test_reformat_virsorter() -> None:
     run('virsorter')
 
 
+# --------------------------------------------------
+def test_reformat_virsorter_dir() -> None:
+    """ Reformats VirSorter category FASTAs, same as the list of them """
+
+    pred_dir = 'tests/inputs/reformat/Predicted_viral_sequences'
+    out_file = 'virsorter_pred_formatted.csv'
+
+    try:
+        for out_dir, in_file in [('out_dir_test', pred_dir),
+                                 ('out_list_test',
+                                  f'{pred_dir}/combined_sequences.txt')]:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
+
+            rv, _ = getstatusoutput(f'{PRG} -l 500 -a bacteria -t virsorter'
+                                    f' -o {out_dir} {in_file}')
+            assert rv == 0
+
+        dir_lines = open(os.path.join('out_dir_test', out_file)).readlines()
+        assert len(dir_lines) == 7
+        assert dir_lines == open(os.path.join('out_list_test',
+                                              out_file)).readlines()
+
+    finally:
+        for out_dir in ['out_dir_test', 'out_list_test']:
+            if os.path.isdir(out_dir):
+                shutil.rmtree(out_dir)
+
+
 # --------------------------------------------------
 def test_reformat_virsorter2() -> None:
     """ Reformats VirSorter2 """
@@ -206,3 +236,162 @@ def test_reformat_virsorter2() -> None:
     finally:
         if os.path.isdir(out_dir):
             shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_manifest() -> None:
+    """ Reformats all files of a manifest, as one file at a time would """
+
+    tools = [
+        'breadsticks', 'dvf', 'metaphinder', 'seeker', 'vibrant',
+        'viralverify', 'virfinder', 'virsorter', 'virsorter2'
+    ]
+    out_dir = 'out_test'
+    manifest = os.path.join(out_dir, 'manifest.tsv')
+
+    try:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+        os.makedirs(out_dir)
+
+        with open(manifest, 'wt') as out_fh:
+            print('file', 'tool', 'length', 'actual', 'out_dir', sep='\t',
+                  file=out_fh)
+            for tool in tools:
+                print(f'tests/inputs/reformat/{tool}_raw.txt', tool, 1000,
+                      'viral', os.path.join(out_dir, 'batch', tool), sep='\t',
+                      file=out_fh)
+
+        rv, out = getstatusoutput(f'{PRG} -b {manifest} -w 2')
+        assert rv == 0
+        assert out == f'Done. Wrote {len(tools)} files.'
+
+        for tool in tools:
+            single_dir = os.path.join(out_dir, 'single', tool)
+            rv, _ = getstatusoutput(
+                f'{PRG} -l 1000 -a viral -t {tool} -o {single_dir}'
+                f' tests/inputs/reformat/{tool}_raw.txt')
+            assert rv == 0
+
+            out_file = f'{tool}_pred_formatted.csv'
+            assert open(os.path.join(out_dir, 'batch', tool,
+                                     out_file)).read() == open(
+                                         os.path.join(single_dir,
+                                                      out_file)).read()
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_bad_manifest() -> None:
+    """ Manifest rows are checked before any are reformatted """
+
+    out_dir = 'out_test'
+    manifest = os.path.join(out_dir, 'manifest.tsv')
+
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+
+        for rows, error in [
+            (['file\ttool\tlength'], 'missing column(s) actual'),
+            ([f'{DVF_RAW}\tdvf\t600\tviral'], 'line 2: invalid length "600"'),
+            ([f'{DVF_RAW}\tdvf\t500\tviral', f'{DVF_RAW}\tdvf\t500\tfungi'],
+             'more than one row writes to "out/dvf_pred_formatted.csv"')
+        ]:
+            if not rows[0].startswith('file'):
+                rows.insert(0, 'file\ttool\tlength\tactual')
+
+            with open(manifest, 'wt') as out_fh:
+                print(*rows, sep='\n', file=out_fh)
+
+            rv, out = getstatusoutput(f'{PRG} -b {manifest}')
+            assert rv != 0
+            assert error in out
+
+        rv, out = getstatusoutput(f'{PRG} -b {manifest} -t dvf')
+        assert rv != 0
+        assert re.search('-t/--tool cannot be used with --batch', out)
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_chunk_size() -> None:
+    """ Output read a few rows at a time is that of the whole file """
+
+    out_dir = 'out_test'
+
+    try:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+        for tool in ['dvf', 'seeker', 'virfinder', 'vibrant']:
+            outputs = []
+            for chunk_size in [0, 2]:
+                tool_dir = os.path.join(out_dir, str(chunk_size))
+                rv, _ = getstatusoutput(
+                    f'{PRG} -l 500 -a viral -t {tool} -o {tool_dir}'
+                    f' -c {chunk_size} tests/inputs/reformat/{tool}_raw.txt')
+                assert rv == 0
+                outputs.append(
+                    open(os.path.join(tool_dir,
+                                      f'{tool}_pred_formatted.csv')).read())
+
+            assert outputs[0] == outputs[1]
+
+        rv, out = getstatusoutput(f'{PRG} -l 500 -a viral -t dvf -c -1'
+                                  f' {DVF_RAW}')
+        assert rv != 0
+        assert re.search('chunk_size "-1" must not be negative', out)
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
+# --------------------------------------------------
+def test_benchmark() -> None:
+    """ Resources used are recorded as a benchmark that benchmark.py reads """
+
+    out_dir = 'out_test'
+    benchmark = os.path.join(out_dir, 'benchmarks', 'reformat_dvf',
+                             'viral_500_benchmark.txt')
+
+    try:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+        rv, _ = getstatusoutput(f'{PRG} -l 500 -a viral -t dvf -o {out_dir}'
+                                f' -B {benchmark} {DVF_RAW}')
+        assert rv == 0
+
+        # File can be given by environment variable, and a rerun replaces
+        # the row of the run before
+        rv, _ = getstatusoutput(f'BENCHMARK_FILE={benchmark} {PRG} -l 500'
+                                f' -a viral -t dvf -o {out_dir} {DVF_RAW}')
+        assert rv == 0
+
+        lines = open(benchmark).read().splitlines()
+        assert lines[0] == ('s\th:m:s\tmax_rss\tmax_vms\tmax_uss\t'
+                            'max_pss\tio_in\tio_out\tmean_load\tcpu_time')
+        assert len(lines) == 2
+
+        stages = os.path.join(os.path.dirname(benchmark),
+                              'viral_500_benchmark_stages.tsv')
+        assert open(stages).read().splitlines()[1].startswith('reformat\t')
+
+        rv, _ = getstatusoutput(
+            f'./benchmark.py -o {out_dir} {BENCHMARK} -s {benchmark}')
+        assert rv == 0
+        combined = open(os.path.join(out_dir,
+                                     'combined_benchmarks.csv')).readlines()
+        assert len(combined) == 3
+        assert combined[2].rstrip().endswith(',reformat_dvf,viral,500,script')
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
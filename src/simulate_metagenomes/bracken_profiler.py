@@ -9,10 +9,11 @@ import argparse
 import os
 import pandas as pd
 from pandas.testing import assert_frame_equal
-from typing import List, NamedTuple, TextIO, Tuple
+from typing import List, NamedTuple, Optional, TextIO, Tuple
 
 from phage_injector import rescale_abundances
 from phage_injector import get_phage_content, supplement_phage
+from resources import ENV_VAR, Monitor
 
 pd.options.mode.chained_assignment = None
 
@@ -24,6 +25,7 @@ class Args(NamedTuple):
     outdir: str
     phage: float
     num_phage: int
+    benchmark: Optional[str]
 
 
 # ---------------------------------------------------------------------------
@@ -71,6 +73,14 @@ def get_args() -> Args:
                         type=int,
                         default=10)
 
+    inputs.add_argument('-B',
+                        '--benchmark',
+                        metavar='FILE',
+                        help='File to record resources used in, as a'
+                        f' Snakemake benchmark, also set by ${ENV_VAR}',
+                        type=str,
+                        default=os.environ.get(ENV_VAR))
+
     args = parser.parse_args()
 
     # Convert percent to decimal
@@ -78,7 +88,7 @@ def get_args() -> Args:
         args.phage = args.phage / 100
 
     return Args(args.profiles, args.taxonomy, args.outdir, args.phage,
-                args.num_phage)
+                args.num_phage, args.benchmark)
 
 
 # ---------------------------------------------------------------------------
@@ -87,14 +97,17 @@ def main() -> None:
 
     args = get_args()
     out_dir = args.outdir
+    monitor = Monitor(args.benchmark)
 
     if not os.path.isdir(out_dir):
         os.makedirs(out_dir)
 
+    monitor.stage('taxonomy')
     taxonomy_df = clean_taxonomy(pd.read_csv(args.taxonomy))
 
     for profile in args.profiles:
 
+        monitor.stage(f'profile {profile.name}')
         print(f'Making profile for file "{profile.name}"...')
 
         bracken_df = clean_bracken(pd.read_csv(profile, sep='\t'))
@@ -118,6 +131,8 @@ def main() -> None:
 
         print('Finished.')
 
+    monitor.finish()
+
     n_profiles = len(args.profiles)
     plu = 's' if n_profiles != 1 else ''
     print(f'Done. Wrote {n_profiles} profile{plu} to {out_dir}.')
@@ -10,7 +10,9 @@ from glob import glob
 import os
 import pandas as pd
 import sys
-from typing import List, NamedTuple, TextIO
+from typing import IO, List, NamedTuple, TextIO
+
+from compressed_io import compressed_name, open_input, open_output
 
 
 class Args(NamedTuple):
@@ -18,6 +20,7 @@ class Args(NamedTuple):
     glob_files: List[TextIO]
     parent: str
     outdir: str
+    compress: bool
 
 
 # --------------------------------------------------
@@ -48,6 +51,11 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-z',
+                        '--compress',
+                        help='Write BGZF compressed output',
+                        action='store_true')
+
     args = parser.parse_args()
 
     if not os.path.isdir(args.parent):
@@ -56,7 +64,7 @@ def get_args() -> Args:
     if len(os.listdir(args.parent)) == 0:
         parser.error(f'--parent "{args.parent}" is empty')
 
-    return Args(args.glob_files, args.parent, args.outdir)
+    return Args(args.glob_files, args.parent, args.outdir, args.compress)
 
 
 # --------------------------------------------------
@@ -72,7 +80,9 @@ def main() -> None:
 
     for in_fh in args.glob_files:
 
-        out_fh = open(make_filename(out_dir, in_fh.name), 'wt')
+        out_file = compressed_name(make_filename(out_dir, in_fh.name),
+                                   args.compress)
+        out_fh = open_output(out_file)
 
         genomes = get_matches(parent, parse_globfile(in_fh))
 
@@ -84,7 +94,7 @@ def main() -> None:
         out_fh.close()
 
         plu = 's' if n_files != 1 else ''
-        print(f'Concatenated {n_files} file{plu} to {out_fh.name}')
+        print(f'Concatenated {n_files} file{plu} to {out_file}')
 
     n_profiles = len(args.glob_files)
     plu = 's' if n_profiles != 1 else ''
@@ -159,10 +169,11 @@ def get_matches(parent: str, df: pd.DataFrame) -> pd.DataFrame:
 
 
 # --------------------------------------------------
-def cat_genome(file_name: str, accession: str, out_fh: TextIO) -> None:
-    """ Concatenate genome file to output file """
+def cat_genome(file_name: str, accession: str, out_fh: IO[str]) -> None:
+    """ Concatenate genome file, which may be gzipped, to output file """
 
-    contents = open(file_name, 'rt').read()
+    with open_input(file_name) as in_fh:
+        contents = in_fh.read()
 
     out_fh.write(f'>{accession}\n')
 
@@ -10,7 +10,8 @@ import os
 import pandas as pd
 import re
 import sys
-from typing import List, NamedTuple, TextIO
+from multiprocessing.pool import ThreadPool
+from typing import List, NamedTuple, Optional, TextIO
 
 
 class Args(NamedTuple):
@@ -18,13 +19,14 @@ class Args(NamedTuple):
     files: List[TextIO]
     regex: str
     out_dir: str
+    threads: int
 
 
 class Nameparts(NamedTuple):
     """ Extracted parts of filename """
     step: str
     profile: str
-    model: str
+    model: Optional[str]
 
 
 # --------------------------------------------------
@@ -57,9 +59,19 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-t',
+                        '--threads',
+                        help='Number of files to read at once',
+                        metavar='INT',
+                        type=int,
+                        default=1)
+
     args = parser.parse_args()
 
-    return Args(args.files, args.regex, args.outdir)
+    if args.threads <= 0:
+        parser.error(f'threads "{args.threads}" must be greater than 0')
+
+    return Args(args.files, args.regex, args.outdir, args.threads)
 
 
 # --------------------------------------------------
@@ -72,7 +84,7 @@ def main() -> None:
     if not os.path.isdir(out_dir):
         os.makedirs(out_dir)
 
-    out_df = concat_files(args.regex, args.files)
+    out_df = concat_files(args.regex, args.files, args.threads)
 
     out_file = os.path.join(out_dir, 'combined.csv')
 
@@ -82,30 +94,41 @@ def main() -> None:
 
 
 # --------------------------------------------------
-def concat_files(regex: str, files: List[TextIO]) -> pd.DataFrame:
-    """ Concatenate files into single dataframe """
+def concat_files(regex: str, files: List[TextIO],
+                 threads: int) -> pd.DataFrame:
+    """ Concatenate files into single dataframe, reading them by a pool of
+    threads """
 
-    dfs = []
+    # All file names are matched before any file is read
+    parts = [match_regex(regex, file.name) for file in files]
 
-    for file in files:
-        parts = match_regex(regex, file.name)
+    with ThreadPool(min(threads, len(files))) as pool:
+        dfs = pool.starmap(read_file, zip([file.name for file in files],
+                                          parts))
 
-        df = pd.read_csv(file, sep='\t')
+    out_df = pd.concat(dfs, ignore_index=True)
 
-        df['step'] = parts.step
-        df['profile'] = parts.profile
-        df['model'] = parts.model
+    return out_df
 
-        dfs.append(df)
 
-    out_df = pd.concat(dfs, ignore_index=True)
+# --------------------------------------------------
+def read_file(filename: str, parts: Nameparts) -> pd.DataFrame:
+    """ Read benchmark file, adding the step, profile, and model from its
+    name """
 
-    return out_df
+    df = pd.read_csv(filename, sep='\t')
+
+    df['step'] = parts.step
+    df['profile'] = parts.profile
+    df['model'] = parts.model
+
+    return df
 
 
 # --------------------------------------------------
 def match_regex(regex: str, filename: str) -> Nameparts:
-    """ Use supplied regex to extract parts of filename """
+    """ Use supplied regex to extract parts of filename. Model is None if
+    the regex leaves it out """
 
     compiled_re = re.compile(regex)
 
@@ -116,7 +139,7 @@ def match_regex(regex: str, filename: str) -> Nameparts:
 
     match_step = match.group('step')
     match_profile = match.group('profile')
-    match_model = match.group('model')
+    match_model = match.groupdict().get('model')
 
     return Nameparts(match_step, match_profile, match_model)
 
@@ -131,6 +154,16 @@ def test_match_regex() -> None:
 
     assert match_regex(file_re, file) == file_exp
 
+    # Steps run once per profile have no model
+    file_re = (r'(?P<step>[\w_]+)/(?P<profile>[\w.]+?)'
+               r'(?:_(?P<model>miseq|hiseq))?\.txt')
+
+    assert match_regex(file_re, file) == file_exp
+    assert match_regex(file_re, 'data/sort_blast/Adult_1_miseq.txt') == (
+        Nameparts('sort_blast', 'Adult_1', 'miseq'))
+    assert match_regex(file_re, 'data/bracken_profiler/Adult_1.txt') == (
+        Nameparts('bracken_profiler', 'Adult_1', None))
+
 
 # --------------------------------------------------
 if __name__ == '__main__':
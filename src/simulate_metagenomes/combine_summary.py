@@ -10,7 +10,10 @@ import os
 import pandas as pd
 import re
 import sys
+from multiprocessing.pool import ThreadPool
 from typing import List, NamedTuple, Optional, TextIO, Tuple
+from table_io import (FORMATS, format_error, read_table, with_format,
+                      write_table)
 
 
 class Args(NamedTuple):
@@ -18,6 +21,8 @@ class Args(NamedTuple):
     files: List[TextIO]
     regex: str
     out_dir: str
+    format: str
+    threads: int
 
 
 class Nameparts(NamedTuple):
@@ -57,9 +62,31 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-f',
+                        '--format',
+                        metavar='FORMAT',
+                        help='Output table format: csv, parquet, or feather',
+                        choices=FORMATS,
+                        default='csv')
+
+    parser.add_argument('-t',
+                        '--threads',
+                        help='Number of files to read at once',
+                        metavar='INT',
+                        type=int,
+                        default=1)
+
     args = parser.parse_args()
 
-    return Args(args.files, args.regex, args.outdir)
+    error = format_error(args.format)
+    if error:
+        parser.error(error)
+
+    if args.threads <= 0:
+        parser.error(f'threads "{args.threads}" must be greater than 0')
+
+    return Args(args.files, args.regex, args.outdir, args.format,
+                args.threads)
 
 
 # --------------------------------------------------
@@ -72,36 +99,45 @@ def main() -> None:
     if not os.path.isdir(out_dir):
         os.makedirs(out_dir)
 
-    out_df, filename = concat_files(args.regex, args.files)
+    out_df, filename = concat_files(args.regex, args.files, args.threads)
 
-    out_file = make_filename(out_dir, filename)
+    out_file = with_format(make_filename(out_dir, filename), args.format)
 
-    out_df.to_csv(out_file, index=False)
+    write_table(out_df, out_file, args.format)
 
     print(f'Done. Wrote output to {out_file}')
 
 
 # --------------------------------------------------
-def concat_files(regex: str, files: List[TextIO]) -> Tuple[pd.DataFrame, str]:
-    """ Concatenate files into single dataframe """
+def concat_files(regex: str, files: List[TextIO],
+                 threads: int) -> Tuple[pd.DataFrame, str]:
+    """ Concatenate files into single dataframe, reading them by a pool of
+    threads """
 
-    dfs = []
+    # All file names are matched before any file is read
+    parts = [match_regex(regex, file.name) for file in files]
 
-    for file in files:
-        parts = match_regex(regex, file.name)
+    with ThreadPool(min(threads, len(files))) as pool:
+        dfs = pool.starmap(read_file, zip([file.name for file in files],
+                                          parts))
 
-        df = pd.read_csv(file)
+    out_df = pd.concat(dfs, ignore_index=True)
 
-        df['profile'] = parts.profile
+    return out_df, parts[-1].filename
 
-        if parts.model:
-            df['model'] = parts.model
 
-        dfs.append(df)
+# --------------------------------------------------
+def read_file(filename: str, parts: Nameparts) -> pd.DataFrame:
+    """ Read file, adding the profile and model from its name """
 
-    out_df = pd.concat(dfs, ignore_index=True)
+    df = read_table(filename)
+
+    df['profile'] = parts.profile
+
+    if parts.model:
+        df['model'] = parts.model
 
-    return out_df, parts.filename
+    return df
 
 
 # --------------------------------------------------
@@ -8,11 +8,14 @@ Purpose: Assign taxonomy to BLASTed contigs
 import argparse
 import multiprocessing as mp
 import os
-from typing import NamedTuple, TextIO
+from typing import NamedTuple, Optional, TextIO
 
 import pandas as pd
 
 from blast_sorter import assign_tax
+from resources import ENV_VAR, Monitor
+from table_io import (FORMATS, format_error, read_table, with_format,
+                      write_table)
 
 
 class Args(NamedTuple):
@@ -20,6 +23,8 @@ class Args(NamedTuple):
     infile: TextIO
     taxonomy: TextIO
     outdir: str
+    format: str
+    benchmark: Optional[str]
 
 
 # --------------------------------------------------
@@ -49,9 +54,29 @@ def get_args() -> Args:
                         type=str,
                         default='out')
 
+    parser.add_argument('-f',
+                        '--format',
+                        metavar='FORMAT',
+                        help='Output table format: csv, parquet, or feather',
+                        choices=FORMATS,
+                        default='csv')
+
+    parser.add_argument('-B',
+                        '--benchmark',
+                        metavar='FILE',
+                        help='File to record resources used in, as a'
+                        f' Snakemake benchmark, also set by ${ENV_VAR}',
+                        type=str,
+                        default=os.environ.get(ENV_VAR))
+
     args = parser.parse_args()
 
-    return Args(args.infile, args.taxonomy, args.outdir)
+    error = format_error(args.format)
+    if error:
+        parser.error(error)
+
+    return Args(args.infile, args.taxonomy, args.outdir, args.format,
+                args.benchmark)
 
 
 # --------------------------------------------------
@@ -85,24 +110,30 @@ def main() -> None:
 
     args = get_args()
     out_dir = args.outdir
+    monitor = Monitor(args.benchmark)
 
     if not os.path.isdir(out_dir):
         os.makedirs(out_dir)
 
-    df = pd.read_csv(args.infile)
-    taxonomy_df = pd.read_csv(args.taxonomy)
+    # Inputs can be of any table format
+    monitor.stage('read')
+    df = read_table(args.infile.name)
+    taxonomy_df = read_table(args.taxonomy.name)
 
+    monitor.stage('assign')
     assignment_df = pd.DataFrame()
     assignments = pool.map_async(
         assign_tax,
         [query_hits for _, query_hits in df.groupby('query_id')]).get()
 
     pool.close()
+    pool.join()
 
     assignment_df = pd.concat([assignment_df, *assignments])
 
     assignment_df = assignment_df.reset_index(drop=True)
 
+    monitor.stage('merge')
     out_df = pd.merge(assignment_df,
                       taxonomy_df,
                       how='inner',
@@ -114,9 +145,13 @@ def main() -> None:
 
     # Rename and delete duplicate columns
 
-    out_file = make_filename(args.infile.name, out_dir)
+    out_file = with_format(make_filename(args.infile.name, out_dir),
+                           args.format)
+
+    monitor.stage('write')
+    write_table(out_df, out_file, args.format)
 
-    out_df.to_csv(out_file, index=False)
+    monitor.finish()
 
     print(f'Done. Wrote output to {out_file}')
 
@@ -10,7 +10,7 @@ import os
 from typing import List, NamedTuple, TextIO
 
 import pandas as pd
-from Bio import SeqIO
+from fasta_io import read_ids
 
 
 class Args(NamedTuple):
@@ -101,9 +101,10 @@ def main() -> None:
             continue
 
         bin_num = get_bin_name(bin_file.name)
-        for contig in SeqIO.parse(bin_file, 'fasta'):
-            bins.append(bin_num)
-            contigs.append(contig.id)
+        with open(bin_file, 'rb') as fh:
+            for contig_id in read_ids(fh):
+                bins.append(bin_num)
+                contigs.append(contig_id)
 
     out_df = pd.DataFrame({'bin': bins, 'contig': contigs})
     out_df['sample'] = get_sample_name(args.bin_dir)
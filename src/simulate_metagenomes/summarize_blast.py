@@ -10,7 +10,10 @@ from Bio.Blast import NCBIXML
 import io
 import os
 import pytest
-from typing import List, NamedTuple, TextIO, Tuple
+from typing import List, NamedTuple, Optional, TextIO, Tuple
+import pandas as pd
+from resources import ENV_VAR, Monitor
+from table_io import FORMATS, format_error, with_format, write_table
 
 
 class Args(NamedTuple):
@@ -18,6 +21,8 @@ class Args(NamedTuple):
     blast_out: TextIO
     outdir: str
     low_mem: bool
+    format: str
+    benchmark: Optional[str]
 
 
 class Hit(NamedTuple):
@@ -56,9 +61,29 @@ def get_args() -> Args:
                         action='store_true',
                         help='Use low-memory, slower version')
 
+    parser.add_argument('-f',
+                        '--format',
+                        metavar='FORMAT',
+                        help='Output table format: csv, parquet, or feather',
+                        choices=FORMATS,
+                        default='csv')
+
+    parser.add_argument('-B',
+                        '--benchmark',
+                        metavar='FILE',
+                        help='File to record resources used in, as a'
+                        f' Snakemake benchmark, also set by ${ENV_VAR}',
+                        type=str,
+                        default=os.environ.get(ENV_VAR))
+
     args = parser.parse_args()
 
-    return Args(args.blast_out, args.outdir, args.low_mem)
+    error = format_error(args.format)
+    if error:
+        parser.error(error)
+
+    return Args(args.blast_out, args.outdir, args.low_mem, args.format,
+                args.benchmark)
 
 
 # --------------------------------------------------
@@ -66,21 +91,33 @@ def main() -> None:
     """ This is how we do iit """
 
     args = get_args()
+    monitor = Monitor(args.benchmark)
 
     if not os.path.isdir(args.outdir):
         os.mkdir(args.outdir)
 
-    out_file = make_filename(args.outdir, args.blast_out.name)
+    out_file = with_format(make_filename(args.outdir, args.blast_out.name),
+                           args.format)
 
+    monitor.stage('parse')
     hits = get_hits(args.blast_out)
     header = 'query_id,hit_id,e_val,query_length,alignment_length,start,end'
 
+    monitor.stage('write')
+    if args.format != 'csv':
+        write_table(hits_to_df(header, hits), out_file, args.format)
+        monitor.finish()
+        print(f'Done. Wrote output to {out_file}.')
+        return
+
     with open(out_file, 'wt') as out_fh:
         if args.low_mem:
             output_low_mem(header, hits, out_fh)
         else:
             output_fast(header, hits, out_fh)
 
+    monitor.finish()
+
     print(f'Done. Wrote output to {out_file}.')
 
 
@@ -184,6 +221,33 @@ def test_output_fast(example_out_data: Tuple[str, List[Hit]],
     assert out_fh.read() == example_out.read()
 
 
+# --------------------------------------------------
+def hits_to_df(header: str, hits: List[Hit]) -> pd.DataFrame:
+    """ Make table of hits with numeric columns, for columnar output """
+
+    return pd.DataFrame(hits, columns=header.split(',')).astype({
+        'e_val': float,
+        'query_length': int,
+        'alignment_length': int,
+        'start': int,
+        'end': int
+    })
+
+
+# --------------------------------------------------
+def test_hits_to_df(example_out_data: Tuple[str, List[Hit]]) -> None:
+    """ Test hits_to_df() """
+
+    header, hits = example_out_data
+
+    df = hits_to_df(header, hits)
+
+    assert df.columns.tolist() == header.split(',')
+    assert df['hit_id'].tolist() == ['GCF_002148255.1', 'GCF_009834925.2']
+    assert df['e_val'].tolist() == [8.40553e-160, 2.71137e-55]
+    assert df['start'].tolist() == [1, 70]
+
+
 # --------------------------------------------------
 @pytest.fixture(name='example_out_data')
 def fixture_example_out_data() -> Tuple[str, List[Hit]]:
@@ -8,14 +8,14 @@ Purpose: Get lengths of all contigs
 import argparse
 import io
 import os
-from typing import NamedTuple, TextIO
+from typing import BinaryIO, NamedTuple, TextIO
 
-from Bio import SeqIO
+from fasta_io import read_lengths
 
 
 class Args(NamedTuple):
     """ Command-line arguments """
-    contigs: TextIO
+    contigs: BinaryIO
     filename: str
     outdir: str
 
@@ -30,7 +30,7 @@ def get_args() -> Args:
 
     parser.add_argument('contigs',
                         metavar='FILE',
-                        type=argparse.FileType('rt'),
+                        type=argparse.FileType('rb'),
                         help='Assembled contigs FASTA file')
 
     parser.add_argument('-f',
@@ -94,23 +94,23 @@ def test_make_filenames() -> None:
 
 
 # --------------------------------------------------
-def summarize_contigs(in_fh: TextIO, out_fh: TextIO) -> None:
+def summarize_contigs(in_fh: BinaryIO, out_fh: TextIO) -> None:
     """ Output the length of each contig """
 
     out_fh.write('contig_id,length\n')
 
-    for contig in SeqIO.parse(in_fh, 'fasta'):
-        out_fh.write(f'{contig.id},{len(contig.seq)}\n')
+    for contig_id, length in read_lengths(in_fh):
+        out_fh.write(f'{contig_id},{length}\n')
 
 
 # --------------------------------------------------
 def test_summarize_contigs() -> None:
     """ Test summarize_contigs() """
 
-    example_contigs = io.StringIO('>k141_451933 flag=1 multi=1.0000 len=16\n'
-                                  'ATGCATGCATGCATGC\n'
-                                  '>k141_55624 flag=1 multi=1.0000 len=10\n'
-                                  'ATGCATGCAT\n')
+    example_contigs = io.BytesIO(b'>k141_451933 flag=1 multi=1.0000 len=16\n'
+                                 b'ATGCATGCATGCATGC\n'
+                                 b'>k141_55624 flag=1 multi=1.0000 len=10\n'
+                                 b'ATGCATGCAT\n')
 
     expected_out = io.StringIO('contig_id,length\n'
                                'k141_451933,16\n'
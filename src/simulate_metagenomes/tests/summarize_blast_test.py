@@ -90,6 +90,33 @@ def test_runs_low_mem() -> None:
     run('--low_mem')
 
 
+# --------------------------------------------------
+def test_benchmark() -> None:
+    """ Records resources used by each stage """
+
+    out_dir = random_string()
+    benchmark = os.path.join(out_dir, 'summarize_blast',
+                             'input_1_benchmark.txt')
+
+    try:
+        rv, _ = getstatusoutput(f'{PRG} -o {out_dir} -B {benchmark} {INPUT}')
+
+        assert rv == 0
+        lines = open(benchmark).read().splitlines()
+        assert lines[0].split('\t')[:3] == ['s', 'h:m:s', 'max_rss']
+        assert len(lines) == 2
+
+        stages = os.path.join(out_dir, 'summarize_blast',
+                              'input_1_benchmark_stages.tsv')
+        assert [line.split('\t')[0] for line in open(stages)] == [
+            'stage', 'parse', 'write'
+        ]
+
+    finally:
+        if os.path.isdir(out_dir):
+            shutil.rmtree(out_dir)
+
+
 # --------------------------------------------------
 def random_string() -> str:
     """ Generate a random string """